@@ -0,0 +1,162 @@
+"""
+Benchmark: inserciones individuales frente al buffer de escritura de recibos.
+
+Ejecuta N "ejecuciones del grafo" concurrentes que guardan recibos con
+`ReceiptsRepositoryImpl.save_receipt` y mide el throughput y la latencia de cada
+guardado en dos modos:
+- single: un upsert por recibo (comportamiento por defecto)
+- buffered: RECEIPTS_WRITE_BUFFER_ENABLED, lotes de `insert_many(ordered=False)`
+
+Por defecto usa el MongoDB de DATABASE_URL y escribe en la colección
+`<COLLECTION_NAME>_benchmark`, que se elimina al terminar. Con `--fake-rtt-ms`
+sustituye la colección por una simulada que tarda ese RTT por operación y limita
+las operaciones simultáneas a MONGO_MAX_POOL_SIZE, para ejecutarlo sin servidor.
+
+Uso (desde agent-core/):
+    python examples/benchmark_bulk_writer.py --concurrency 200 --inserts 10
+    python examples/benchmark_bulk_writer.py --fake-rtt-ms 2
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+class FakeCollection:
+    """Colección simulada: un RTT por operación y tantas operaciones simultáneas como conexiones."""
+
+    def __init__(self, rtt_ms: float, pool_size: int, per_document_us: float = 20):
+        self.rtt = rtt_ms / 1000
+        self.per_document = per_document_us / 1_000_000
+        self.pool = asyncio.Semaphore(pool_size)
+        self.documents = 0
+        self.operations = 0
+
+    async def _round_trip(self, documents: int) -> None:
+        async with self.pool:
+            await asyncio.sleep(self.rtt + documents * self.per_document)
+        self.documents += documents
+        self.operations += 1
+
+    async def insert_one(self, document: dict):
+        await self._round_trip(1)
+        return type("InsertOneResult", (), {"inserted_id": document.setdefault("_id", self.documents)})()
+
+    async def find_one_and_update(self, filter: dict, update: dict, **kwargs):
+        # save_receipt sin buffer: upsert por clave natural, el recibo siempre es nuevo
+        await self._round_trip(1)
+        return None
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        await self._round_trip(len(documents))
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        # Acumulados mensuales de los recibos nuevos
+        await self._round_trip(len(operations))
+
+    async def drop(self) -> None:
+        pass
+
+
+def build_receipt(index: int = 0):
+    """Recibo de prueba; el monto varía con el índice para no chocar con el índice único de recibos."""
+    from maivi_agent.domain.entities import ReceiptDataSave, Service
+
+    return ReceiptDataSave(
+        phone_number="51987654321",
+        service_type=Service.LUZ,
+        is_valid=True,
+        is_notified=False,
+        amount_total=round(100 + index / 100, 2),
+        date_expired="25/02/2026",
+        consumption_period="Diciembre 2025",
+        company="Luz del Sur",
+        link_receipt_image="https://ik.imagekit.io/maivi/benchmark.png"
+    )
+
+
+async def run_mode(mode: str, concurrency: int, inserts: int, fake_rtt_ms: float, batch: int, flush_ms: int) -> dict:
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+    from shared.config import settings
+
+    repository = ReceiptsRepositoryImpl(
+        write_buffer=mode == "buffered",
+        buffer_max_batch_size=batch,
+        buffer_flush_interval=flush_ms / 1000
+    )
+    fake = None
+    if fake_rtt_ms is not None:
+        fake = FakeCollection(fake_rtt_ms, settings.MONGO_MAX_POOL_SIZE)
+        repository.db = fake
+        repository.rollups = fake
+        if repository.write_buffer is not None:
+            repository.write_buffer.collection = fake
+
+    receipts = itertools.count()
+    latencies_ms: list[float] = []
+
+    async def save():
+        started = time.perf_counter()
+        await repository.save_receipt(build_receipt(next(receipts)))
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    # Calentamiento: conexión y selección de servidor fuera de la medición
+    await save()
+    latencies_ms.clear()
+
+    async def graph_run():
+        for _ in range(inserts):
+            await save()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(graph_run() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    round_trips = fake.operations - 1 if fake is not None else None
+    if repository.write_buffer is not None and fake is None:
+        round_trips = repository.write_buffer.batches_written - 1
+    await repository.db.drop()
+    await repository.close()
+
+    latencies_ms.sort()
+    return {
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "inserts_per_s": concurrency * inserts / elapsed,
+        "round_trips": round_trips if round_trips is not None else concurrency * inserts,
+        "p50_ms": statistics.median(latencies_ms),
+        "p99_ms": latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200, help="Ejecuciones del grafo concurrentes")
+    parser.add_argument("--inserts", type=int, default=10, help="Inserciones por ejecución")
+    parser.add_argument("--batch", type=int, default=100, help="RECEIPTS_WRITE_BUFFER_MAX_BATCH")
+    parser.add_argument("--flush-ms", type=int, default=50, help="RECEIPTS_WRITE_BUFFER_FLUSH_MS")
+    parser.add_argument("--fake-rtt-ms", type=float, default=None, help="Simula MongoDB con este RTT en lugar de conectarse")
+    args = parser.parse_args()
+
+    os.environ["COLLECTION_NAME"] = f"{os.environ.get('COLLECTION_NAME', 'receipts')}_benchmark"
+
+    target = f"RTT simulado {args.fake_rtt_ms} ms" if args.fake_rtt_ms is not None else "MongoDB"
+    print("=" * 78)
+    print(f"Guardado de recibos ({args.concurrency} ejecuciones x {args.inserts} inserciones, {target})")
+    print("=" * 78)
+    print(f"{'modo':<9} {'total s':>9} {'ins/s':>9} {'viajes':>8} {'p50 ms':>9} {'p99 ms':>9}")
+
+    for mode in ("single", "buffered"):
+        r = asyncio.run(run_mode(mode, args.concurrency, args.inserts, args.fake_rtt_ms, args.batch, args.flush_ms))
+        print(f"{r['mode']:<9} {r['elapsed_s']:>9.2f} {r['inserts_per_s']:>9.0f} {r['round_trips']:>8} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark: reservas en CAL.COM con cliente por reserva vs. cliente compartido.
+
+Levanta un CAL.COM falso en local (HTTP/1.1 con keep-alive) que simula el coste
+de abrir una conexión (DNS + TCP + TLS, `--handshake-ms`) y la latencia de cada
+reserva (`--latency-ms`), y programa los dos recordatorios de `--receipts`
+recibos con las dos implementaciones:
+- antes: un `httpx.AsyncClient` nuevo por reserva y las dos reservas de un
+  recibo una detrás de otra
+- ahora: `CalComNotificationService` con su cliente compartido y las dos
+  reservas en paralelo
+
+Muestra p50/p95 por recibo, el tiempo total y las conexiones abiertas. En
+producción el cliente negocia HTTP/2 por ALPN sobre TLS y multiplexa las
+reservas en una sola conexión; aquí se mide la reutilización con keep-alive.
+
+Uso (desde agent-core/):
+    python examples/benchmark_calcom_bookings.py --receipts 40 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+RECEIPT = {
+    "service_type": "LUZ",
+    "company": "ELECTRODUNAS",
+    "amount_total": 150.50,
+    "date_expired": "25/01/2027",
+    "consumption_period": "Diciembre 2026",
+    "attendee_email": "usuario@ejemplo.com",
+    "attendee_name": "Juan Pérez",
+}
+
+
+def start_fake_calcom(handshake_ms: float, latency_ms: float) -> tuple[ThreadingHTTPServer, dict]:
+    """CAL.COM falso: cuenta conexiones y responde cada reserva tras `latency_ms`."""
+    stats = {"connections": 0, "bookings": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats["connections"] += 1
+            time.sleep(handshake_ms / 1000)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency_ms / 1000)
+            with lock:
+                stats["bookings"] += 1
+                uid = f"booking-{stats['bookings']}"
+            body = json.dumps({"status": "success", "data": {"uid": uid}}).encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+async def legacy_receipt(service) -> None:
+    """Implementación anterior: cliente nuevo por reserva, reservas secuenciales."""
+    import httpx
+
+    due_date = service._parse_date(RECEIPT["date_expired"])
+    for date_time, offset in ((due_date, -60), (due_date, -120)):
+        payload = service._create_booking_payload(
+            date_time, "Recordatorio", "", RECEIPT["attendee_email"], RECEIPT["attendee_name"], None, offset
+        )
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(f"{service.base_url}/bookings", json=payload)
+            response.raise_for_status()
+
+
+async def shared_receipt(service) -> None:
+    """Implementación actual: cliente compartido, reservas en paralelo."""
+    notifications = await service.schedule_payment_notifications(**RECEIPT)
+    assert len(notifications) == 2, notifications
+
+
+async def run(receipt, service, receipts: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await receipt(service)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(receipts)))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return statistics.quantiles(values, n=100)[int(fraction * 100) - 1] if len(values) > 1 else values[0]
+
+
+async def main_async(args) -> None:
+    from maivi_agent.infrastructure.calcom_notification_service import (
+        BOOKING_DURATION, CONNECTIONS_OPENED, CalComNotificationService
+    )
+
+    server, stats = start_fake_calcom(args.handshake_ms, args.latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print("=" * 78)
+    print(f"{args.receipts} recibos (2 reservas c/u), {args.concurrency} en paralelo, "
+          f"conexión {args.handshake_ms:.0f} ms, reserva {args.latency_ms:.0f} ms")
+    print("=" * 78)
+    print(f"{'versión':<22} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9} {'reservas':>9} {'conexiones':>11}")
+
+    # Una reserva previa para que la carga de módulos de httpx no caiga en la primera medición
+    await legacy_receipt(CalComNotificationService(base_url=base_url, http2=False))
+
+    cases = (("antes (cliente/reserva)", legacy_receipt), ("cliente compartido", shared_receipt))
+    for label, receipt in cases:
+        service = CalComNotificationService(base_url=base_url, http2=False)
+        stats.update(connections=0, bookings=0)
+        latencies, elapsed = await run(receipt, service, args.receipts, args.concurrency)
+        await service.aclose()
+        print(f"{label:<22} {percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.95):>9.1f} "
+              f"{elapsed:>9.2f} {stats['bookings']:>9} {stats['connections']:>11}")
+    print()
+    print(f"Métricas del servicio: maivi_calcom_connections_opened_total={CONNECTIONS_OPENED.value():.0f}, "
+          f"reserva p50={BOOKING_DURATION.percentile(0.5, outcome='ok') * 1000:.0f} ms "
+          f"p95={BOOKING_DURATION.percentile(0.95, outcome='ok') * 1000:.0f} ms")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=40, help="Recibos a notificar")
+    parser.add_argument("--concurrency", type=int, default=4, help="Recibos en paralelo")
+    parser.add_argument("--handshake-ms", type=float, default=60, help="Coste de abrir una conexión (DNS+TCP+TLS)")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Latencia de cada reserva")
+    args = parser.parse_args()
+
+    # El servicio solo agenda con CAL.COM configurado; el servidor falso acepta cualquier clave
+    os.environ.setdefault("CALCOM_API_KEY", "cal_benchmark")
+    os.environ.setdefault("CALCOM_EVENT_TYPE_ID", "1")
+    logging.disable(logging.INFO)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
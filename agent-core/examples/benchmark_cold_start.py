@@ -0,0 +1,103 @@
+"""
+Benchmark: tiempo de arranque en frío y latencia de la primera petición.
+
+Levanta el servicio (src/app.py) en un subproceso y mide:
+- Tiempo hasta que /health responde (arranque en frío completo, incluido el lifespan)
+- Tiempo que el propio lifespan reporta en /health (startup_seconds)
+- Latencia de la primera petición a la API frente a las siguientes
+
+Uso (desde agent-core/, con el .env configurado):
+    python examples/benchmark_cold_start.py --runs 3 --workers 1
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+PROBE_PATH = "/api/receipts/admission/status"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(workers: int, warm_requests: int) -> dict:
+    port = free_port()
+    env = {**os.environ, "API_HOST": "127.0.0.1", "API_PORT": str(port), "API_WORKERS": str(workers)}
+    base_url = f"http://127.0.0.1:{port}"
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "src" / "app.py")],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=5.0) as client:
+            health = None
+            while health is None:
+                if process.poll() is not None:
+                    raise RuntimeError("El servicio terminó antes de estar listo (revisa el .env)")
+                try:
+                    response = client.get("/health")
+                    if response.status_code == 200:
+                        health = response.json()
+                except httpx.TransportError:
+                    time.sleep(0.02)
+            ready_seconds = time.perf_counter() - started
+
+            def timed_get() -> float:
+                t0 = time.perf_counter()
+                client.get(PROBE_PATH).raise_for_status()
+                return (time.perf_counter() - t0) * 1000
+
+            first_ms = timed_get()
+            warm_ms = [timed_get() for _ in range(warm_requests)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    return {
+        "ready_seconds": ready_seconds,
+        "lifespan_seconds": health.get("startup_seconds") or 0.0,
+        "first_ms": first_ms,
+        "warm_ms": statistics.median(warm_ms),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Arranques medidos")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--warm-requests", type=int, default=20, help="Peticiones tras la primera")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Arranque en frío de Maivi Agent ({args.runs} arranques, {args.workers} worker(s))")
+    print("=" * 72)
+    print(f"{'run':<5} {'listo s':>10} {'lifespan s':>12} {'1ª petición ms':>16} {'siguientes ms':>15}")
+
+    results = []
+    for run in range(1, args.runs + 1):
+        r = measure_once(args.workers, args.warm_requests)
+        results.append(r)
+        print(f"{run:<5} {r['ready_seconds']:>10.2f} {r['lifespan_seconds']:>12.2f} "
+              f"{r['first_ms']:>16.2f} {r['warm_ms']:>15.2f}")
+
+    print("-" * 72)
+    print(f"{'media':<5} {statistics.mean(r['ready_seconds'] for r in results):>10.2f} "
+          f"{statistics.mean(r['lifespan_seconds'] for r in results):>12.2f} "
+          f"{statistics.mean(r['first_ms'] for r in results):>16.2f} "
+          f"{statistics.mean(r['warm_ms'] for r in results):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
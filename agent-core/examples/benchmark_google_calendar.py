@@ -0,0 +1,213 @@
+"""
+Benchmark: programar los recordatorios de cientos de recibos en Google Calendar.
+
+Levanta una API de Calendar falsa en local (inserción de eventos y endpoint
+batch multipart/mixed) que responde cada petición HTTP tras `--latency-ms`, y
+programa los dos recordatorios de `--receipts` recibos de tres formas:
+- antes: `.execute()` en la corrutina, un evento detrás de otro, bloqueando el
+  event loop durante cada petición
+- pool: `schedule_payment_notifications` por recibo (`--concurrency` en
+  paralelo), con las llamadas en el pool de GOOGLE_CALENDAR_MAX_WORKERS hilos
+- batch: `schedule_payment_notifications_bulk`, GOOGLE_CALENDAR_BATCH_SIZE
+  eventos por petición
+
+Una tarea testigo duerme intervalos de 5 ms y mide cuánto se retrasa cada
+despertar: es el tiempo en que el event loop estuvo bloqueado. El servidor falso
+corre en el mismo proceso, así que con pool y batch parte de ese retraso es
+competencia por el GIL con sus hilos.
+
+Uso (desde agent-core/):
+    python examples/benchmark_google_calendar.py --receipts 300
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+TICK_SECONDS = 0.005
+
+
+def receipt(index: int) -> dict:
+    return {
+        "service_type": "LUZ",
+        "company": "ENEL",
+        "amount_total": round(100 + index / 100, 2),
+        "date_expired": "20/02/2027",
+        "consumption_period": "Enero 2027",
+        "attendee_email": f"usuario{index}@ejemplo.com",
+        "attendee_name": "Juan Pérez",
+    }
+
+
+def start_fake_calendar(latency_ms: float, per_event_ms: float) -> tuple[ThreadingHTTPServer, dict]:
+    """API de Calendar falsa: cuenta peticiones HTTP y eventos creados."""
+    stats = {"requests": 0, "events": 0}
+    lock = threading.Lock()
+
+    def create_event(body: bytes) -> bytes:
+        event = json.loads(body or b"{}")
+        event["id"] = uuid.uuid4().hex
+        event["htmlLink"] = f"https://calendar.google.com/event?eid={event['id']}"
+        with lock:
+            stats["events"] += 1
+        return json.dumps(event).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                stats["requests"] += 1
+            if self.path.startswith("/batch"):
+                content_type, payload = self._batch(body)
+            else:
+                time.sleep((latency_ms + per_event_ms) / 1000)
+                content_type, payload = "application/json", create_event(body)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _batch(self, body: bytes) -> tuple[str, bytes]:
+            boundary = self.headers["Content-Type"].split("boundary=")[1].strip('"')
+            parts = [part for part in body.split(f"--{boundary}".encode()) if b"Content-ID" in part]
+            time.sleep((latency_ms + per_event_ms * len(parts)) / 1000)
+            response_boundary = f"batch_{uuid.uuid4().hex}"
+            chunks = []
+            for part in parts:
+                headers, _, inner = part.partition(b"\r\n\r\n")
+                content_id = next(line.split(b":", 1)[1].strip() for line in headers.splitlines()
+                                  if line.lower().startswith(b"content-id"))
+                inner_body = inner.partition(b"\r\n\r\n")[2].rstrip(b"\r\n")
+                event = create_event(inner_body)
+                chunks.append(
+                    f"--{response_boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id.decode().strip('<>')}>\r\n\r\n"
+                    f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(event)}\r\n\r\n".encode() + event + b"\r\n"
+                )
+            chunks.append(f"--{response_boundary}--\r\n".encode())
+            return f"multipart/mixed; boundary={response_boundary}", b"".join(chunks)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+class LoopStallMonitor:
+    """Mide el retraso de una tarea que despierta cada TICK_SECONDS."""
+
+    def __init__(self):
+        self.lags_ms: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            self.lags_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def legacy(service, receipts: list[dict], concurrency: int) -> int:
+    """Implementación anterior: `events()` y `.execute()` bloqueantes dentro de la corrutina."""
+    created = 0
+    for data in receipts:
+        for _, payload, has_attendees in service._build_reminders(**data):
+            service.service.events().insert(
+                calendarId=service.calendar_id,
+                body=payload,
+                sendUpdates='all' if has_attendees else 'none'
+            ).execute()
+            created += 1
+    return created
+
+
+async def pooled(service, receipts: list[dict], concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(data: dict) -> int:
+        async with semaphore:
+            return len(await service.schedule_payment_notifications(**data))
+
+    return sum(await asyncio.gather(*(one(data) for data in receipts)))
+
+
+async def bulk(service, receipts: list[dict], concurrency: int) -> int:
+    return sum(map(len, await service.schedule_payment_notifications_bulk(receipts)))
+
+
+async def main_async(args) -> None:
+    from google.auth.credentials import AnonymousCredentials
+    from maivi_agent.infrastructure.google_calendar_service import GoogleCalendarNotificationService
+
+    server, stats = start_fake_calendar(args.latency_ms, args.per_event_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    receipts = [receipt(index) for index in range(args.receipts)]
+
+    print("=" * 88)
+    print(f"{args.receipts} recibos ({args.receipts * 2} eventos), petición {args.latency_ms:.0f} ms "
+          f"+ {args.per_event_ms:.0f} ms/evento, {args.workers} hilos, batch de {args.batch_size}")
+    print("=" * 88)
+    print(f"{'versión':<8} {'total s':>9} {'eventos/s':>10} {'eventos':>8} {'peticiones':>11} "
+          f"{'loop bloqueado ms':>18} {'máx ms':>8}")
+    for label, implementation in (("antes", legacy), ("pool", pooled), ("batch", bulk)):
+        service = GoogleCalendarNotificationService(
+            max_workers=args.workers,
+            batch_size=args.batch_size,
+            credentials=AnonymousCredentials(),
+            api_endpoint=f"{base_url}/calendar/v3/",
+            batch_uri=f"{base_url}/batch/calendar/v3"
+        )
+        stats.update(requests=0, events=0)
+        with LoopStallMonitor() as monitor:
+            # Que la tarea testigo arranque antes y registre el último despertar después
+            await asyncio.sleep(0)
+            started = time.perf_counter()
+            created = await implementation(service, receipts, args.concurrency)
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(TICK_SECONDS * 2)
+        await service.aclose()
+        print(f"{label:<8} {elapsed:>9.2f} {created / elapsed:>10.0f} {created:>8} {stats['requests']:>11} "
+              f"{sum(monitor.lags_ms):>18.0f} {max(monitor.lags_ms, default=0):>8.0f}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=300, help="Recibos a notificar")
+    parser.add_argument("--concurrency", type=int, default=8, help="Recibos en paralelo (modo pool)")
+    parser.add_argument("--workers", type=int, default=4, help="Hilos del pool (GOOGLE_CALENDAR_MAX_WORKERS)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Eventos por batch (GOOGLE_CALENDAR_BATCH_SIZE)")
+    parser.add_argument("--latency-ms", type=float, default=60, help="Latencia de cada petición HTTP")
+    parser.add_argument("--per-event-ms", type=float, default=2, help="Tiempo de servidor por evento")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_CALENDAR_ID", "benchmark@group.calendar.google.com")
+    logging.disable(logging.INFO)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
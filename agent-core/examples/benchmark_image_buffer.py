@@ -0,0 +1,125 @@
+"""
+Benchmark: copias de la imagen por petición, antes y después de `ImageBuffer`.
+
+Recorre las etapas que toca la imagen en una petición (recepción, clave de
+idempotencia, clasificación y extracción con el LLM, almacenamiento) con las dos
+implementaciones:
+- antes: la imagen viaja en el estado como texto base64 (JSON) o bytes (binario);
+  cada llamada al LLM vuelve a codificarla y arma su data URL, la clave de
+  idempotencia hashea el texto y el almacenamiento decodifica y hashea otra vez
+- después: `ImageBuffer` decodifica y hashea una sola vez; la data URL se arma
+  la primera vez que se pide (con el texto recibido, si llegó en base64) y la
+  reutilizan ambas llamadas al LLM
+
+tracemalloc mide, por etapa, los bytes asignados (pico de la etapa) y el total
+por petición. La construcción del prompt de LangChain y la subida quedan fuera:
+son iguales en ambos casos.
+
+Uso (desde agent-core/):
+    python examples/benchmark_image_buffer.py --size-mb 3
+"""
+import argparse
+import base64
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from shared.image_buffer import ImageBuffer
+
+LLM_CALLS = ("clasificación", "extracción")
+
+
+class StageMeter:
+    """Pico de memoria asignada en cada etapa de una petición."""
+
+    def __init__(self):
+        self.stages: dict[str, int] = {}
+
+    def measure(self, name: str, operation):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = operation()
+        _, peak = tracemalloc.get_traced_memory()
+        self.stages[name] = self.stages.get(name, 0) + peak - before
+        return result
+
+
+def legacy_request(meter: StageMeter, body_base64: str, raw: bytes) -> None:
+    """Implementación anterior: base64 en el estado y recodificación en cada etapa."""
+    state = meter.measure("recepción", lambda: {
+        "image_base64": body_base64 or "",
+        "image_bytes": raw,
+        # El binario se hasheaba al leerlo por bloques; el JSON no
+        "image_sha256": hashlib.sha256(raw).hexdigest() if raw else None,
+    })
+    meter.measure("idempotencia", lambda: state["image_sha256"] or hashlib.sha256(state["image_base64"].encode()).hexdigest())
+    for name in LLM_CALLS:
+        def data_url():
+            image_base64 = base64.b64encode(raw).decode("ascii") if raw else state["image_base64"]
+            return f"data:image/jpeg;base64,{image_base64}"
+        meter.measure(name, data_url)
+
+    def store():
+        data = raw if raw else base64.b64decode(state["image_base64"])
+        return hashlib.sha256(data).hexdigest()
+    meter.measure("almacenamiento", store)
+
+
+def buffer_request(meter: StageMeter, body_base64: str, raw: bytes) -> None:
+    """Implementación con ImageBuffer: una decodificación, un hash y una data URL."""
+    image = meter.measure(
+        "recepción",
+        lambda: ImageBuffer.from_base64(body_base64) if body_base64 else ImageBuffer.from_bytes(raw)
+    )
+    meter.measure("idempotencia", lambda: hashlib.sha256(image.sha256.encode()).hexdigest())
+    for name in LLM_CALLS:
+        meter.measure(name, lambda: image.data_url)
+    meter.measure("almacenamiento", lambda: image.sha256)
+
+
+def run(implementation, body_base64: str, raw: bytes, iterations: int) -> tuple[dict[str, int], float]:
+    meter = StageMeter()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        implementation(meter, body_base64, raw)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+    tracemalloc.stop()
+    return {name: size // iterations for name, size in meter.stages.items()}, elapsed_ms
+
+
+def mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=3, help="Tamaño de la imagen")
+    parser.add_argument("--iterations", type=int, default=10, help="Peticiones por caso")
+    args = parser.parse_args()
+
+    image = b"\xff\xd8\xff" + os.urandom(int(args.size_mb * 1024 * 1024))
+    inputs = {
+        "json": (base64.b64encode(image).decode("ascii"), None),
+        "binario": (None, image),
+    }
+    stages = ("recepción", "idempotencia", *LLM_CALLS, "almacenamiento")
+
+    print("=" * 102)
+    print(f"MB asignados por etapa para una imagen de {args.size_mb} MB ({args.iterations} peticiones por caso)")
+    print("=" * 102)
+    print(f"{'entrada':<8} {'versión':<12}" + "".join(f"{stage:>15}" for stage in stages) + f"{'total':>9}{'ms':>7}")
+    for mode, (body_base64, raw) in inputs.items():
+        for label, implementation in (("antes", legacy_request), ("ImageBuffer", buffer_request)):
+            sizes, elapsed_ms = run(implementation, body_base64, raw, args.iterations)
+            print(f"{mode:<8} {label:<12}" + "".join(f"{mb(sizes[stage]):>15}" for stage in stages)
+                  + f"{mb(sum(sizes.values())):>9}{elapsed_ms:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark: imagen en base64 dentro de JSON vs. multipart vs. octet-stream.
+
+Mide, para cada modo de envío, el tiempo que tarda FastAPI en dejar la imagen
+lista en bytes dentro del endpoint (parseo + validación + decodificación) y el
+pico de memoria residente (RSS) del proceso.
+
+Cada modo se ejecuta en un subproceso independiente para que el pico de RSS
+de un modo no contamine la medición del siguiente.
+
+Uso:
+    python examples/benchmark_image_upload.py --size-mb 4 --iterations 20
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+MODES = ("json", "multipart", "raw")
+CHUNK_SIZE = 64 * 1024
+BOUNDARY = "maivi-benchmark-boundary"
+
+
+def build_app():
+    """Crea una app mínima con los mismos mecanismos de lectura que /api/receipts."""
+    from fastapi import FastAPI, File, Form, Request, UploadFile
+    from api.routes.receipts import ImageRequest, _decode_base64, _iter_upload_file, _read_limited
+
+    app = FastAPI()
+    max_bytes = 64 * 1024 * 1024
+
+    @app.post("/json")
+    async def json_route(request: ImageRequest):
+        image = await _decode_base64(request.image_base64)
+        return {"size": len(image), "sha256": image.sha256}
+
+    @app.post("/multipart")
+    async def multipart_route(phone_number: str = Form(...), image: UploadFile = File(...)):
+        buffer = await _read_limited(_iter_upload_file(image), max_bytes)
+        return {"size": len(buffer), "sha256": buffer.sha256}
+
+    @app.post("/raw")
+    async def raw_route(request: Request):
+        image = await _read_limited(request.stream(), max_bytes)
+        return {"size": len(image), "sha256": image.sha256}
+
+    return app
+
+
+def build_body(mode: str, image: bytes) -> tuple[bytes, str]:
+    """Construye el cuerpo HTTP tal como lo enviaría el canal de WhatsApp."""
+    if mode == "json":
+        body = json.dumps({
+            "phone_number": "51987654321",
+            "image_base64": base64.b64encode(image).decode("ascii")
+        }).encode()
+        return body, "application/json"
+
+    if mode == "multipart":
+        body = (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="phone_number"\r\n\r\n'
+            "51987654321\r\n"
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="image"; filename="recibo.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+        ).encode() + image + f"\r\n--{BOUNDARY}--\r\n".encode()
+        return body, f"multipart/form-data; boundary={BOUNDARY}"
+
+    return image, "application/octet-stream"
+
+
+async def send_request(app, path: str, body: bytes, content_type: str) -> int:
+    """Invoca la app ASGI directamente, entregando el cuerpo por bloques como un socket."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+    view = memoryview(body)
+    offsets = iter(range(0, len(body), CHUNK_SIZE))
+    status = {}
+
+    async def receive():
+        offset = next(offsets, None)
+        if offset is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        chunk = bytes(view[offset:offset + CHUNK_SIZE])
+        return {"type": "http.request", "body": chunk, "more_body": offset + CHUNK_SIZE < len(body)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code", 0)
+
+
+async def run_mode(mode: str, size_mb: float, iterations: int) -> dict:
+    app = build_app()
+    image = os.urandom(int(size_mb * 1024 * 1024))
+    body, content_type = build_body(mode, image)
+    del image
+
+    # Calentamiento (importaciones perezosas, caches del framework)
+    await send_request(app, f"/{mode}", body, content_type)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        code = await send_request(app, f"/{mode}", body, content_type)
+        timings.append((time.perf_counter() - start) * 1000)
+        if code != 200:
+            raise RuntimeError(f"El modo {mode} respondió HTTP {code}")
+
+    timings.sort()
+    return {
+        "mode": mode,
+        "wire_bytes": len(body),
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        # ru_maxrss está en KiB en Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Tamaño de la imagen simulada en MB")
+    parser.add_argument("--iterations", type=int, default=20, help="Peticiones medidas por modo")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = asyncio.run(run_mode(args.mode, args.size_mb, args.iterations))
+        print(json.dumps(result))
+        return
+
+    print("=" * 72)
+    print(f"Benchmark de subida de imágenes ({args.size_mb} MB, {args.iterations} iteraciones)")
+    print("=" * 72)
+    print(f"{'modo':<10} {'bytes en red':>14} {'media ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'pico RSS MB':>12}")
+
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode,
+             "--size-mb", str(args.size_mb), "--iterations", str(args.iterations)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(output)
+        print(f"{r['mode']:<10} {r['wire_bytes']:>14,} {r['mean_ms']:>10.2f} {r['p50_ms']:>10.2f} "
+              f"{r['p95_ms']:>10.2f} {r['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
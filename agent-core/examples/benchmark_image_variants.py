@@ -0,0 +1,117 @@
+"""
+Benchmark: ahorro de almacenamiento y ancho de banda al transcodificar recibos.
+
+Genera una foto sintética de un recibo a resolución de cámara (papel con texto
+sobre fondo gris y ruido de sensor), en PNG y en JPEG como llegan de WhatsApp,
+y la pasa por `ImageTranscoder` con cada formato y calidad. Para cada caso
+muestra el tamaño del original, de la imagen completa, de la vista previa y de
+la miniatura, el ahorro de la imagen completa y el tiempo de CPU.
+
+Al final sube la misma imagen dos veces con `LocalImageStorage` en un
+directorio temporal: la primera guarda las tres variantes, la segunda sale del
+índice sin volver a transcodificar.
+
+Requiere Pillow (`pip install pillow`).
+
+Uso (desde agent-core/):
+    python examples/benchmark_image_variants.py --width 3024 --height 4032
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+CASES = (("webp", 70), ("webp", 80), ("webp", 90), ("jpeg", 80), ("jpeg", 90))
+
+
+def build_receipt_photo(width: int, height: int):
+    """Foto sintética de un recibo: papel blanco con líneas de texto, fondo gris y ruido."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (width, height), (118, 112, 104))
+    draw = ImageDraw.Draw(image)
+    margin_x, margin_y = width // 8, height // 12
+    draw.rectangle((margin_x, margin_y, width - margin_x, height - margin_y), fill=(246, 244, 238))
+
+    line_height = max(12, height // 70)
+    for row, y in enumerate(range(margin_y + line_height * 2, height - margin_y - line_height * 2, line_height * 2)):
+        text = f"{row:03d} CONSUMO KWH {row * 17 % 900:>4}   S/ {row * 3.7:8.2f}   VENCE 2026-{row % 12 + 1:02d}-15"
+        draw.text((margin_x + line_height, y), text, fill=(30, 30, 30), font_size=line_height)
+
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    return Image.blend(image, noise, 0.08)
+
+
+def encode(image, pillow_format: str) -> bytes:
+    buffer = BytesIO()
+    if pillow_format == "JPEG":
+        image.save(buffer, "JPEG", quality=92)
+    else:
+        image.save(buffer, pillow_format)
+    return buffer.getvalue()
+
+
+def kb(size: int) -> str:
+    return f"{size / 1024:,.0f}"
+
+
+async def store_twice(data: bytes) -> None:
+    from maivi_agent.infrastructure.image_transcoder import ImageTranscoder
+    from maivi_agent.infrastructure.local_image_storage import LocalImageStorage
+
+    with tempfile.TemporaryDirectory() as root:
+        storage = LocalImageStorage(root_dir=root, transcoder=ImageTranscoder())
+        for attempt in ("primera", "segunda"):
+            started = time.perf_counter()
+            stored = await storage.upload_image_variants(data, "LUZ", tags="LUZ")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"  {attempt} subida: {elapsed_ms:7.1f} ms -> {Path(stored.url).name}")
+        files = sorted(path for path in Path(root).rglob("*") if path.is_file())
+        for path in files:
+            print(f"    {path.name:<80} {kb(path.stat().st_size):>8} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=3024, help="Ancho de la foto")
+    parser.add_argument("--height", type=int, default=4032, help="Alto de la foto")
+    args = parser.parse_args()
+
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        sys.exit("Este benchmark necesita Pillow: pip install pillow")
+    from maivi_agent.infrastructure.image_transcoder import ImageTranscoder
+
+    logging.disable(logging.INFO)
+    photo = build_receipt_photo(args.width, args.height)
+    inputs = {"png": encode(photo, "PNG"), "jpg": encode(photo, "JPEG")}
+
+    print("=" * 86)
+    print(f"Transcodificación de un recibo de {args.width}x{args.height}")
+    print("=" * 86)
+    print(f"{'entrada':<8} {'salida':<10} {'original KB':>12} {'completa KB':>12} {'previa KB':>10} "
+          f"{'mini KB':>8} {'ahorro':>7} {'ms':>7}")
+    for extension, data in inputs.items():
+        for output_format, quality in CASES:
+            transcoder = ImageTranscoder(output_format=output_format, quality=quality)
+            started = time.perf_counter()
+            full, preview, thumbnail = transcoder.transcode(data, extension)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            saving = 1 - len(full.data) / len(data)
+            print(f"{extension:<8} {f'{output_format} q{quality}':<10} {kb(len(data)):>12} {kb(len(full.data)):>12} "
+                  f"{kb(len(preview.data)):>10} {kb(len(thumbnail.data)):>8} {saving:>7.0%} {elapsed_ms:>7.0f}")
+
+    print()
+    print("Almacenamiento local con el transcodificador por defecto (webp q80):")
+    asyncio.run(store_twice(inputs["png"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark: bloqueo del event loop al subir imágenes a ImageKit.
+
+Lanza N subidas concurrentes de imágenes de `--size-mb` MB mientras una tarea
+testigo duerme intervalos de 5 ms y mide cuánto se retrasa cada despertar (el
+tiempo en que el event loop estuvo bloqueado y ninguna otra petición avanzó).
+
+Modos:
+- sync: `ImageKit.files.upload` llamado desde la corrutina (implementación anterior)
+- async: `ImageStorageService.upload_image` sobre `AsyncImageKit` + aiohttp
+
+Las subidas van a un servidor local que imita el endpoint de subida de ImageKit
+(IMAGE_KIT_BASE_URL apunta a él): recibe el cuerpo completo, espera
+`--latency-ms` más el tiempo de transferir la imagen a `--bandwidth-mbps` y
+responde como ImageKit. No se sube nada a la cuenta real.
+
+Uso (desde agent-core/):
+    python examples/benchmark_imagekit_upload.py --concurrency 20 --size-mb 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+TICK_SECONDS = 0.005
+
+
+class LoopStallMonitor:
+    """Mide el retraso de una tarea que despierta cada TICK_SECONDS."""
+
+    def __init__(self):
+        self.lags_ms: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            self.lags_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags_ms) or [0.0]
+        return {
+            "stall_total_ms": sum(lags),
+            "stall_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+            "stall_max_ms": lags[-1],
+        }
+
+
+def start_fake_imagekit(latency_ms: float, bandwidth_mbps: float) -> ThreadingHTTPServer:
+    """Servidor HTTP local con la respuesta de `POST /api/v1/files/upload`."""
+
+    class UploadHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            size = int(self.headers.get("Content-Length", 0))
+            remaining = size
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+            time.sleep(latency_ms / 1000 + size * 8 / (bandwidth_mbps * 1_000_000))
+            body = json.dumps({
+                "fileId": f"benchmark-{threading.get_ident()}",
+                "name": "benchmark.png",
+                "url": "https://ik.imagekit.io/maivi/AGENT-AI/recibos/benchmark.png",
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_mode(mode: str, concurrency: int, image: bytes, max_concurrent: int) -> dict:
+    from imagekitio import ImageKit
+    from maivi_agent.infrastructure.image_storage_service import ImageStorageService
+
+    if mode == "sync":
+        client = ImageKit(private_key="benchmark")
+
+        async def upload(image: bytes):
+            # Implementación anterior: llamada síncrona dentro de la corrutina
+            return client.files.upload(file=image, file_name="benchmark.png", folder="/AGENT-AI/recibos").url
+
+        close = client.close
+    else:
+        service = ImageStorageService(max_concurrent_uploads=max_concurrent)
+
+        async def upload(image: bytes):
+            return await service.upload_image(file_doc=image, file_name="LUZ", tags=None)
+
+        close = service.aclose
+
+    # Imágenes distintas: el almacenamiento por contenido no volvería a subir una repetida
+    images = [image[:-8] + index.to_bytes(8, "big") for index in range(concurrency + 1)]
+
+    # Calentamiento: conexión y carga perezosa del SDK fuera de la medición
+    await upload(images.pop())
+
+    with LoopStallMonitor() as monitor:
+        started = time.perf_counter()
+        await asyncio.gather(*(upload(image) for image in images))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(TICK_SECONDS * 2)
+
+    result = close()
+    if asyncio.iscoroutine(result):
+        await result
+    return {"mode": mode, "elapsed_s": elapsed, "uploads_per_s": concurrency / elapsed, **monitor.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20, help="Subidas concurrentes")
+    parser.add_argument("--size-mb", type=float, default=3, help="Tamaño de cada imagen")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Latencia simulada de ImageKit por subida")
+    parser.add_argument("--bandwidth-mbps", type=float, default=200, help="Ancho de banda simulado por subida")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="IMAGEKIT_MAX_CONCURRENT_UPLOADS")
+    args = parser.parse_args()
+
+    # Un log INFO por subida ensuciaría la tabla
+    logging.disable(logging.INFO)
+    server = start_fake_imagekit(args.latency_ms, args.bandwidth_mbps)
+    os.environ["IMAGE_KIT_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    image = os.urandom(int(args.size_mb * 1024 * 1024))
+
+    print("=" * 78)
+    print(f"Subidas a ImageKit simulado ({args.concurrency} x {args.size_mb} MB, "
+          f"{args.latency_ms:.0f} ms + {args.bandwidth_mbps:.0f} Mbps)")
+    print("=" * 78)
+    print(f"{'modo':<6} {'total s':>9} {'subidas/s':>10} {'bloqueo ms':>11} {'p99 ms':>9} {'máx ms':>9}")
+    try:
+        for mode in ("sync", "async"):
+            r = asyncio.run(run_mode(mode, args.concurrency, image, args.max_concurrent))
+            print(f"{r['mode']:<6} {r['elapsed_s']:>9.2f} {r['uploads_per_s']:>10.1f} {r['stall_total_ms']:>11.0f} "
+                  f"{r['stall_p99_ms']:>9.1f} {r['stall_max_ms']:>9.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: tiempo de importación de la API frente a un presupuesto versionado.
+
+Ejecuta `python -X importtime -c "import app"` en subprocesos limpios, reporta la
+mediana del tiempo acumulado y los módulos más caros, y comprueba que las
+integraciones pesadas (LangChain, LangGraph, ImageKit, MongoDB, IPython...) no se
+carguen al importar. El presupuesto vive en examples/import_budget.json; el script
+termina con código 1 si se supera, para poder usarlo en CI.
+
+Uso (desde agent-core/):
+    python examples/benchmark_import_time.py --runs 5
+    python examples/benchmark_import_time.py --update-budget   # fija presupuesto = mediana x 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+BUDGET_FILE = Path(__file__).parent / "import_budget.json"
+
+
+def profile_import(module: str) -> dict[str, tuple[int, int]]:
+    """Importa el módulo en un proceso nuevo y devuelve {módulo: (propio µs, acumulado µs)}."""
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit(f"No se pudo importar '{module}' (revisa el .env):\n" + "\n".join(errors[-10:]))
+    stderr = process.stderr
+
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Importaciones medidas")
+    parser.add_argument("--top", type=int, default=15, help="Módulos más caros a mostrar")
+    parser.add_argument("--update-budget", action="store_true", help="Reescribe el presupuesto con la medición actual")
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGET_FILE.read_text())
+    module = budget["module"]
+
+    runs = [profile_import(module) for _ in range(args.runs)]
+    totals_ms = [run[module][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    last = runs[-1]
+
+    print("=" * 72)
+    print(f"Tiempo de importación de '{module}' ({args.runs} ejecuciones)")
+    print("=" * 72)
+    print(f"{'módulo':<48} {'propio ms':>10} {'acumulado ms':>12}")
+    top = sorted(last.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in top:
+        print(f"{name[:48]:<48} {self_us / 1000:>10.1f} {cumulative_us / 1000:>12.1f}")
+    print("-" * 72)
+    print(f"mediana: {median_ms:.0f} ms (min {min(totals_ms):.0f}, max {max(totals_ms):.0f}) "
+          f"| presupuesto: {budget['budget_ms']} ms")
+
+    if args.update_budget:
+        budget["budget_ms"] = int(median_ms * 1.5)
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2) + "\n")
+        print(f"Presupuesto actualizado a {budget['budget_ms']} ms")
+        return
+
+    loaded = sorted(name for name in budget["forbidden_modules"] if name in last)
+    failures = []
+    if median_ms > budget["budget_ms"]:
+        failures.append(f"la importación tarda {median_ms:.0f} ms (> {budget['budget_ms']} ms)")
+    if loaded:
+        failures.append(f"se importan integraciones pesadas: {', '.join(loaded)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
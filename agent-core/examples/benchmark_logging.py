@@ -0,0 +1,127 @@
+"""
+Benchmark: coste del logging por ejecución del grafo.
+
+Compara tres configuraciones, cada una en un subproceso propio:
+- legacy: init_logger relee logging.yml y llama a dictConfig en cada llamada,
+  y los handlers de consola y archivo escriben desde el hilo que loguea
+- cached_sync: configuración cargada una vez y loggers en caché, handlers síncronos
+- cached_queue: configuración actual (caché + QueueHandler/QueueListener)
+
+Una "ejecución del grafo" se simula con los loggers que se piden y los registros
+que emiten los nodos en un flujo completo. Se mide el tiempo que el hilo del
+event loop pasa dentro del logging (lo que bloquea al resto de peticiones).
+La consola se redirige a /dev/null y el archivo se escribe en un directorio temporal.
+
+Uso (desde agent-core/):
+    python examples/benchmark_logging.py --runs 500 --records-per-run 25
+"""
+import argparse
+import json
+import logging
+import logging.config
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+ROOT = Path(__file__).parent.parent
+MODES = ("legacy", "cached_sync", "cached_queue")
+
+
+def write_config(queued: bool) -> Path:
+    """Copia logging.yml adaptado al benchmark (consola a /dev/null, con o sin cola)."""
+    config = yaml.safe_load((ROOT / "logging.yml").read_text())
+    config["handlers"]["console"] = {
+        "class": "logging.FileHandler", "level": "INFO", "formatter": "simple", "filename": os.devnull
+    }
+    if not queued:
+        config["handlers"].pop("queue", None)
+        config["loggers"]["ai_service"]["handlers"] = ["console", "file"]
+
+    path = Path("logging_benchmark.yml").resolve()
+    path.write_text(yaml.safe_dump(config, allow_unicode=True))
+    return path
+
+
+def run_mode(mode: str, runs: int, loggers_per_run: int, records_per_run: int) -> dict:
+    from shared import init_logger as init_logger_module
+
+    config_path = write_config(queued=mode == "cached_queue")
+
+    if mode == "legacy":
+        def get_logger(name: str) -> logging.Logger:
+            # Réplica del init_logger original: parsea y aplica la configuración cada vez
+            with open(config_path, "r") as f:
+                logging.config.dictConfig(yaml.safe_load(f.read()))
+            return logging.getLogger(f"ai_service.{name}")
+    else:
+        init_logger_module.configure_logging(str(config_path))
+
+        def get_logger(name: str) -> logging.Logger:
+            return init_logger_module.init_logger(name)
+
+    timings = []
+    for run in range(runs):
+        started = time.perf_counter()
+        for index in range(loggers_per_run):
+            log = get_logger(f"Node{index}")
+        for index in range(records_per_run):
+            log.info(f"📝 Registro {index} de la ejecución {run} para 51987654321")
+        timings.append((time.perf_counter() - started) * 1_000_000)
+
+    flush_started = time.perf_counter()
+    init_logger_module.shutdown_logging()
+    logging.shutdown()
+    flush_ms = (time.perf_counter() - flush_started) * 1000
+
+    timings.sort()
+    return {
+        "mode": mode,
+        "mean_us": statistics.mean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "flush_ms": flush_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500, help="Ejecuciones simuladas del grafo")
+    parser.add_argument("--loggers-per-run", type=int, default=3, help="Llamadas a init_logger por ejecución")
+    parser.add_argument("--records-per-run", type=int, default=25, help="Registros INFO por ejecución")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = run_mode(args.mode, args.runs, args.loggers_per_run, args.records_per_run)
+        print(json.dumps(result))
+        return
+
+    print("=" * 72)
+    print(f"Logging por ejecución del grafo ({args.runs} ejecuciones, "
+          f"{args.loggers_per_run} loggers, {args.records_per_run} registros)")
+    print("=" * 72)
+    print(f"{'modo':<14} {'media µs':>10} {'p50 µs':>10} {'p99 µs':>10} {'vaciado ms':>12}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--runs", str(args.runs),
+                 "--loggers-per-run", str(args.loggers_per_run),
+                 "--records-per-run", str(args.records_per_run)],
+                cwd=workdir, check=True, capture_output=True, text=True
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(output)
+            print(f"{r['mode']:<14} {r['mean_us']:>10.1f} {r['p50_us']:>10.1f} "
+                  f"{r['p99_us']:>10.1f} {r['flush_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
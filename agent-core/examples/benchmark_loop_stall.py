@@ -0,0 +1,144 @@
+"""
+Benchmark: bloqueo del event loop al guardar recibos en MongoDB.
+
+Ejecuta N "ejecuciones del grafo" concurrentes que guardan recibos mientras una
+tarea testigo duerme intervalos de 5 ms y mide cuánto se retrasa cada despertar.
+Ese retraso es el tiempo en que el event loop estuvo bloqueado y ninguna otra
+petición pudo avanzar.
+
+Modos:
+- sync: pymongo.MongoClient llamado desde la corrutina (implementación anterior)
+- async: ReceiptsRepositoryImpl sobre pymongo.AsyncMongoClient
+
+Necesita un MongoDB accesible en DATABASE_URL. Los documentos se escriben en la
+colección `<COLLECTION_NAME>_benchmark`, que se elimina al terminar.
+
+Uso (desde agent-core/):
+    python examples/benchmark_loop_stall.py --concurrency 50 --inserts 20
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+TICK_SECONDS = 0.005
+
+
+class LoopStallMonitor:
+    """Mide el retraso de una tarea que despierta cada TICK_SECONDS."""
+
+    def __init__(self):
+        self.lags_ms: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            self.lags_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags_ms) or [0.0]
+        return {
+            "ticks": len(self.lags_ms),
+            "stall_total_ms": sum(lags),
+            "stall_p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+            "stall_max_ms": lags[-1],
+        }
+
+
+def build_receipt(index: int = 0):
+    """Recibo de prueba; el monto varía con el índice para no chocar con el índice único de recibos."""
+    from maivi_agent.domain.entities import ReceiptDataSave, Service
+
+    return ReceiptDataSave(
+        phone_number="51987654321",
+        service_type=Service.LUZ,
+        is_valid=True,
+        is_notified=False,
+        amount_total=round(100 + index / 100, 2),
+        date_expired="25/02/2026",
+        consumption_period="Diciembre 2025",
+        company="Luz del Sur",
+        link_receipt_image="https://ik.imagekit.io/maivi/benchmark.png"
+    )
+
+
+async def run_mode(mode: str, concurrency: int, inserts: int) -> dict:
+    import pymongo
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+    from shared.config import settings
+
+    receipts = itertools.count()
+
+    if mode == "sync":
+        client = pymongo.MongoClient(settings.DATABASE_URL)
+        collection = client[settings.DATABASE_NAME][settings.COLLECTION_NAME]
+
+        async def save():
+            # Así se llamaba antes desde persistence_data_node: bloquea el loop
+            collection.insert_one(build_receipt(next(receipts)).model_dump(mode="json"))
+
+        async def close():
+            collection.drop()
+            client.close()
+    else:
+        repository = ReceiptsRepositoryImpl()
+
+        async def save():
+            await repository.save_receipt(build_receipt(next(receipts)))
+
+        async def close():
+            await repository.db.drop()
+            await repository.close()
+
+    # Calentamiento: conexión y selección de servidor fuera de la medición
+    await save()
+
+    async def graph_run():
+        for _ in range(inserts):
+            await save()
+
+    with LoopStallMonitor() as monitor:
+        started = time.perf_counter()
+        await asyncio.gather(*(graph_run() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    await close()
+    return {"mode": mode, "elapsed_s": elapsed, "inserts_per_s": concurrency * inserts / elapsed, **monitor.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50, help="Ejecuciones del grafo concurrentes")
+    parser.add_argument("--inserts", type=int, default=20, help="Inserciones por ejecución")
+    args = parser.parse_args()
+
+    os.environ["COLLECTION_NAME"] = f"{os.environ.get('COLLECTION_NAME', 'receipts')}_benchmark"
+
+    print("=" * 84)
+    print(f"Bloqueo del event loop ({args.concurrency} ejecuciones x {args.inserts} inserciones)")
+    print("=" * 84)
+    print(f"{'modo':<7} {'total s':>9} {'ins/s':>9} {'ticks':>7} {'bloqueo total ms':>17} "
+          f"{'p99 ms':>9} {'máx ms':>9}")
+
+    for mode in ("sync", "async"):
+        r = asyncio.run(run_mode(mode, args.concurrency, args.inserts))
+        print(f"{r['mode']:<7} {r['elapsed_s']:>9.2f} {r['inserts_per_s']:>9.0f} {r['ticks']:>7} "
+              f"{r['stall_total_ms']:>17.1f} {r['stall_p99_ms']:>9.2f} {r['stall_max_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark: memoria y tiempo al recorrer muchos recibos.
+
+Compara las dos formas de leer los recibos de un usuario:
+- list: `get_receipts_by_service`, materializa todos los ReceiptDataSave validados
+- stream: `iter_receipts_by_service`, lotes del cursor con proyección y ReceiptRecord
+
+Mide con tracemalloc el pico de memoria de Python durante el recorrido.
+
+Por defecto usa el MongoDB de DATABASE_URL: siembra `--receipts` recibos en
+`<COLLECTION_NAME>_scan` y la elimina al terminar. Con `--fake` los documentos
+se generan en memoria lote a lote, como los devolvería el cursor, para
+ejecutarlo sin servidor.
+
+Uso (desde agent-core/):
+    python examples/benchmark_receipt_scan.py --receipts 50000
+    python examples/benchmark_receipt_scan.py --receipts 50000 --fake
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+PHONE = "51987654321"
+
+
+def build_document(index: int) -> dict:
+    from bson import ObjectId
+
+    return {
+        "_id": ObjectId(),
+        "phone_number": PHONE,
+        "service_type": "LUZ",
+        "is_valid": True,
+        "is_notified": index % 2 == 0,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index),
+        "amount_total": 100.0 + index,
+        "date_expired": datetime(2026, 2, index % 28 + 1, tzinfo=timezone.utc),
+        "consumption_period": "Enero 2026",
+        "company": "Luz del Sur",
+        "link_receipt_image": f"https://ik.imagekit.io/maivi/receipts/{PHONE}/{index:08d}.png",
+    }
+
+
+class FakeCursor:
+    """Cursor simulado: genera los documentos lote a lote y aplica la proyección."""
+
+    def __init__(self, total: int, projection: dict = None):
+        self.total = total
+        self.projection = projection
+        self._batch = 101
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size: int):
+        self._batch = size
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def __aiter__(self):
+        for start in range(0, self.total, self._batch):
+            batch = [build_document(index) for index in range(start, min(start + self._batch, self.total))]
+            if self.projection:
+                batch = [{k: v for k, v in doc.items() if k == "_id" or k in self.projection} for doc in batch]
+            # Cada lote es un viaje al servidor
+            await asyncio.sleep(0)
+            for document in batch:
+                yield document
+
+
+class FakeCollection:
+    def __init__(self, total: int):
+        self.total = total
+
+    def find(self, filter: dict, projection: dict = None):
+        return FakeCursor(self.total, projection)
+
+    async def drop(self):
+        pass
+
+
+async def measure(label: str, scan) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    count, total_amount = await scan()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mode": label, "count": count, "amount": total_amount, "elapsed_s": elapsed, "peak_mb": peak / 2**20}
+
+
+async def run(receipts: int, fake: bool, batch_size: int) -> list[dict]:
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+
+    repository = ReceiptsRepositoryImpl()
+    if fake:
+        repository.db = FakeCollection(receipts)
+    else:
+        await repository.db.drop()
+        for start in range(0, receipts, 5_000):
+            await repository.db.insert_many([build_document(i) for i in range(start, min(start + 5_000, receipts))])
+        await repository.ensure_indexes()
+
+    async def scan_list():
+        receipts_list = await repository.get_receipts_by_service(PHONE, "LUZ")
+        return len(receipts_list), sum(r.amount_total or 0 for r in receipts_list)
+
+    async def scan_stream():
+        count, total_amount = 0, 0.0
+        async for record in repository.iter_receipts_by_service(PHONE, "LUZ", batch_size=batch_size):
+            count += 1
+            total_amount += record.amount_total or 0
+        return count, total_amount
+
+    try:
+        return [await measure("list", scan_list), await measure("stream", scan_stream)]
+    finally:
+        await repository.db.drop()
+        await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=50_000, help="Recibos a recorrer")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tamaño de lote del cursor en modo stream")
+    parser.add_argument("--fake", action="store_true", help="Genera los documentos en memoria en lugar de usar MongoDB")
+    args = parser.parse_args()
+
+    os.environ["COLLECTION_NAME"] = f"{os.environ.get('COLLECTION_NAME', 'receipts')}_scan"
+
+    print("=" * 64)
+    print(f"Recorrido de {args.receipts} recibos ({'simulado' if args.fake else 'MongoDB'})")
+    print("=" * 64)
+    print(f"{'modo':<8} {'recibos':>9} {'total s':>9} {'pico MB':>9}")
+    for r in asyncio.run(run(args.receipts, args.fake, args.batch_size)):
+        print(f"{r['mode']:<8} {r['count']:>9} {r['elapsed_s']:>9.2f} {r['peak_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Migración: elimina los recibos duplicados antes de crear el índice único.
+
+El índice `receipt_natural_key` (teléfono, compañía, período y monto) no se
+puede crear mientras la colección tenga recibos repetidos, que se generaban al
+procesar la misma factura varias veces. Para cada grupo duplicado se conserva
+el documento más antiguo (y se marca como notificado si alguno de los
+duplicados lo estaba); el resto se elimina. Al final se crean los índices.
+
+Uso (desde agent-core/, con el .env configurado):
+    python examples/dedupe_receipts.py --dry-run
+    python examples/dedupe_receipts.py
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def duplicates_pipeline() -> list[dict]:
+    from maivi_agent.domain.entities import RECEIPT_NATURAL_KEY
+
+    return [
+        # Mismas condiciones que el filtro parcial del índice único
+        {"$match": {
+            "company": {"$type": "string"},
+            "consumption_period": {"$type": "string"},
+            "amount_total": {"$type": "number"},
+        }},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in RECEIPT_NATURAL_KEY},
+            "ids": {"$push": "$_id"},
+            "notified": {"$max": "$is_notified"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+
+
+async def dedupe(dry_run: bool) -> None:
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+
+    repository = ReceiptsRepositoryImpl()
+    try:
+        groups = removed = 0
+        cursor = await repository.db.aggregate(duplicates_pipeline(), allowDiskUse=True)
+        async for group in cursor:
+            groups += 1
+            keep, *extra = group["ids"]
+            removed += len(extra)
+            if dry_run:
+                continue
+            if group["notified"]:
+                await repository.db.update_one({"_id": keep}, {"$set": {"is_notified": True}})
+            await repository.db.delete_many({"_id": {"$in": extra}})
+
+        action = "a eliminar" if dry_run else "eliminados"
+        print(f"Grupos duplicados: {groups}, documentos {action}: {removed}")
+
+        if not dry_run:
+            await repository.ensure_indexes()
+            print("Índices del repositorio creados")
+    finally:
+        await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los duplicados")
+    args = parser.parse_args()
+    asyncio.run(dedupe(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
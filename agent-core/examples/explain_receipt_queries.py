@@ -0,0 +1,98 @@
+"""
+Verificación: las consultas del repositorio de recibos usan índices.
+
+Inserta unos recibos de prueba en `<COLLECTION_NAME>_explain`, crea los índices
+del repositorio y ejecuta `explain` sobre las consultas de
+`get_receipts_by_service`, `obtain_receipt_expire_by_date`, `get_receipt_history`
+y la búsqueda por clave natural de `save_receipt`. Falla (código 1) si el plan
+ganador hace un COLLSCAN o un SORT en memoria en lugar de recorrer un índice.
+La colección se elimina al terminar.
+
+Uso (desde agent-core/, con un MongoDB accesible en DATABASE_URL):
+    python examples/explain_receipt_queries.py
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def plan_stages(plan: dict) -> list[str]:
+    """Etapas del plan de ejecución, de la raíz a las hojas."""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def explain_all() -> bool:
+    from maivi_agent.domain.entities import ReceiptDataSave, Service
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+
+    repository = ReceiptsRepositoryImpl()
+    try:
+        await repository.db.drop()
+        await repository.save_receipts([
+            ReceiptDataSave(
+                phone_number=f"5198765{index:04d}",
+                service_type=[Service.LUZ, Service.AGUA, Service.GAS][index % 3],
+                is_valid=True,
+                is_notified=index % 2 == 0,
+                amount_total=100 + index,
+                date_expired=f"{index % 28 + 1:02d}/02/2026",
+                consumption_period="Enero 2026",
+                company="Luz del Sur",
+                link_receipt_image=None
+            )
+            for index in range(500)
+        ])
+        await repository.ensure_indexes()
+
+        queries = {
+            "get_receipts_by_service": repository.db.find(
+                {"phone_number": "51987650003", "service_type": "LUZ"}
+            ).sort("created_at", -1),
+            "obtain_receipt_expire_by_date": repository.db.find(
+                repository._expire_by_date_filter("25/02/2026")
+            ),
+            "get_receipt_history": repository.db.find(
+                {"phone_number": "51987650003"}
+            ).sort([("created_at", -1), ("_id", -1)]).limit(21),
+            "get_receipt_history (servicio)": repository.db.find(
+                {"phone_number": "51987650003", "service_type": "LUZ"}
+            ).sort([("created_at", -1), ("_id", -1)]).limit(21),
+            "save_receipt (clave natural)": repository.db.find({
+                "phone_number": "51987650003",
+                "company": "Luz del Sur",
+                "consumption_period": "Enero 2026",
+                "amount_total": 103,
+            }),
+        }
+
+        all_indexed = True
+        for name, cursor in queries.items():
+            explain = await cursor.explain()
+            winning = explain["queryPlanner"]["winningPlan"]
+            stages = plan_stages(winning)
+            indexed = "IXSCAN" in stages and "COLLSCAN" not in stages and "SORT" not in stages
+            all_indexed &= indexed
+            print(f"{'✅' if indexed else '❌'} {name:<32} {' <- '.join(filter(None, stages))}")
+        return all_indexed
+    finally:
+        await repository.db.drop()
+        await repository.close()
+
+
+def main():
+    os.environ["COLLECTION_NAME"] = f"{os.environ.get('COLLECTION_NAME', 'receipts')}_explain"
+    if not asyncio.run(explain_all()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
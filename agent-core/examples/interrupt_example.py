@@ -7,6 +7,8 @@ de recibos con reintentos automáticos cuando la clasificación falla.
 
 import asyncio
 from maivi_agent.application.graph import get_workflow
+from maivi_agent.application.inflight_images import get_inflight_images
+from shared.image_buffer import ImageBuffer
 from shared.init_logger import init_logger
 
 log = init_logger("InterruptExample")
@@ -29,9 +31,11 @@ async def simulate_receipt_processing():
     log.info("INTENTO 1: Usuario envía primera imagen (borrosa)")
     log.info("=" * 60)
     
-    # Estado inicial con la primera imagen
+    # Estado inicial con la primera imagen: el estado lleva su hash y los nodos
+    # leen los bytes del registro de imágenes en proceso
+    image = ImageBuffer.from_bytes(b"imagen_borrosa...")  # En realidad serían los bytes de la foto
     initial_state = {
-        "image_base64": "imagen_borrosa_base64...",  # En realidad sería base64 real
+        "image_sha256": image.sha256,
         "phone_number": phone_number,
         "intent_count": 0,
         "limit_intents": 3,
@@ -43,7 +47,8 @@ async def simulate_receipt_processing():
     }
     
     # Ejecutar el grafo
-    result = await graph.ainvoke(initial_state, config)
+    with get_inflight_images().hold(image):
+        result = await graph.ainvoke(initial_state, config)
     
     log.info(f"✅ Resultado intento 1:")
     log.info(f"   - service_type: {result.get('service_type')}")
@@ -70,14 +75,16 @@ async def simulate_receipt_processing():
         log.info("=" * 60)
         
         # Actualizar estado con nueva imagen
+        image = ImageBuffer.from_bytes(b"imagen_clara...")  # Nueva imagen
         updated_state = {
             **current_state.values,  # Preserva intent_count, limit_intents, etc.
-            "image_base64": "imagen_clara_base64...",  # Nueva imagen
+            "image_sha256": image.sha256,
             "waiting_for_image": False  # Resetear flag
         }
         
         # Continuar desde donde se pausó
-        result = await graph.ainvoke(updated_state, config)
+        with get_inflight_images().hold(image):
+            result = await graph.ainvoke(updated_state, config)
         
         log.info(f"✅ Resultado intento 2:")
         log.info(f"   - service_type: {result.get('service_type')}")
@@ -108,8 +115,9 @@ async def simulate_max_retries():
     graph = get_workflow()
     config = {"configurable": {"thread_id": "573987654321"}}
     
+    image = ImageBuffer.from_bytes(b"imagen_invalida_1...")
     initial_state = {
-        "image_base64": "imagen_invalida_1_base64...",
+        "image_sha256": image.sha256,
         "phone_number": "573987654321",
         "intent_count": 0,
         "limit_intents": 3,
@@ -124,15 +132,18 @@ async def simulate_max_retries():
         log.info(f"\n🔄 Intento {attempt}/3")
         
         if attempt == 1:
-            result = await graph.ainvoke(initial_state, config)
+            with get_inflight_images().hold(image):
+                result = await graph.ainvoke(initial_state, config)
         else:
             current = graph.get_state(config)
+            image = ImageBuffer.from_bytes(f"imagen_invalida_{attempt}...".encode())
             updated = {
                 **current.values,
-                "image_base64": f"imagen_invalida_{attempt}_base64...",
+                "image_sha256": image.sha256,
                 "waiting_for_image": False
             }
-            result = await graph.ainvoke(updated, config)
+            with get_inflight_images().hold(image):
+                result = await graph.ainvoke(updated, config)
         
         log.info(f"   intent_count: {result.get('intent_count')}")
         log.info(f"   service_type: {result.get('service_type')}")
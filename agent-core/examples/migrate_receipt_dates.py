@@ -0,0 +1,75 @@
+"""
+Migración: fechas de los recibos como datetime UTC y campo is_notified.
+
+Los documentos guardados antes de este cambio tienen:
+- date_expired como texto dd/MM/yyyy (no admite consultas por rango)
+- created_at como texto ISO 8601
+- notified en lugar de is_notified (lo escribía mark_as_notified)
+
+La migración se hace en el servidor con actualizaciones por pipeline, es
+idempotente (solo toca documentos con el formato antiguo) y al final crea los
+índices del repositorio. Las fechas ilegibles quedan en null.
+
+Uso (desde agent-core/, con el .env configurado):
+    python examples/migrate_receipt_dates.py --dry-run
+    python examples/migrate_receipt_dates.py
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+MIGRATIONS = [
+    (
+        "date_expired dd/MM/yyyy -> datetime UTC",
+        {"date_expired": {"$type": "string"}},
+        [{"$set": {"date_expired": {"$dateFromString": {
+            "dateString": "$date_expired", "format": "%d/%m/%Y", "timezone": "UTC",
+            "onError": None, "onNull": None
+        }}}}],
+    ),
+    (
+        "created_at ISO 8601 -> datetime UTC",
+        {"created_at": {"$type": "string"}},
+        [{"$set": {"created_at": {"$dateFromString": {"dateString": "$created_at", "onError": "$$NOW"}}}}],
+    ),
+    (
+        "notified -> is_notified",
+        {"notified": {"$exists": True}},
+        [{"$set": {"is_notified": {"$or": [{"$eq": ["$is_notified", True]}, {"$eq": ["$notified", True]}]}}},
+         {"$unset": "notified"}],
+    ),
+]
+
+
+async def migrate(dry_run: bool) -> None:
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+
+    repository = ReceiptsRepositoryImpl()
+    try:
+        for description, query, pipeline in MIGRATIONS:
+            pending = await repository.db.count_documents(query)
+            if dry_run or not pending:
+                print(f"{description:<42} pendientes: {pending}")
+                continue
+            result = await repository.db.update_many(query, pipeline)
+            print(f"{description:<42} migrados: {result.modified_count}/{pending}")
+
+        if not dry_run:
+            await repository.ensure_indexes()
+            print("Índices del repositorio creados")
+    finally:
+        await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los documentos pendientes")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Job: recalcula los acumulados mensuales de gasto desde los recibos.
+
+`save_receipt` suma cada recibo nuevo a su acumulado (usuario, servicio, mes) en
+la colección `<COLLECTION_NAME>_monthly`. Este job la reconstruye desde cero con
+una agregación en el servidor que termina en `$out`, así que sustituye la
+colección de forma atómica. Sirve para la carga inicial de los recibos ya
+guardados y para corregir acumulados si alguna actualización incremental falló
+(el error queda en el log del repositorio). Conviene ejecutarlo con poco
+tráfico: los recibos guardados durante la reconstrucción pueden quedar fuera.
+
+Uso (desde agent-core/, con el .env configurado):
+    python examples/rebuild_receipt_rollups.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+async def rebuild() -> None:
+    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+
+    repository = ReceiptsRepositoryImpl()
+    try:
+        started = time.perf_counter()
+        rollups = await repository.rebuild_monthly_rollups()
+        elapsed = time.perf_counter() - started
+        print(f"Acumulados reconstruidos: {rollups} (usuario, servicio, mes) en {elapsed:.1f} s")
+    finally:
+        await repository.close()
+
+
+def main():
+    asyncio.run(rebuild())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Contrato de `ReceiptsRepository`: las mismas comprobaciones contra cada backend.
+
+Verifica que las implementaciones se comportan igual en lo que el grafo y la API
+dan por hecho: deduplicación por clave natural, orden del historial, paginación
+por cursor, recibos por vencer, marcado como notificado y acumulados mensuales.
+Cada comprobación empieza con un repositorio vacío.
+
+Backends:
+- memory: InMemoryReceiptsRepository
+- sqlite: SqliteReceiptsRepository sobre un archivo temporal
+- mongo: ReceiptsRepositoryImpl contra DATABASE_URL, en `<COLLECTION_NAME>_contract`
+  (se elimina al terminar)
+
+Uso (desde agent-core/):
+    python examples/receipts_repository_contract.py
+    python examples/receipts_repository_contract.py --backend sqlite --backend mongo
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import traceback
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+PHONE = "51987654321"
+OTHER_PHONE = "51911122233"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def build_receipt(index: int, **overrides):
+    """Recibo de prueba: creado `index` minutos después de START, con monto único por índice."""
+    from maivi_agent.domain.entities import ReceiptDataSave, Service
+
+    fields = {
+        "phone_number": PHONE,
+        "service_type": Service.LUZ,
+        "is_valid": True,
+        "is_notified": False,
+        "created_at": START + timedelta(minutes=index),
+        "amount_total": 100 + index,
+        "date_expired": "25/02/2026",
+        "consumption_period": "Enero 2026",
+        "company": "Luz del Sur",
+        "link_receipt_image": f"https://ik.imagekit.io/maivi/contract/{index}.png",
+    }
+    fields.update(overrides)
+    return ReceiptDataSave(**fields)
+
+
+async def check_save_deduplicates(repository) -> None:
+    first = await repository.save_receipt(build_receipt(1))
+    again = await repository.save_receipt(build_receipt(1, created_at=START + timedelta(days=3)))
+    assert first.created and not again.created, (first, again)
+    assert again.receipt_id == first.receipt_id
+
+    # Sin clave natural completa no se puede deduplicar: cada guardado crea un recibo
+    no_company = [await repository.save_receipt(build_receipt(2, company=None)) for _ in range(2)]
+    assert all(result.created for result in no_company), no_company
+    assert no_company[0].receipt_id != no_company[1].receipt_id
+    assert len(await repository.get_receipts_by_service(PHONE, "LUZ")) == 3
+
+
+async def check_save_receipts_batch(repository) -> None:
+    existing = await repository.save_receipt(build_receipt(1))
+    results = await repository.save_receipts([build_receipt(1), build_receipt(2), build_receipt(3), build_receipt(2)])
+    assert [result.created for result in results] == [False, True, True, False], results
+    assert results[0].receipt_id == existing.receipt_id
+    assert results[3].receipt_id == results[1].receipt_id
+    assert await repository.save_receipts([]) == []
+    assert len(await repository.get_receipts_by_service(PHONE, "LUZ")) == 3
+
+
+async def check_receipts_by_service(repository) -> None:
+    from maivi_agent.domain.entities import Service
+
+    # Se guardan desordenados: el orden lo da created_at
+    for index in (3, 1, 4, 2):
+        await repository.save_receipt(build_receipt(index))
+    await repository.save_receipt(build_receipt(5, service_type=Service.AGUA))
+    await repository.save_receipt(build_receipt(6, phone_number=OTHER_PHONE))
+
+    receipts = await repository.get_receipts_by_service(PHONE, "LUZ")
+    assert [receipt.amount_total for receipt in receipts] == [104, 103, 102, 101]
+    assert all(receipt.id_receipt for receipt in receipts)
+    assert receipts[0].date_expired == datetime(2026, 2, 25, tzinfo=timezone.utc)
+
+    records = [record async for record in repository.iter_receipts_by_service(PHONE, "LUZ", batch_size=3)]
+    assert [record.id_receipt for record in records] == [receipt.id_receipt for receipt in receipts]
+    assert records[0].created_at == START + timedelta(minutes=4)
+    assert await repository.get_receipts_by_service(PHONE, "GAS") == []
+
+
+async def check_history_pagination(repository) -> None:
+    from maivi_agent.domain.entities import Service
+    from maivi_agent.domain.receipts_exceptions import InvalidReceiptDataError
+
+    for index in range(10):
+        service = Service.AGUA if index % 3 == 0 else Service.LUZ
+        await repository.save_receipt(build_receipt(index, service_type=service))
+    # Mismo created_at que el recibo 5: el id desempata sin saltar ni repetir recibos
+    await repository.save_receipt(build_receipt(50, created_at=START + timedelta(minutes=5)))
+    await repository.save_receipt(build_receipt(11, phone_number=OTHER_PHONE))
+
+    everything = [receipt.id_receipt for receipt in (await repository.get_receipt_history(PHONE, limit=100)).items]
+    assert len(everything) == 11
+
+    paged, cursor = [], None
+    while True:
+        page = await repository.get_receipt_history(PHONE, limit=3, cursor=cursor)
+        paged.extend(record.id_receipt for record in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert paged == everything, (paged, everything)
+
+    page = await repository.get_receipt_history(PHONE, service_type="AGUA", limit=10)
+    assert [record.amount_total for record in page.items] == [109, 106, 103, 100]
+    assert page.next_cursor is None
+
+    page = await repository.get_receipt_history(
+        PHONE, created_from=START + timedelta(minutes=2), created_to=START + timedelta(minutes=5), limit=10
+    )
+    assert [record.amount_total for record in page.items] == [104, 103, 102]
+
+    exact = await repository.get_receipt_history(PHONE, limit=11)
+    assert len(exact.items) == 11 and exact.next_cursor is None
+
+    try:
+        await repository.get_receipt_history(PHONE, cursor="no-es-un-cursor")
+    except InvalidReceiptDataError:
+        pass
+    else:
+        raise AssertionError("Un cursor inválido debe lanzar InvalidReceiptDataError")
+
+
+async def check_expire_and_notify(repository) -> None:
+    from bson import ObjectId
+    from maivi_agent.domain.receipts_exceptions import ReceiptNotFoundError, ReceiptQueryError
+
+    due = [await repository.save_receipt(build_receipt(index)) for index in range(3)]
+    await repository.save_receipt(build_receipt(3, date_expired="26/02/2026"))
+    await repository.save_receipt(build_receipt(4, is_notified=True))
+
+    pending = await repository.obtain_receipt_expire_by_date("25/02/2026")
+    assert sorted(receipt.id_receipt for receipt in pending) == sorted(result.receipt_id for result in due)
+
+    await repository.mark_as_notified(due[0].receipt_id)
+    pending = await repository.obtain_receipt_expire_by_date(datetime(2026, 2, 25).date())
+    assert sorted(receipt.id_receipt for receipt in pending) == sorted(result.receipt_id for result in due[1:])
+
+    records = [record async for record in repository.iter_receipts_expire_by_date("25/02/2026", batch_size=1)]
+    assert sorted(record.id_receipt for record in records) == sorted(result.receipt_id for result in due[1:])
+    notified = [receipt for receipt in await repository.get_receipts_by_service(PHONE, "LUZ")
+                if receipt.id_receipt == due[0].receipt_id]
+    assert notified[0].is_notified
+
+    try:
+        await repository.mark_as_notified(str(ObjectId()))
+    except ReceiptNotFoundError:
+        pass
+    else:
+        raise AssertionError("Marcar un recibo inexistente debe lanzar ReceiptNotFoundError")
+
+    try:
+        await repository.obtain_receipt_expire_by_date("fecha inválida")
+    except ReceiptQueryError:
+        pass
+    else:
+        raise AssertionError("Una fecha inválida debe lanzar ReceiptQueryError")
+
+    try:
+        async for _ in repository.iter_receipts_expire_by_date("fecha inválida"):
+            pass
+    except ReceiptQueryError:
+        pass
+    else:
+        raise AssertionError("Una fecha inválida debe lanzar ReceiptQueryError también al recorrer")
+
+
+async def check_monthly_rollups(repository) -> None:
+    from maivi_agent.domain.entities import Service
+
+    await repository.save_receipt(build_receipt(1, amount_total=10.5))
+    await repository.save_receipt(build_receipt(2, amount_total=20.25))
+    await repository.save_receipt(build_receipt(2, amount_total=20.25))  # duplicado: no suma
+    await repository.save_receipts([
+        build_receipt(3, amount_total=5, date_expired="10/03/2026"),
+        build_receipt(4, amount_total=7, service_type=Service.AGUA, company="Sedapal"),
+        # Sin vencimiento se acumula en el mes de registro
+        build_receipt(5, amount_total=1, date_expired=None, created_at=datetime(2025, 12, 31, 23, tzinfo=timezone.utc)),
+    ])
+    await repository.save_receipt(build_receipt(6, amount_total=99, phone_number=OTHER_PHONE))
+
+    def as_tuples(summary):
+        return sorted((spend.service_type, spend.month, spend.total, spend.count) for spend in summary)
+
+    expected = [("AGUA", "2026-02", 7.0, 1), ("LUZ", "2026-02", 30.75, 2), ("LUZ", "2026-03", 5.0, 1)]
+    summary = await repository.get_monthly_summary(PHONE, year=2026)
+    assert as_tuples(summary) == expected, as_tuples(summary)
+    assert [spend.month for spend in summary] == sorted(spend.month for spend in summary)
+    assert as_tuples(await repository.get_monthly_summary(PHONE, year=2025)) == [("LUZ", "2025-12", 1.0, 1)]
+    assert as_tuples(await repository.get_monthly_summary(PHONE, service_type="AGUA")) == expected[:1]
+
+    incremental = as_tuples(await repository.get_monthly_summary(PHONE))
+    assert await repository.rebuild_monthly_rollups() == 5
+    assert as_tuples(await repository.get_monthly_summary(PHONE)) == incremental
+
+
+CHECKS = [
+    check_save_deduplicates,
+    check_save_receipts_batch,
+    check_receipts_by_service,
+    check_history_pagination,
+    check_expire_and_notify,
+    check_monthly_rollups,
+]
+
+
+async def open_repository(backend: str, workdir: str, run: int):
+    if backend == "memory":
+        from maivi_agent.infrastructure.memory_receipts_repository import InMemoryReceiptsRepository
+        repository = InMemoryReceiptsRepository()
+    elif backend == "sqlite":
+        from maivi_agent.infrastructure.sqlite_receipts_repository import SqliteReceiptsRepository
+        repository = SqliteReceiptsRepository(os.path.join(workdir, f"contract_{run}.db"))
+    else:
+        from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+        repository = ReceiptsRepositoryImpl()
+        await repository.db.drop()
+        await repository.rollups.drop()
+    await repository.ensure_indexes()
+    return repository
+
+
+async def discard_repository(backend: str, repository) -> None:
+    if backend == "mongo":
+        await repository.db.drop()
+        await repository.rollups.drop()
+    await repository.close()
+
+
+async def run_backend(backend: str) -> int:
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        for run, check in enumerate(CHECKS):
+            repository = await open_repository(backend, workdir, run)
+            try:
+                await check(repository)
+                print(f"  ✅ {check.__name__}")
+            except Exception:
+                failures += 1
+                print(f"  ❌ {check.__name__}")
+                traceback.print_exc()
+            finally:
+                await discard_repository(backend, repository)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--backend", action="append", choices=("memory", "sqlite", "mongo"),
+        help="Backend a verificar (se puede repetir); por defecto memory y sqlite"
+    )
+    args = parser.parse_args()
+
+    os.environ["COLLECTION_NAME"] = f"{os.environ.get('COLLECTION_NAME', 'receipts')}_contract"
+
+    failures = 0
+    for backend in args.backend or ["memory", "sqlite"]:
+        print(f"{backend}:")
+        failures += asyncio.run(run_backend(backend))
+    print("Contrato cumplido" if failures == 0 else f"{failures} comprobaciones fallidas")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,8 @@ async def main():
         print(f"     ID: {booking.get('id')}")
         print(f"     Inicio: {booking.get('start')}")
         print()
+    
+    await calcom.aclose()
 
 
 if __name__ == "__main__":
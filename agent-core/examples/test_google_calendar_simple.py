@@ -87,6 +87,8 @@ async def main():
     
     # 2. Listar próximos eventos
     # await test_list_upcoming_events()
+    
+    await get_google_calendar_service().aclose()
 
 
 if __name__ == "__main__":
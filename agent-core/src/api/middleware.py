@@ -0,0 +1,64 @@
+"""
+Middlewares HTTP de la API.
+"""
+import time
+from fastapi import Request
+from shared.log_context import bind_correlation_id, correlation_id_var
+from shared.metrics import get_metrics
+from shared.tracing import SPAN_KIND_SERVER, STATUS_ERROR, get_tracer, parse_traceparent
+
+CORRELATION_HEADER = "X-Request-ID"
+
+HTTP_DURATION = get_metrics().histogram(
+    "maivi_http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta y código de estado"
+)
+
+
+async def correlation_id_middleware(request: Request, call_next):
+    """
+    Asigna un correlation id a cada petición (o reutiliza el X-Request-ID recibido).
+
+    El id queda en el contexto de la petición para todos los logs que genere,
+    incluidos los de los nodos del grafo, y se devuelve en la cabecera de respuesta.
+    """
+    correlation_id = bind_correlation_id(request.headers.get(CORRELATION_HEADER))
+    response = await call_next(request)
+    response.headers[CORRELATION_HEADER] = correlation_id
+    return response
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Abre el span raíz de la petición y observa su duración por ruta.
+
+    Si llega una cabecera W3C `traceparent` el span continúa esa traza; los
+    spans de los nodos del grafo cuelgan de este.
+    """
+    started = time.perf_counter()
+    status_code = 500
+    with get_tracer().start_span(
+        f"{request.method} {request.url.path}",
+        kind=SPAN_KIND_SERVER,
+        parent=parse_traceparent(request.headers.get("traceparent")),
+        **{
+            "http.request.method": request.method,
+            "url.path": request.url.path,
+            "maivi.correlation_id": correlation_id_var.get() or "-",
+        }
+    ) as span:
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            if span is not None:
+                span.set_attribute("http.route", path)
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.status_code = STATUS_ERROR
+            HTTP_DURATION.observe(
+                time.perf_counter() - started, method=request.method, route=path, status=str(status_code)
+            )
@@ -5,22 +5,128 @@ Este módulo maneja:
 1. Recepción de primera imagen (inicia nuevo grafo)
 2. Recepción de reintentos (continúa grafo pausado)
 3. Preservación de estado entre reintentos usando checkpointer
+4. Recepción de imágenes binarias (multipart / octet-stream) sin base64
 """
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hashlib
+from datetime import date, datetime, time, timedelta, timezone
+from fastapi import APIRouter, File, Form, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
-from typing import Optional
+from starlette.convertors import StringConvertor, register_url_convertor
+from starlette.types import Message, Receive
+from typing import AsyncIterator, Awaitable, Callable, List, Literal, Optional, TypeVar
 from maivi_agent.application.graph import get_workflow
+from maivi_agent.application.admission import AdmissionRejectedError, get_admission_controller
+from maivi_agent.application.idempotency import build_idempotency_key, get_idempotency_guard, hash_images
+from maivi_agent.application.session_runner import get_session_runner
+from maivi_agent.domain.receipts_exceptions import InvalidReceiptDataError
+from maivi_agent.infrastructure.container import get_container
+from shared.image_buffer import ImageBuffer
 from shared.init_logger import init_logger
+from shared.log_context import bind_phone
+from shared.config import settings
 
-router = APIRouter(prefix="/api/receipts", tags=["receipts"])
 log = init_logger("ReceiptsAPI")
 
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+_HISTORY_MAX_PAGE_SIZE = 100
+# Margen para el resto del JSON o del multipart además de las imágenes
+_BODY_OVERHEAD_BYTES = 64 * 1024
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
+
+
+def _rejected(e: AdmissionRejectedError) -> HTTPException:
+    """429 con Retry-After para una petición rechazada por la cola de admisión."""
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _max_body_bytes(path: str) -> int:
+    """Tamaño máximo del cuerpo de una ruta: sus imágenes en base64 (4/3 del binario) más el margen."""
+    images = settings.BATCH_MAX_IMAGES if "/batch" in path else 1
+    return images * (settings.MAX_IMAGE_UPLOAD_BYTES * 4 // 3 + 4) + _BODY_OVERHEAD_BYTES
+
+
+def _capped_receive(receive: Receive, max_bytes: int) -> Receive:
+    """Envuelve el receive ASGI para cortar con 413 la lectura de un cuerpo mayor que max_bytes."""
+    received = 0
+    
+    async def capped() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"El cuerpo supera el tamaño máximo permitido ({max_bytes} bytes)"
+                )
+        return message
+    
+    return capped
+
+
+class _AdmittedRoute(APIRoute):
+    """
+    Ruta que pasa por la cola de admisión antes de que FastAPI lea el cuerpo.
+    
+    En los POST reserva los bytes que declara Content-Length (o el máximo de la
+    ruta si no lo declara): si no caben se responde 413/429 sin leer nada, y la
+    lectura se corta con 413 si el cuerpo supera lo reservado.
+    """
+    
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+        if "POST" not in self.methods:
+            return handler
+        max_bytes = _max_body_bytes(self.path)
+        
+        async def admitted_handler(request: Request) -> Response:
+            declared = request.headers.get("content-length")
+            size_bytes = int(declared) if declared and declared.isdigit() else max_bytes
+            if size_bytes > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"El cuerpo supera el tamaño máximo permitido ({max_bytes} bytes)"
+                )
+            try:
+                with get_admission_controller().reserve(size_bytes):
+                    return await handler(Request(request.scope, _capped_receive(request.receive, size_bytes)))
+            except AdmissionRejectedError as e:
+                raise _rejected(e)
+        
+        return admitted_handler
+
+
+router = APIRouter(prefix="/api/receipts", tags=["receipts"], route_class=_AdmittedRoute)
+
+
+class _PhoneNumberConvertor(StringConvertor):
+    """Número de teléfono en la ruta: solo dígitos (con '+' opcional), así /{phone_number} no captura rutas como /process."""
+    regex = r"\+?[0-9]{6,20}"
+
+
+register_url_convertor("phone", _PhoneNumberConvertor())
+
 
 class ImageRequest(BaseModel):
     """Request para procesar imagen desde WhatsApp."""
     phone_number: str = Field(..., description="Número de teléfono del usuario (sin @s.whatsapp.net)")
     image_base64: str = Field(..., description="Imagen del recibo codificada en base64")
+    message_id: Optional[str] = Field(default=None, description="Id del mensaje de WhatsApp, usado como clave de idempotencia")
+
+
+class BatchImageRequest(BaseModel):
+    """Request para procesar varias imágenes de un mismo usuario en un solo paso."""
+    phone_number: str = Field(..., description="Número de teléfono del usuario (sin @s.whatsapp.net)")
+    images_base64: List[str] = Field(..., min_length=1, description="Imágenes de los recibos codificadas en base64")
+    message_id: Optional[str] = Field(default=None, description="Id del mensaje de WhatsApp, usado como clave de idempotencia")
 
 
 class ProcessResponse(BaseModel):
@@ -35,8 +141,341 @@ class ProcessResponse(BaseModel):
     next_nodes: Optional[list] = None  # Para debugging
 
 
+class BatchItemResponse(BaseModel):
+    """Resultado de una imagen dentro de un lote."""
+    index: int
+    service_type: Optional[str]
+    is_valid: bool
+    receipt_id: Optional[str] = None
+    link_receipt_image: Optional[str] = None
+    link_receipt_preview: Optional[str] = None
+    link_receipt_thumbnail: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchProcessResponse(BaseModel):
+    """Response del procesamiento en lote."""
+    status: str
+    phone_number: str
+    processed: int
+    valid_count: int
+    items: List[BatchItemResponse]
+    message: str
+
+
+class ReceiptHistoryItem(BaseModel):
+    """Recibo dentro del historial de un usuario."""
+    receipt_id: str
+    service_type: str
+    amount_total: Optional[float] = None
+    date_expired: Optional[datetime] = None
+    consumption_period: Optional[str] = None
+    company: Optional[str] = None
+    is_notified: bool
+    created_at: Optional[datetime] = None
+    link_receipt_thumbnail: Optional[str] = Field(default=None, description="Miniatura del recibo para el listado")
+
+
+class ReceiptHistoryResponse(BaseModel):
+    """Página del historial de recibos de un usuario."""
+    phone_number: str
+    count: int
+    items: List[ReceiptHistoryItem]
+    next_cursor: Optional[str] = Field(default=None, description="Cursor para pedir la siguiente página; None si no hay más")
+
+
+class MonthlySpendItem(BaseModel):
+    """Gasto de un servicio en un mes."""
+    month: str
+    total: float
+    count: int
+
+
+class ServiceSpend(BaseModel):
+    """Gasto acumulado de un servicio, con su detalle mensual."""
+    service_type: str
+    total: float
+    count: int
+    months: List[MonthlySpendItem]
+
+
+class ReceiptSummaryResponse(BaseModel):
+    """Resumen del gasto de un usuario por servicio y mes."""
+    phone_number: str
+    year: Optional[int]
+    total: float
+    count: int
+    services: List[ServiceSpend]
+
+
+async def _run_idempotent(
+    response: Response,
+    key: str,
+    operation: Callable[[], Awaitable[ResponseModel]],
+    model: type[ResponseModel]
+) -> ResponseModel:
+    """
+    Ejecuta la operación una sola vez por clave de idempotencia.
+    
+    Un reintento del puente de WhatsApp con la misma clave recibe el resultado
+    de la ejecución original (en curso o terminada) en lugar de lanzar otra.
+    
+    Args:
+        response: Respuesta HTTP, para marcar las respuestas reutilizadas
+        key: Clave de idempotencia
+        operation: Procesamiento a ejecutar si la clave es nueva
+        model: Modelo de respuesta para reconstruir el resultado guardado
+        
+    Returns:
+        Respuesta del procesamiento original
+    """
+    async def run() -> dict:
+        return (await operation()).model_dump()
+    
+    data, replayed = await get_idempotency_guard().run(key, run)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return model(**data)
+
+
+async def _admitted(
+    phone_number: str,
+    operation: Callable[[], Awaitable[ResponseModel]]
+) -> ResponseModel:
+    """
+    Ejecuta la operación dentro del cupo de peticiones en curso del usuario.
+    
+    El turno de ejecución del grafo lo toma el actor del usuario solo mientras
+    ejecuta; los bytes del cuerpo ya se reservaron antes de leerlo (_AdmittedRoute).
+    
+    Raises:
+        HTTPException: 429 con Retry-After si el usuario tiene demasiadas peticiones en curso
+    """
+    try:
+        with get_admission_controller().reserve_phone(phone_number):
+            return await operation()
+    except AdmissionRejectedError as e:
+        raise _rejected(e)
+
+
+async def _run_workflow(
+    phone_number: str,
+    image: ImageBuffer,
+    response: Response,
+    message_id: Optional[str] = None
+) -> ProcessResponse:
+    """
+    Procesa una imagen suprimiendo las entregas duplicadas del webhook.
+    
+    Args:
+        phone_number: Número de teléfono del usuario (thread_id del grafo)
+        image: Imagen decodificada del recibo
+        response: Respuesta HTTP
+        message_id: Id de mensaje del cliente; si no viene se usa el hash de la imagen
+        
+    Returns:
+        ProcessResponse: Estado actual del procesamiento
+    """
+    bind_phone(phone_number)
+    key = build_idempotency_key(
+        phone_number, message_id, None if message_id else hash_images([image])
+    )
+    return await _run_idempotent(
+        response,
+        key,
+        lambda: _admitted(phone_number, lambda: _execute_workflow(phone_number, image)),
+        ProcessResponse
+    )
+
+
+async def _execute_workflow(phone_number: str, image: ImageBuffer) -> ProcessResponse:
+    """
+    Encola la imagen en el actor del usuario y construye la respuesta.
+    
+    Las ejecuciones de un mismo usuario se serializan (y se agrupan si llegan
+    casi a la vez); las de usuarios distintos corren en paralelo.
+    
+    Args:
+        phone_number: Número de teléfono del usuario (thread_id del grafo)
+        image: Imagen decodificada del recibo
+        
+    Returns:
+        ProcessResponse: Estado actual del procesamiento
+    """
+    run = await get_session_runner().submit(phone_number, image)
+    result = run.values
+    
+    response = ProcessResponse(
+        status="success",
+        phone_number=phone_number,
+        service_type=result.get("service_type"),
+        is_valid=result.get("is_valid", False),
+        waiting_for_image=result.get("waiting_for_image", False),
+        intent_count=result.get("intent_count", 0),
+        message=result.get("message_user", ""),
+        next_nodes=list(run.next_nodes) if run.next_nodes else None
+    )
+    
+    log.info(f"✅ Respuesta enviada: status={response.status}, "
+            f"service_type={response.service_type}, "
+            f"waiting={response.waiting_for_image}")
+    
+    return response
+
+
+async def _read_limited(chunks: AsyncIterator[bytes], max_bytes: int) -> ImageBuffer:
+    """
+    Lee un cuerpo binario por bloques aplicando un límite de tamaño.
+    
+    El hash SHA-256 se calcula a medida que llegan los bloques, así la imagen
+    solo se recorre una vez y nunca pasa por base64.
+    
+    Args:
+        chunks: Iterador asíncrono con los bloques del cuerpo
+        max_bytes: Tamaño máximo permitido en bytes
+        
+    Returns:
+        ImageBuffer: Contenido de la imagen con su hash
+        
+    Raises:
+        HTTPException: 413 si se supera el límite, 400 si el cuerpo está vacío
+    """
+    buffer = bytearray()
+    digest = hashlib.sha256()
+    
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if len(buffer) + len(chunk) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"La imagen supera el tamaño máximo permitido ({max_bytes} bytes)"
+            )
+        digest.update(chunk)
+        buffer += chunk
+    
+    if not buffer:
+        raise HTTPException(status_code=400, detail="La imagen recibida está vacía")
+    
+    return ImageBuffer.from_bytes(buffer, digest.hexdigest())
+
+
+async def _decode_base64(image_base64: str) -> ImageBuffer:
+    """
+    Decodifica y hashea una imagen en base64 una sola vez, fuera del event loop.
+    
+    Raises:
+        HTTPException: 400 si la imagen no es base64 válido o está vacía
+    """
+    try:
+        image = await asyncio.to_thread(ImageBuffer.from_base64, image_base64)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not image.data:
+        raise HTTPException(status_code=400, detail="La imagen recibida está vacía")
+    return image
+
+
+async def _iter_upload_file(upload: UploadFile) -> AsyncIterator[bytes]:
+    """Itera un UploadFile por bloques sin cargarlo completo de una sola vez."""
+    while chunk := await upload.read(_UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _run_batch_workflow(
+    phone_number: str,
+    images: list[ImageBuffer],
+    response: Response,
+    message_id: Optional[str] = None
+) -> BatchProcessResponse:
+    """
+    Procesa un lote de imágenes suprimiendo las entregas duplicadas del webhook.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        images: Imágenes decodificadas de los recibos
+        response: Respuesta HTTP
+        message_id: Id de mensaje del cliente; si no viene se usa el hash de las imágenes
+        
+    Returns:
+        BatchProcessResponse: Resultado por imagen y mensaje combinado
+    """
+    bind_phone(phone_number)
+    key = build_idempotency_key(
+        phone_number, message_id, None if message_id else f"batch:{hash_images(images)}"
+    )
+    return await _run_idempotent(
+        response,
+        key,
+        lambda: _admitted(phone_number, lambda: _execute_batch_workflow(phone_number, images)),
+        BatchProcessResponse
+    )
+
+
+async def _execute_batch_workflow(phone_number: str, images: list[ImageBuffer]) -> BatchProcessResponse:
+    """
+    Encola el lote de imágenes en el actor del usuario y construye la respuesta.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        images: Campos de imagen de cada recibo
+        
+    Returns:
+        BatchProcessResponse: Resultado por imagen y mensaje combinado
+    """
+    run = await get_session_runner().submit_batch(phone_number, images)
+    
+    items = [
+        BatchItemResponse(
+            index=item["index"],
+            service_type=item["service_type"],
+            is_valid=bool(item["receipt_id"]),
+            receipt_id=item["receipt_id"],
+            link_receipt_image=item["link_receipt_image"],
+            link_receipt_preview=item.get("link_receipt_preview"),
+            link_receipt_thumbnail=item.get("link_receipt_thumbnail"),
+            error=item["error"]
+        )
+        for item in run.items
+    ]
+    response = BatchProcessResponse(
+        status="success",
+        phone_number=phone_number,
+        processed=len(items),
+        valid_count=sum(1 for item in items if item.is_valid),
+        items=items,
+        message=run.message
+    )
+    
+    log.info(f"✅ Lote procesado: {response.valid_count}/{response.processed} recibos válidos")
+    
+    return response
+
+
+def _check_batch_size(count: int) -> None:
+    """Rechaza los lotes con más imágenes de las permitidas, antes de leerlas."""
+    if count > settings.BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Se permiten como máximo {settings.BATCH_MAX_IMAGES} imágenes por lote"
+        )
+
+
+def _check_content_length(content_length: Optional[int]) -> None:
+    """Rechaza de inmediato los cuerpos que declaran un tamaño mayor al permitido."""
+    if content_length is not None and content_length > settings.MAX_IMAGE_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"La imagen supera el tamaño máximo permitido ({settings.MAX_IMAGE_UPLOAD_BYTES} bytes)"
+        )
+
+
 @router.post("/process", response_model=ProcessResponse)
-async def process_receipt_image(request: ImageRequest):
+async def process_receipt_image(
+    request: ImageRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Clave de idempotencia del mensaje")
+):
     """
     Endpoint principal para procesar imágenes de recibos.
     
@@ -58,95 +497,207 @@ async def process_receipt_image(request: ImageRequest):
     try:
         log.info(f"📩 Recibida imagen de {request.phone_number}")
         
-        # Obtener grafo compilado con interrupt_before
-        graph = get_workflow()
-        config = {"configurable": {"thread_id": request.phone_number}}
-        
-        # 🔍 Verificar si hay un grafo pausado para este usuario
-        current_state = graph.get_state(config)
-        
-        if current_state.next:  # ⭐ Hay un grafo pausado esperando
-            log.info(f"🔄 REINTENTO - Usuario {request.phone_number} envió nueva imagen")
-            log.info(f"   Grafo pausado en: {current_state.next}")
-            log.info(f"   Intentos previos: {current_state.values.get('intent_count', 0)}")
-            
-            # Actualizar estado con la NUEVA imagen
-            updated_state = {
-                **current_state.values,  # ✅ Preserva intent_count, limit_intents, phone_number, etc.
-                "image_base64": request.image_base64,  # 🔄 Nueva imagen del usuario
-                "waiting_for_image": False  # ✅ Resetear flag de espera
-            }
-            
-            # ▶️ CONTINUAR ejecución desde wait_for_image
-            log.info("▶️  Continuando grafo desde la interrupción...")
-            result = await graph.ainvoke(updated_state, config)
-            
-            # Verificar si se pausó otra vez (clasificación falló de nuevo)
-            final_state = graph.get_state(config)
-            log.info(f"   Resultado: service_type={result.get('service_type')}, "
-                    f"intent_count={result.get('intent_count')}")
-            
-            if final_state.next:
-                log.info(f"⏸️  Grafo pausado nuevamente en: {final_state.next}")
-            else:
-                log.info("🏁 Grafo completado para este usuario")
-            
-        else:  # 🆕 Primera imagen del usuario (nueva sesión)
-            log.info(f"🆕 NUEVA SESIÓN - Usuario {request.phone_number} envió primera imagen")
-            
-            initial_state = {
-                "image_base64": request.image_base64,
-                "phone_number": request.phone_number,
-                "intent_count": 0,
-                "limit_intents": 3,
-                "waiting_for_image": False,
-                "is_valid": False,
-                "service_type": None,
-                "extracted_data": None,
-                "message_user": ""
-            }
-            
-            log.info("▶️  Iniciando nuevo grafo...")
-            result = await graph.ainvoke(initial_state, config)
-            
-            # Verificar si se pausó (clasificación falló)
-            final_state = graph.get_state(config)
-            log.info(f"   Resultado: service_type={result.get('service_type')}, "
-                    f"intent_count={result.get('intent_count')}")
-            
-            if final_state.next:
-                log.info(f"⏸️  Grafo pausado en: {final_state.next} - Esperando reintento")
-            else:
-                log.info("🏁 Grafo completado en primer intento")
-        
-        # 📤 Preparar respuesta
-        final_state = graph.get_state(config)
-        
-        response = ProcessResponse(
-            status="success",
-            phone_number=request.phone_number,
-            service_type=result.get("service_type"),
-            is_valid=result.get("is_valid", False),
-            waiting_for_image=result.get("waiting_for_image", False),
-            intent_count=result.get("intent_count", 0),
-            message=result.get("message_user", ""),
-            next_nodes=final_state.next if final_state.next else None
+        image = await _decode_base64(request.image_base64)
+        
+        return await _run_workflow(request.phone_number, image, response, idempotency_key or request.message_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"❌ Error procesando imagen de {request.phone_number}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error al procesar el recibo: {str(e)}"
         )
+
+
+@router.post("/process/upload", response_model=ProcessResponse)
+async def process_receipt_upload(
+    response: Response,
+    phone_number: str = Form(..., description="Número de teléfono del usuario (sin @s.whatsapp.net)"),
+    image: UploadFile = File(..., description="Imagen del recibo en binario"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Clave de idempotencia del mensaje")
+):
+    """
+    Procesa una imagen enviada como multipart/form-data.
+    
+    Evita el sobrecosto de base64 (~33%) y el parseo de un JSON de varios MB:
+    la imagen se lee por bloques con límite de tamaño y se entrega al grafo en bytes.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        image: Archivo de imagen del recibo
         
-        log.info(f"✅ Respuesta enviada: status={response.status}, "
-                f"service_type={response.service_type}, "
-                f"waiting={response.waiting_for_image}")
+    Returns:
+        ProcessResponse: Estado actual del procesamiento
+        
+    Raises:
+        HTTPException: 413 si la imagen es muy grande, 500 si hay error en el procesamiento
+    """
+    try:
+        log.info(f"📩 Recibida imagen (multipart) de {phone_number}")
+        
+        _check_content_length(image.size)
+        buffer = await _read_limited(
+            _iter_upload_file(image), settings.MAX_IMAGE_UPLOAD_BYTES
+        )
         
-        return response
+        return await _run_workflow(phone_number, buffer, response, idempotency_key)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        log.error(f"❌ Error procesando imagen de {request.phone_number}: {e}", exc_info=True)
+        log.error(f"❌ Error procesando imagen de {phone_number}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error al procesar el recibo: {str(e)}"
+        )
+    finally:
+        await image.close()
+
+
+@router.post("/process/raw", response_model=ProcessResponse)
+async def process_receipt_raw(
+    request: Request,
+    response: Response,
+    phone_number: str = Query(..., description="Número de teléfono del usuario (sin @s.whatsapp.net)"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Clave de idempotencia del mensaje")
+):
+    """
+    Procesa una imagen enviada como cuerpo application/octet-stream.
+    
+    El cuerpo se consume directamente del stream de la petición, sin buffers
+    intermedios del framework, aplicando el límite de tamaño mientras se lee.
+    
+    Args:
+        request: Petición HTTP cuyo cuerpo es la imagen
+        phone_number: Número de teléfono del usuario (query param)
+        
+    Returns:
+        ProcessResponse: Estado actual del procesamiento
+        
+    Raises:
+        HTTPException: 413 si la imagen es muy grande, 500 si hay error en el procesamiento
+    """
+    try:
+        log.info(f"📩 Recibida imagen (octet-stream) de {phone_number}")
+        
+        content_length = request.headers.get("content-length")
+        _check_content_length(int(content_length) if content_length and content_length.isdigit() else None)
+        image = await _read_limited(
+            request.stream(), settings.MAX_IMAGE_UPLOAD_BYTES
+        )
+        
+        return await _run_workflow(phone_number, image, response, idempotency_key)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"❌ Error procesando imagen de {phone_number}: {e}", exc_info=True)
         raise HTTPException(
             status_code=500, 
             detail=f"Error al procesar el recibo: {str(e)}"
         )
 
 
+@router.post("/process/batch", response_model=BatchProcessResponse)
+async def process_receipt_batch(
+    request: BatchImageRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Clave de idempotencia del mensaje")
+):
+    """
+    Procesa varias imágenes de recibos de un mismo usuario en una sola petición.
+    
+    Clasifica y extrae los datos de todas las imágenes en paralelo, guarda los
+    recibos con una inserción masiva y envía un único mensaje de confirmación.
+    
+    Args:
+        request: Número de teléfono e imágenes en base64
+        
+    Returns:
+        BatchProcessResponse: Resultado por imagen y mensaje combinado
+        
+    Raises:
+        HTTPException: 413 si el lote supera el máximo, 500 si hay error en el procesamiento
+    """
+    try:
+        log.info(f"📩 Recibido lote de {len(request.images_base64)} imágenes de {request.phone_number}")
+        
+        _check_batch_size(len(request.images_base64))
+        images = [await _decode_base64(image_base64) for image_base64 in request.images_base64]
+        
+        return await _run_batch_workflow(request.phone_number, images, response, idempotency_key or request.message_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"❌ Error procesando lote de {request.phone_number}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error al procesar los recibos: {str(e)}"
+        )
+
+
+@router.post("/process/batch/upload", response_model=BatchProcessResponse)
+async def process_receipt_batch_upload(
+    response: Response,
+    phone_number: str = Form(..., description="Número de teléfono del usuario (sin @s.whatsapp.net)"),
+    images: List[UploadFile] = File(..., description="Imágenes de los recibos en binario"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", description="Clave de idempotencia del mensaje")
+):
+    """
+    Procesa varias imágenes enviadas como multipart/form-data en una sola petición.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        images: Archivos de imagen de los recibos
+        
+    Returns:
+        BatchProcessResponse: Resultado por imagen y mensaje combinado
+        
+    Raises:
+        HTTPException: 413 si alguna imagen o el lote es muy grande, 500 si hay error en el procesamiento
+    """
+    try:
+        log.info(f"📩 Recibido lote (multipart) de {len(images)} imágenes de {phone_number}")
+        
+        _check_batch_size(len(images))
+        
+        batch = []
+        for image in images:
+            _check_content_length(image.size)
+            batch.append(await _read_limited(
+                _iter_upload_file(image), settings.MAX_IMAGE_UPLOAD_BYTES
+            ))
+        
+        return await _run_batch_workflow(phone_number, batch, response, idempotency_key)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.error(f"❌ Error procesando lote de {phone_number}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error al procesar los recibos: {str(e)}"
+        )
+    finally:
+        for image in images:
+            await image.close()
+
+
+@router.get("/admission/status")
+async def get_admission_status():
+    """
+    Obtiene la ocupación de la cola de admisión.
+    Útil para monitoreo y para ajustar los límites de concurrencia.
+    
+    Returns:
+        Ejecuciones en curso, peticiones en cola y bytes retenidos frente a sus límites
+    """
+    return get_admission_controller().snapshot()
+
+
 @router.get("/session/{phone_number}")
 async def get_session_status(phone_number: str):
     """
@@ -199,16 +750,132 @@ async def clear_session(phone_number: str):
         Confirmación de limpieza
     """
     try:
-        # Nota: MemorySaver no tiene método para eliminar sesiones
-        # En producción con Redis/PostgreSQL podrías implementar esto
         log.info(f"🗑️  Solicitud de limpieza de sesión para {phone_number}")
         
+        await get_workflow().checkpointer.adelete_thread(phone_number)
+        
         return {
             "status": "success",
-            "message": f"Sesión de {phone_number} marcada para limpieza. "
-                      "Con MemorySaver se limpiará al reiniciar el servidor."
+            "message": f"Sesión de {phone_number} eliminada."
         }
         
     except Exception as e:
         log.error(f"Error limpiando sesión de {phone_number}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{phone_number:phone}", response_model=ReceiptHistoryResponse)
+async def get_receipt_history(
+    phone_number: str,
+    service_type: Optional[Literal["AGUA", "LUZ", "GAS"]] = Query(default=None, description="Filtra por tipo de servicio"),
+    date_from: Optional[date] = Query(default=None, description="Recibos registrados desde esta fecha (incluida)"),
+    date_to: Optional[date] = Query(default=None, description="Recibos registrados hasta esta fecha (incluida)"),
+    limit: int = Query(default=20, ge=1, le=_HISTORY_MAX_PAGE_SIZE, description="Recibos por página"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor de la página anterior")
+):
+    """
+    Historial de recibos de un usuario, más recientes primero, paginado por cursor.
+    
+    La paginación es por clave (created_at, id) sobre un índice, así que cada
+    página cuesta lo mismo aunque el usuario tenga años de recibos.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        service_type: Tipo de servicio (AGUA, LUZ, GAS)
+        date_from: Fecha de registro mínima (UTC)
+        date_to: Fecha de registro máxima (UTC)
+        limit: Tamaño de página (máximo 100)
+        cursor: Cursor devuelto por la página anterior
+        
+    Returns:
+        Recibos de la página y cursor de la siguiente
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from no puede ser posterior a date_to")
+    
+    created_from = datetime.combine(date_from, time.min, timezone.utc) if date_from else None
+    created_to = datetime.combine(date_to + timedelta(days=1), time.min, timezone.utc) if date_to else None
+    
+    try:
+        page = await get_container().receipt_repository.get_receipt_history(
+            phone_number,
+            service_type=service_type,
+            created_from=created_from,
+            created_to=created_to,
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidReceiptDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.error(f"Error obteniendo el historial de {phone_number}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return ReceiptHistoryResponse(
+        phone_number=phone_number,
+        count=len(page.items),
+        items=[
+            ReceiptHistoryItem(
+                receipt_id=item.id_receipt,
+                service_type=item.service_type,
+                amount_total=item.amount_total,
+                date_expired=item.date_expired,
+                consumption_period=item.consumption_period,
+                company=item.company,
+                is_notified=item.is_notified,
+                created_at=item.created_at,
+                link_receipt_thumbnail=item.link_receipt_thumbnail
+            )
+            for item in page.items
+        ],
+        next_cursor=page.next_cursor
+    )
+
+
+@router.get("/{phone_number:phone}/summary", response_model=ReceiptSummaryResponse)
+async def get_receipt_summary(
+    phone_number: str,
+    year: Optional[int] = Query(default=None, ge=2000, le=2100, description="Año a resumir (por defecto, el actual)"),
+    service_type: Optional[Literal["AGUA", "LUZ", "GAS"]] = Query(default=None, description="Filtra por tipo de servicio")
+):
+    """
+    Gasto de un usuario por servicio y mes (p. ej. "¿cuánto gasté en luz este año?").
+    
+    Solo lee los acumulados mensuales, que se actualizan al guardar cada recibo,
+    así que el coste no depende de cuántos recibos tenga el usuario. Cada recibo
+    cuenta en el mes de su vencimiento.
+    
+    Args:
+        phone_number: Número de teléfono del usuario
+        year: Año a resumir
+        service_type: Tipo de servicio (AGUA, LUZ, GAS)
+        
+    Returns:
+        Totales del año y detalle por servicio y mes
+    """
+    year = year or datetime.now(timezone.utc).year
+    
+    try:
+        rollups = await get_container().receipt_repository.get_monthly_summary(
+            phone_number, year=year, service_type=service_type
+        )
+    except Exception as e:
+        log.error(f"Error obteniendo el resumen de {phone_number}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    services: dict[str, ServiceSpend] = {}
+    for rollup in rollups:
+        service = services.setdefault(
+            rollup.service_type, ServiceSpend(service_type=rollup.service_type, total=0, count=0, months=[])
+        )
+        service.total = round(service.total + rollup.total, 2)
+        service.count += rollup.count
+        service.months.append(MonthlySpendItem(month=rollup.month, total=rollup.total, count=rollup.count))
+    
+    return ReceiptSummaryResponse(
+        phone_number=phone_number,
+        year=year,
+        total=round(sum(service.total for service in services.values()), 2),
+        count=sum(service.count for service in services.values()),
+        services=list(services.values())
+    )
@@ -1,149 +1,104 @@
 """
 Punto de entrada principal de la aplicación Maivi Agent.
-Ejecuta el sistema de clasificación de recibos.
+
+Expone la API de recibos con FastAPI. Todas las dependencias pesadas (contenedor,
+grafos compilados, cliente de MongoDB, pools HTTP y caché de prompts) se crean
+en el arranque, dentro del lifespan, y se cierran al apagar el servicio.
 """
-import asyncio
-import base64
-from datetime import datetime, timedelta
-from IPython.display import Image, display
-from maivi_agent.application.graph import get_workflow
-
-from maivi_agent.domain.entities import ReceiptDataSave, Service
-from maivi_agent.infrastructure.google_calendar_service import get_google_calendar_service
-from maivi_agent.infrastructure.image_storage_service import get_instance
-
-from maivi_agent.infrastructure.calcom_notification_service import get_calcom_service
-
-
-def insert_data_mongo():
-    from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
-    repo= ReceiptsRepositoryImpl()
-    
-    body= ReceiptDataSave(
-        phone_number="51987654321",
-        service_type=Service.LUZ,
-        is_valid=True,
-        is_notified=False,
-        amount_total=125.50,
-        date_expired="25/02/2026",
-        consumption_period="Diciembre 2025",
-        company="Luz del Sur",
-        link_receipt_image="https://ik.imagekit.io/ljpa/maipevi.mp4"
-    )
-    receipt_id= repo.save_receipt(body)
-    print(f"✅ Recibo insertado con ID: {receipt_id}")
-
-async def imagekit_io():
-    image_Service= get_instance()
-
-    image_base64= image_Service._image_to_base64("grafo-agente.png")
-    await image_Service.upload_image(file_doc=base64.b64decode(image_base64), folder="/AGENT-AI/recibos", file_name="grafo-agente-ai.png", tags="ARQUITECTURA")
-
-def save_graph_image():
-    """Guarda la imagen del grafo en un archivo PNG."""
-    compiled_graph = get_workflow()
-    
-    # Generar la imagen PNG
-    png_bytes = compiled_graph.get_graph(xray=True).draw_mermaid_png()
-    
-    # Guardar en archivo
-    with open("graph_workflow.png", "wb") as f:
-        f.write(png_bytes)
-    
-    print("✅ Imagen del grafo guardada en: graph_workflow.png")
-    
-    # Opcional: También mostrar en Jupyter/IPython
-    display(Image(png_bytes))
-    
-
-
-async def calcom_notifications():
-    """Ejemplo de programación de notificaciones."""
-    
-    print("=" * 60)
-    print("Ejemplo de Servicio de Notificaciones CAL.COM")
-    print("=" * 60)
-    print()
-    
-    # Obtener el servicio
-    calcom = get_calcom_service()
-    
-    # Datos de ejemplo de un recibo
-    print("📋 Programando notificaciones para un recibo...")
-    print("   📧 Email principal: usuario@ejemplo.com")
-    print("   📧 Emails adicionales: admin@ejemplo.com, contador@ejemplo.com")
-    print()
-    
-    future_date = datetime.now() + timedelta(days=3)
-    date_expired = future_date.strftime("%d/%m/%Y")
-    
-    print(f"   📅 Fecha de vencimiento del recibo: {date_expired}")
-    
-    notifications = await calcom.schedule_payment_notifications(
-        service_type="LUZ",
-        company="ELECTRODUNAS",
-        amount_total=150.50,
-        date_expired=date_expired,  # dd/MM/yyyy
-        consumption_period="ENERO 2026",
-        attendee_email="pecheaparcana1998@gmail.com",
-        attendee_name="Luis Peche",
-        phone_number="+51966524537",
-        additional_emails=["jessepickman20@gmail.com"]  # Correos adicionales
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from api.middleware import correlation_id_middleware, tracing_middleware
+from api.routes.receipts import router as receipts_router
+from maivi_agent.application.graph import get_batch_workflow, get_workflow
+from maivi_agent.infrastructure.container import get_container
+from shared.init_logger import init_logger
+from shared.config import settings
+from shared.metrics import get_metrics
+from shared.tracing import get_tracer
+
+log = init_logger("App")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializa los recursos antes de aceptar tráfico y los libera al apagar."""
+    started = time.perf_counter()
+    log.info("🚀 Iniciando Maivi Agent")
+
+    container = get_container()
+    await container.startup()
+    get_workflow()
+    get_batch_workflow()
+
+    app.state.startup_seconds = time.perf_counter() - started
+    log.info(f"✅ Maivi Agent listo en {app.state.startup_seconds * 1000:.0f} ms")
+
+    try:
+        yield
+    finally:
+        log.info("🛑 Apagando Maivi Agent")
+        await container.shutdown()
+        get_tracer().shutdown()
+
+
+def create_app() -> FastAPI:
+    """
+    Crea la aplicación FastAPI con sus rutas y su ciclo de vida.
+
+    Returns:
+        FastAPI: Aplicación lista para servir con uvicorn
+    """
+    app = FastAPI(
+        title="Maivi Agent",
+        description="Clasificación de recibos de agua, luz y gas y recordatorios de pago",
+        version="0.1.0",
+        lifespan=lifespan
     )
-    
-    print(f"✅ Resultado: {len(notifications)} notificaciones programadas")
-    print()
-    
-    for notif in notifications:
-        notif_type = "Un día antes" if notif["type"] == "day_before" else "Día del vencimiento"
-        booking = notif["booking"]
-        print(f"  📅 {notif_type}")
-        print(f"     ID: {booking.get('id')}")
-        print(f"     Inicio: {booking.get('start')}")
-        print()
-
-async def test_schedule_notifications():
-    """Prueba la programación de notificaciones de pago."""
-    
-    # Obtener el servicio
-    calendar_service = get_google_calendar_service()
-    
-    # Datos de ejemplo de un recibo
-    result = await calendar_service.schedule_payment_notifications(
-        service_type="LUZ",
-        company="ENEL",
-        amount_total=150.75,
-        date_expired="20/02/2026",  # 8 días después de hoy (12/02/2026)
-        consumption_period="Enero 2026",
-        attendee_email="pecheaparcana1998@gmail.com",  # 👈 Cambia este email
-        attendee_name="María Angela",
-        phone_number="+51987654321",
-        additional_emails=[]  # Opcional
+    app.state.startup_seconds = None
+    # El último middleware registrado es el más externo: el correlation id ya
+    # está asignado cuando se abre el span de la petición
+    app.middleware("http")(tracing_middleware)
+    app.middleware("http")(correlation_id_middleware)
+    app.include_router(receipts_router)
+
+    @app.get("/health", tags=["health"])
+    async def health():
+        """Estado del servicio y tiempo que tomó el arranque."""
+        return {"status": "ok", "startup_seconds": app.state.startup_seconds}
+
+    @app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+    async def metrics():
+        """Métricas del proceso en formato de texto de Prometheus."""
+        return PlainTextResponse(get_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+app = create_app()
+
+
+def main():
+    """
+    Levanta el servidor con uvicorn.
+
+    Con API_WORKERS > 1 cada worker es un proceso con su propio contenedor y su
+    propio lifespan. El estado en memoria (sesiones del grafo, serialización por
+    usuario, idempotencia y cola de admisión) es local a cada worker.
+    """
+    import uvicorn
+
+    uvicorn.run(
+        "app:app",
+        app_dir=str(Path(__file__).parent),
+        host=settings.API_HOST,
+        port=settings.API_PORT,
+        workers=settings.API_WORKERS,
+        log_config=None
     )
-    
-    print("\n" + "="*60)
-    print("RESULTADOS DE LA PROGRAMACIÓN")
-    print("="*60)
-    
-    if result:
-        for notification in result:
-            print(f"\n📅 Tipo: {notification['type']}")
-            event = notification['event']
-            print(f"   ID: {event.get('id')}")
-            print(f"   Título: {event.get('summary')}")
-            print(f"   Inicio: {event.get('start', {}).get('dateTime')}")
-            print(f"   Link: {event.get('htmlLink')}")
-    else:
-        print("\n⚠️  No se programaron notificaciones")
-        print("Verifica tu configuración en el archivo .env:")
-        print("  - GOOGLE_CALENDAR_ID")
-        print("  - GOOGLE_CALENDAR_CREDENTIALS_PATH")
-    
-    print("\n" + "="*60)
 
 
 if __name__ == "__main__":
-    #asyncio.run(imagekit_io())
-    #insert_data_mongo()
-    #save_graph_image()
-    asyncio.run(test_schedule_notifications())
\ No newline at end of file
+    main()
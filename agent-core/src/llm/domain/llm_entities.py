@@ -1,9 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import List, Any, Optional, Type
 
 from pydantic import BaseModel
 from shared.config import settings
+from shared.image_buffer import ImageBuffer
 
 class UserInputType(Enum):
     TEXT = "TEXT"
@@ -13,17 +14,18 @@ class UserInputType(Enum):
 @dataclass
 class LlmConfig:
     model: str
-    name_agent: str = settings.NAME_AGENT
+    name_agent: str = field(default_factory=lambda: settings.NAME_AGENT)
     temperature: float = 0.0
-    api_key: str = settings.OPEN_AI_KEY
+    api_key: str = field(default_factory=lambda: settings.OPEN_AI_KEY)
     
     
 @dataclass
 class LLMRequestConfig:
-    """Para analizar una imagen debes elegir el type (IMAGE)y llenar el campo image_base64"""
+    """Para analizar una imagen debes elegir el type (IMAGE)y llenar el campo image (o image_base64)"""
     input_type: UserInputType
     prompt: str
     image_base64: Optional[str] = None
+    image: Optional[ImageBuffer] = None  # Imagen ya decodificada; su data URL se reutiliza entre llamadas
     tools: Optional[List[Any]] = None
     structured_output: Optional[Type[BaseModel]] = None
     temperature: float = 0.0
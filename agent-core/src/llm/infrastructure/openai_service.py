@@ -1,9 +1,9 @@
-import base64
 from typing import Dict, Callable
 from llm.domain.llm_entities import LLMRequestConfig, LlmConfig
 from llm.domain.llm_exceptions import ServiceLLMError, LLMServiceConfigurationError
 from llm.domain.llm_service import LlmService
 from llm.infrastructure.openai_client import OpenAIClient
+from shared.image_buffer import ImageBuffer
 from shared.init_logger import init_logger
 from shared.config import settings
 
@@ -38,7 +38,12 @@ class OpenAiService(LlmService):
                 self.log.info("[INFRASTRUCTURE] establishing an output structure for the llm")
                 instance_llm = instance_llm.with_structured_output(llm_config.structured_output)
 
-            prompt = self._set_prompt_multimodal(llm_config.input_type.value, llm_config.prompt, image_base64=llm_config.image_base64)
+            prompt = self._set_prompt_multimodal(
+                llm_config.input_type.value,
+                llm_config.prompt,
+                image_base64=llm_config.image_base64,
+                image=llm_config.image
+            )
             
             self.log.debug("[INFRASTRUCTURE] establishing prompt")
         
@@ -61,15 +66,20 @@ class OpenAiService(LlmService):
             self.log.error(f"[ERROR] {error.to_dict()}")
             raise error
 
-    def _create_image_prompt(self, system_prompt: str, image_base64: str = None, image_path: str = None) -> ChatPromptTemplate:
+    def _create_image_prompt(self, system_prompt: str, image_base64: str = None, image_path: str = None, image: ImageBuffer = None) -> ChatPromptTemplate:
         """Crea un prompt multimodal con imagen.
         
         Args:
             system_prompt: El prompt del sistema
             image_base64: Imagen ya codificada en base64 (opcional)
             image_path: Ruta a la imagen para codificar (opcional)
+            image: Imagen decodificada; tiene prioridad y su data URL se codifica una sola vez (opcional)
         """
         self.log.info(f"[INFRASTRUCTURE] Creating image prompt strategy for multimodal input.")
+        
+        if image is None and image_path:
+            image = ImageBuffer.from_file(image_path)
+        image_url = image.data_url if image is not None else f"data:image/jpeg;base64,{image_base64}"
 
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
@@ -78,7 +88,7 @@ class OpenAiService(LlmService):
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_base64}"
+                        "url": image_url
                     }
                 }
             ])
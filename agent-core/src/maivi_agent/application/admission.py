@@ -0,0 +1,230 @@
+"""
+Control de admisión y backpressure para las ejecuciones del grafo.
+
+La admisión se decide en tres momentos:
+- antes de leer el cuerpo, se reservan los bytes que declara (`reserve`) y se
+  rechaza si la cola o el presupuesto de memoria están llenos; la petición
+  cuenta en la cola desde ese momento hasta que termina
+- con el número ya conocido, se limita cuántas peticiones tiene en curso cada
+  usuario (`reserve_phone`)
+- el turno de ejecución (`slot`) solo se toma alrededor de la ejecución del
+  grafo, no mientras la petición espera en la cola de su usuario
+
+Los turnos se reparten en round-robin por número de teléfono, de modo que un
+usuario que envía muchas imágenes no acapara la capacidad del resto. Cuando no
+hay capacidad la petición se rechaza de inmediato con una estimación de cuándo
+reintentar.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
+from shared.init_logger import init_logger
+from shared.config import settings
+
+
+class AdmissionRejectedError(Exception):
+    """Se lanza cuando no hay capacidad para admitir una nueva ejecución."""
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Servicio saturado: {reason}. Reintente en {retry_after} segundos")
+
+
+@dataclass
+class _Ticket:
+    phone_number: str
+    future: asyncio.Future
+
+
+class AdmissionController:
+    """Cola de admisión acotada con equidad por usuario."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queued: int = 100,
+        max_queued_bytes: int = 256 * 1024 * 1024,
+        max_per_phone: int = 3
+    ):
+        """
+        Args:
+            max_in_flight: Ejecuciones del grafo simultáneas
+            max_queued: Ejecuciones esperando turno
+            max_queued_bytes: Bytes de cuerpos de petición retenidos entre lectura, cola y ejecución
+            max_per_phone: Peticiones simultáneas (en cola o en ejecución) por usuario
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max(0, max_queued)
+        self.max_queued_bytes = max_queued_bytes
+        self.max_per_phone = max(1, max_per_phone)
+
+        self._in_flight = 0
+        self._queued = 0
+        # Peticiones admitidas por `reserve` que aún no terminan (en cola o en ejecución)
+        self._admitted = 0
+        self._held_bytes = 0
+        self._per_phone: dict[str, int] = {}
+        self._waiting: OrderedDict[str, deque[_Ticket]] = OrderedDict()
+
+        # Media móvil del tiempo de ejecución, para estimar Retry-After
+        self._avg_service_seconds = 5.0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.log = init_logger(self.__class__.__name__)
+
+    @contextmanager
+    def reserve(self, size_bytes: int) -> Iterator[None]:
+        """
+        Reserva memoria para el cuerpo de una petición antes de leerlo.
+
+        Args:
+            size_bytes: Tamaño declarado del cuerpo (o el máximo permitido si no se declara)
+
+        Raises:
+            AdmissionRejectedError: Si la cola o el presupuesto de bytes están llenos
+        """
+        reason = None
+        if self._admitted >= self.max_in_flight + self.max_queued:
+            reason = "la cola de procesamiento está llena"
+        elif self._held_bytes + size_bytes > self.max_queued_bytes:
+            reason = "se alcanzó el límite de memoria para imágenes en proceso"
+        if reason:
+            self._reject(reason)
+
+        self._admitted += 1
+        self._held_bytes += size_bytes
+        try:
+            yield
+        finally:
+            self._admitted -= 1
+            self._held_bytes -= size_bytes
+
+    @contextmanager
+    def reserve_phone(self, phone_number: str) -> Iterator[None]:
+        """
+        Cuenta la petición en el cupo de su usuario mientras esté en cola o en ejecución.
+
+        Raises:
+            AdmissionRejectedError: Si el usuario ya tiene el máximo de peticiones en curso
+        """
+        if self._per_phone.get(phone_number, 0) >= self.max_per_phone:
+            self._reject("demasiadas solicitudes en curso para este usuario", phone_number)
+
+        self._per_phone[phone_number] = self._per_phone.get(phone_number, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._per_phone[phone_number] - 1
+            if remaining:
+                self._per_phone[phone_number] = remaining
+            else:
+                del self._per_phone[phone_number]
+
+    @asynccontextmanager
+    async def slot(self, phone_number: str) -> AsyncIterator[None]:
+        """
+        Toma un turno de ejecución del grafo, esperando en cola si hace falta.
+
+        Args:
+            phone_number: Número de teléfono del usuario, para repartir los turnos
+        """
+        await self._acquire(phone_number)
+        self.admitted_total += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * elapsed
+            self._in_flight -= 1
+            self._grant_next()
+
+    def snapshot(self) -> dict:
+        """Ocupación actual de la cola de admisión."""
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self._queued,
+            "admitted": self._admitted,
+            "max_queued": self.max_queued,
+            "held_bytes": self._held_bytes,
+            "max_queued_bytes": self.max_queued_bytes,
+            "phones_waiting": len(self._waiting),
+            "phones_active": len(self._per_phone),
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "avg_service_seconds": round(self._avg_service_seconds, 3),
+        }
+
+    def _reject(self, reason: str, phone_number: Optional[str] = None) -> None:
+        self.rejected_total += 1
+        retry_after = self._retry_after()
+        origin = f" de {phone_number}" if phone_number else ""
+        self.log.warning(f"🚦 Petición{origin} rechazada: {reason} (Retry-After={retry_after}s)")
+        raise AdmissionRejectedError(reason, retry_after)
+
+    def _retry_after(self) -> int:
+        """Estima en cuántos segundos habrá capacidad según la cola y el tiempo medio de ejecución."""
+        waves = (max(0, self._admitted - self.max_in_flight) // self.max_in_flight) + 1
+        return int(min(60, max(1, round(waves * self._avg_service_seconds))))
+
+    async def _acquire(self, phone_number: str) -> None:
+        if self._in_flight < self.max_in_flight and not self._queued:
+            self._in_flight += 1
+            return
+
+        ticket = _Ticket(phone_number, asyncio.get_running_loop().create_future())
+        self._waiting.setdefault(phone_number, deque()).append(ticket)
+        self._queued += 1
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # Se concedió el turno justo cuando se canceló: devolverlo
+                self._in_flight -= 1
+                self._grant_next()
+            else:
+                self._remove(ticket)
+            raise
+
+    def _remove(self, ticket: _Ticket) -> None:
+        queue = self._waiting.get(ticket.phone_number)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            self._queued -= 1
+            if not queue:
+                del self._waiting[ticket.phone_number]
+
+    def _grant_next(self) -> None:
+        """Concede los turnos libres en round-robin entre los usuarios en espera."""
+        while self._in_flight < self.max_in_flight and self._waiting:
+            phone_number, queue = self._waiting.popitem(last=False)
+            ticket = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiting[phone_number] = queue
+            if ticket.future.done():
+                continue
+            self._in_flight += 1
+            ticket.future.set_result(None)
+
+
+# Instancia singleton
+_admission_controller = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Obtiene la instancia del control de admisión."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_queued=settings.ADMISSION_MAX_QUEUED,
+            max_queued_bytes=settings.ADMISSION_MAX_QUEUED_BYTES,
+            max_per_phone=settings.ADMISSION_MAX_PER_PHONE
+        )
+    return _admission_controller
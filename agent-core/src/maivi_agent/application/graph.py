@@ -1,14 +1,57 @@
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from maivi_agent.domain.state import ReceiptState
-from maivi_agent.application.nodes import WorkFlowNodes
+"""
+Grafos de LangGraph para el procesamiento de recibos.
+
+LangGraph y los nodos (que arrastran LangChain y los clientes de las
+integraciones) se importan al compilar el grafo, no al importar este módulo.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from maivi_agent.domain.state import BatchReceiptState, ReceiptState
 from maivi_agent.infrastructure.container import get_container
 from shared.init_logger import init_logger
+from shared.config import settings
+
+if TYPE_CHECKING:
+    from maivi_agent.application.nodes import WorkFlowNodes
 
 
 log = init_logger("ReceiptWorkflow")
 
 
+def _create_nodes() -> WorkFlowNodes:
+    """Construye los nodos del flujo con las dependencias del contenedor."""
+    from maivi_agent.application.nodes import WorkFlowNodes
+
+    from maivi_agent.application.inflight_images import get_inflight_images
+
+    container = get_container()
+    return WorkFlowNodes(
+        llm_service=container.instance_openai_service,
+        wsp_service=container.wsp_service,
+        image_service=container.storage_service,
+        receipts_repository=container.receipt_repository,
+        batch_concurrency=settings.BATCH_MAX_CONCURRENCY,
+        images=get_inflight_images()
+    )
+
+
+def _create_checkpointer():
+    """
+    Checkpointer en memoria que reconstruye los tipos propios del estado.
+
+    El estado guarda los datos extraídos como `ExtractedData`; registrarlo evita
+    que el serializador lo trate como tipo desconocido (aviso en cada lectura del
+    checkpoint). La imagen no entra en los checkpoints: el estado solo lleva su
+    hash, y el runner borra los checkpoints de cada usuario al terminar su ejecución.
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from maivi_agent.domain.entities import ExtractedData
+
+    return MemorySaver(serde=JsonPlusSerializer(allowed_msgpack_modules=[ExtractedData]))
+
+
 def create_receipt_workflow():
     """
     Crea y compila el grafo de procesamiento de recibos con soporte para reintentos.
@@ -24,31 +67,28 @@ def create_receipt_workflow():
     Returns:
         CompiledGraph: Grafo compilado con persistencia e interrupciones configuradas
     """
+    from langgraph.graph import StateGraph, START, END
+    from maivi_agent.application.instrumentation import instrument_node
+
     log.info("[GRAPH] Creating receipt processing workflow")
 
-    # Obtener dependencias del contenedor
-    container = get_container()
-    nodes = WorkFlowNodes(
-        llm_service=container.instance_openai_service,
-        wsp_service=container.wsp_service,
-        image_service=container.storage_service,
-        receipts_repository=container.receipt_repository
-    )
+    nodes = _create_nodes()
 
     # Crear el grafo con el esquema de estado
     workflow = StateGraph(ReceiptState)
 
     # ===== AGREGAR NODOS =====
+    # Cada nodo se envuelve con instrument_node para registrar su duración y resultado
     log.info("[GRAPH] Adding nodes to workflow")
-    workflow.add_node("classify_image_node", nodes.classify_image_node)
-    workflow.add_node("decision_nodes_with_interrupt", nodes.decision_nodes_with_interrupt)
-    workflow.add_node("data_extraction_node", nodes.data_extraction_node)
-    workflow.add_node("upload_image_node", nodes.upload_image_node)
-    workflow.add_node("persistence_data_node", nodes.persistence_data_node)
-    workflow.add_node("send_confirmation_node", nodes.send_confirmation_node)
-    workflow.add_node("max_intent_node", nodes.max_intent_node)
-    workflow.add_node("max_intent_limit_node", nodes.max_intent_limit_node)
-    workflow.add_node("end_node", nodes.end_node)
+    workflow.add_node("classify_image_node", instrument_node("classify_image_node", nodes.classify_image_node))
+    workflow.add_node("decision_nodes_with_interrupt", instrument_node("decision_nodes_with_interrupt", nodes.decision_nodes_with_interrupt))
+    workflow.add_node("data_extraction_node", instrument_node("data_extraction_node", nodes.data_extraction_node))
+    workflow.add_node("upload_image_node", instrument_node("upload_image_node", nodes.upload_image_node))
+    workflow.add_node("persistence_data_node", instrument_node("persistence_data_node", nodes.persistence_data_node))
+    workflow.add_node("send_confirmation_node", instrument_node("send_confirmation_node", nodes.send_confirmation_node))
+    workflow.add_node("max_intent_node", instrument_node("max_intent_node", nodes.max_intent_node))
+    workflow.add_node("max_intent_limit_node", instrument_node("max_intent_limit_node", nodes.max_intent_limit_node))
+    workflow.add_node("end_node", instrument_node("end_node", nodes.end_node))
 
     # ===== DEFINIR FLUJO =====
     log.info("[GRAPH] Defining workflow edges")
@@ -71,14 +111,56 @@ def create_receipt_workflow():
     # ===== COMPILAR CON PERSISTENCIA E INTERRUPCIONES =====
     log.info("[GRAPH] Compiling workflow with checkpointer and interruptions")
     
-    compiled_graph = workflow.compile()
+    # El checkpointer guarda el estado por thread_id (número de teléfono),
+    # necesario para get_state y para continuar sesiones pausadas; las sesiones
+    # terminadas se borran al acabar cada ejecución (ReceiptSessionRunner)
+    compiled_graph = workflow.compile(checkpointer=_create_checkpointer())
     
     log.info("[GRAPH] Workflow compiled successfully")
     return compiled_graph
 
 
+def create_batch_receipt_workflow():
+    """
+    Crea y compila el grafo para procesar varias imágenes de un usuario a la vez.
+    
+    El flujo es lineal y sin reintentos:
+    1. Clasificar y extraer datos de todas las imágenes en paralelo (concurrencia acotada)
+    2. Subir las imágenes válidas en paralelo
+    3. Guardar todos los recibos con una inserción masiva
+    4. Enviar un único mensaje de confirmación combinado
+
+    Returns:
+        CompiledGraph: Grafo compilado para el modo lote
+    """
+    from langgraph.graph import StateGraph, START, END
+    from maivi_agent.application.instrumentation import instrument_node
+
+    log.info("[GRAPH] Creating batch receipt processing workflow")
+
+    nodes = _create_nodes()
+    workflow = StateGraph(BatchReceiptState)
+
+    workflow.add_node("batch_process_images_node", instrument_node("batch_process_images_node", nodes.batch_process_images_node))
+    workflow.add_node("batch_upload_images_node", instrument_node("batch_upload_images_node", nodes.batch_upload_images_node))
+    workflow.add_node("batch_persistence_node", instrument_node("batch_persistence_node", nodes.batch_persistence_node))
+    workflow.add_node("batch_send_confirmation_node", instrument_node("batch_send_confirmation_node", nodes.batch_send_confirmation_node))
+
+    # - batch_process_images_node -> batch_upload_images_node
+    # - batch_upload_images_node -> batch_persistence_node
+    # - batch_persistence_node -> batch_send_confirmation_node
+    workflow.add_edge(START, "batch_process_images_node")
+    workflow.add_edge("batch_send_confirmation_node", END)
+
+    compiled_graph = workflow.compile()
+
+    log.info("[GRAPH] Batch workflow compiled successfully")
+    return compiled_graph
+
+
 # Instancia singleton del grafo compilado
 _compiled_workflow = None
+_compiled_batch_workflow = None
 
 
 def get_workflow():
@@ -92,3 +174,16 @@ def get_workflow():
     if _compiled_workflow is None:
         _compiled_workflow = create_receipt_workflow()
     return _compiled_workflow
+
+
+def get_batch_workflow():
+    """
+    Obtiene la instancia singleton del grafo de procesamiento en lote.
+    
+    Returns:
+        CompiledGraph: Grafo compilado listo para usar
+    """
+    global _compiled_batch_workflow
+    if _compiled_batch_workflow is None:
+        _compiled_batch_workflow = create_batch_receipt_workflow()
+    return _compiled_batch_workflow
@@ -0,0 +1,100 @@
+"""
+Supresión de entregas duplicadas del webhook de WhatsApp.
+
+El puente de WhatsApp reintenta el POST cuando se agota su timeout. Cada petición
+se identifica con una clave de idempotencia (el id de mensaje del cliente o, si no
+viene, el teléfono más el hash de la imagen): si la clave ya terminó se devuelve
+el resultado guardado, y si todavía está en curso la petición repetida espera a
+la ejecución original en lugar de lanzar otra. Si la original se cancela (el
+cliente se desconectó), una de las peticiones que esperaban toma su lugar y
+ejecuta la operación; las demás pasan a esperar a esa.
+"""
+import hashlib
+from typing import Any, Awaitable, Callable, Optional
+from maivi_agent.domain.idempotency_store import IdempotencyStore
+from maivi_agent.infrastructure.container import get_container
+from shared.image_buffer import ImageBuffer
+from shared.init_logger import init_logger
+from shared.single_flight import SingleFlight
+from shared.config import settings
+
+
+def build_idempotency_key(phone_number: str, message_id: Optional[str] = None, image_sha256: Optional[str] = None) -> str:
+    """
+    Construye la clave de idempotencia de una petición.
+
+    Args:
+        phone_number: Número de teléfono del usuario
+        message_id: Id de mensaje enviado por el cliente (tiene prioridad)
+        image_sha256: Hash de la imagen (o de las imágenes, en lote)
+
+    Returns:
+        str: Clave de idempotencia
+    """
+    if message_id:
+        return f"{phone_number}:msg:{message_id}"
+    return f"{phone_number}:sha256:{image_sha256}"
+
+
+def hash_images(images: list[ImageBuffer]) -> str:
+    """Calcula un hash estable para una o varias imágenes a partir de sus hashes ya calculados."""
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(image.sha256.encode())
+    return digest.hexdigest()
+
+
+class IdempotencyGuard:
+    """Ejecuta cada clave de idempotencia una sola vez mientras dure su TTL."""
+
+    def __init__(self, store: IdempotencyStore, ttl_seconds: float = 600):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: SingleFlight[Any] = SingleFlight()
+        self.log = init_logger(self.__class__.__name__)
+
+    async def run(self, key: str, operation: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Ejecuta la operación si la clave es nueva o devuelve el resultado previo.
+
+        Args:
+            key: Clave de idempotencia
+            operation: Función asíncrona que produce un resultado serializable
+
+        Returns:
+            tuple[Any, bool]: Resultado y si fue reutilizado de una ejecución anterior
+        """
+        if key in self._in_flight:
+            self.log.info(f"♻️  Petición duplicada en curso, esperando resultado original: {key}")
+        else:
+            stored = await self.store.get(key)
+            if stored is not None:
+                self.log.info(f"♻️  Petición duplicada ya completada, devolviendo resultado guardado: {key}")
+                return stored, True
+
+        async def persist(result: Any) -> None:
+            # Los duplicados en espera ya recibieron el resultado; los que lleguen mientras
+            # se guarda lo toman de la ejecución en curso, que sigue registrada
+            try:
+                await self.store.set(key, result, self.ttl_seconds)
+            except Exception as e:
+                # La operación ya se ejecutó: un fallo del store solo pierde la deduplicación de reintentos futuros
+                self.log.error(f"❌ No se pudo guardar el resultado de la clave de idempotencia {key}: {e}")
+
+        # Los errores no se guardan: un reintento posterior debe poder ejecutarse
+        return await self._in_flight.run(key, operation, on_result=persist)
+
+
+# Instancia singleton
+_idempotency_guard = None
+
+
+def get_idempotency_guard() -> IdempotencyGuard:
+    """Obtiene la instancia del guardián de idempotencia."""
+    global _idempotency_guard
+    if _idempotency_guard is None:
+        _idempotency_guard = IdempotencyGuard(
+            store=get_container().idempotency_store,
+            ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS
+        )
+    return _idempotency_guard
@@ -0,0 +1,65 @@
+"""
+Imágenes en proceso, fuera del estado del grafo.
+
+El checkpointer guarda una copia del estado del grafo en cada paso: si la imagen
+viajara en el estado, cada checkpoint retendría varios MB. El estado solo lleva
+el hash de la imagen (`image_sha256`) y los bytes quedan aquí mientras dura la
+ejecución que los usa; al terminar se sueltan. Las referencias se cuentan por
+hash porque dos ejecuciones pueden traer la misma imagen a la vez.
+"""
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from shared.image_buffer import ImageBuffer
+
+
+class InFlightImages:
+    """Registro hash -> imagen de las ejecuciones del grafo en curso."""
+
+    def __init__(self):
+        self._images: dict[str, tuple[ImageBuffer, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    @contextmanager
+    def hold(self, image: ImageBuffer) -> Iterator[str]:
+        """
+        Mantiene la imagen disponible para los nodos mientras dure el bloque.
+
+        Yields:
+            str: Hash de la imagen, la referencia que se guarda en el estado
+        """
+        held, count = self._images.get(image.sha256, (image, 0))
+        self._images[image.sha256] = (held, count + 1)
+        try:
+            yield image.sha256
+        finally:
+            held, count = self._images[image.sha256]
+            if count > 1:
+                self._images[image.sha256] = (held, count - 1)
+            else:
+                del self._images[image.sha256]
+
+    def get(self, image_sha256: Optional[str]) -> ImageBuffer:
+        """
+        Obtiene la imagen de una ejecución en curso.
+
+        Raises:
+            LookupError: Si ninguna ejecución en curso retiene esa imagen
+        """
+        entry = self._images.get(image_sha256) if image_sha256 else None
+        if entry is None:
+            raise LookupError(f"La imagen {str(image_sha256)[:12]} no está en proceso")
+        return entry[0]
+
+
+# Instancia singleton
+_inflight_images = None
+
+
+def get_inflight_images() -> InFlightImages:
+    """Obtiene el registro de imágenes en proceso."""
+    global _inflight_images
+    if _inflight_images is None:
+        _inflight_images = InFlightImages()
+    return _inflight_images
@@ -0,0 +1,100 @@
+"""
+Instrumentación de los nodos del grafo.
+
+`instrument_node` envuelve cada nodo registrado en el grafo, sin tocar la lógica
+de `WorkFlowNodes`, para:
+- abrir un span hijo del span de la petición (exportado en OTLP)
+- observar su latencia en un histograma HDR por nodo y resultado (/metrics)
+- emitir un registro de tiempos con campos estructurados (node, duration_ms, outcome)
+"""
+import functools
+import inspect
+import time
+from typing import Any, Callable, Optional
+from langgraph.errors import GraphInterrupt
+from langgraph.types import Command
+from shared.init_logger import init_logger
+from shared.metrics import get_metrics
+from shared.tracing import STATUS_OK, Span, get_tracer
+
+log = init_logger("NodeTiming")
+
+NODE_DURATION = get_metrics().histogram(
+    "maivi_graph_node_duration_seconds",
+    "Duración de cada nodo del grafo de recibos por resultado"
+)
+
+
+def _outcome(result: Any) -> str:
+    """Describe el resultado de un nodo: a qué nodo salta o simplemente ok."""
+    if isinstance(result, Command) and result.goto:
+        goto = result.goto if isinstance(result.goto, str) else ",".join(map(str, result.goto))
+        return f"goto:{goto}"
+    return "ok"
+
+
+def _error_outcome(error: BaseException, span: Optional[Span]) -> str:
+    # interrupt() pausa el grafo lanzando GraphInterrupt: no es un fallo del nodo
+    if isinstance(error, GraphInterrupt):
+        if span is not None:
+            span.status_code = STATUS_OK
+        return "interrupt"
+    return f"error:{type(error).__name__}"
+
+
+def _record(name: str, started: float, outcome: str, span: Optional[Span]) -> None:
+    elapsed = time.perf_counter() - started
+    duration_ms = elapsed * 1000
+    NODE_DURATION.observe(elapsed, node=name, outcome=outcome)
+    if span is not None:
+        span.set_attribute("graph.node.outcome", outcome)
+    log.info(
+        f"⏱️  {name} {outcome} en {duration_ms:.1f} ms",
+        extra={"node": name, "duration_ms": round(duration_ms, 3), "outcome": outcome}
+    )
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """
+    Envuelve un nodo (síncrono o asíncrono) con un span, un histograma y un log de tiempos.
+
+    La firma y las anotaciones de retorno (`Command[Literal[...]]`) se conservan,
+    así LangGraph sigue infiriendo las aristas del grafo.
+
+    Args:
+        name: Nombre con el que el nodo se registra en el grafo
+        node: Función del nodo
+
+    Returns:
+        Callable: Nodo instrumentado
+    """
+    tracer = get_tracer()
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(*args, **kwargs):
+            with tracer.start_span(f"graph.node {name}", **{"graph.node": name}) as span:
+                started = time.perf_counter()
+                try:
+                    result = await node(*args, **kwargs)
+                except BaseException as e:
+                    _record(name, started, _error_outcome(e, span), span)
+                    raise
+                _record(name, started, _outcome(result), span)
+                return result
+
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(*args, **kwargs):
+        with tracer.start_span(f"graph.node {name}", **{"graph.node": name}) as span:
+            started = time.perf_counter()
+            try:
+                result = node(*args, **kwargs)
+            except BaseException as e:
+                _record(name, started, _error_outcome(e, span), span)
+                raise
+            _record(name, started, _outcome(result), span)
+            return result
+
+    return wrapper
@@ -2,26 +2,111 @@ from llm.domain.llm_entities import LLMRequestConfig, UserInputType
 from llm.domain.llm_service import LlmService
 from maivi_agent.domain.image_storage import ImageStorage
 from maivi_agent.domain.receipts_repository import ReceiptsRepository
-from maivi_agent.domain.state import ReceiptState
+from maivi_agent.domain.state import BatchReceiptState, ReceiptState
+from maivi_agent.application.inflight_images import InFlightImages, get_inflight_images
 from maivi_agent.domain.entities import ClassifyModel, ExtractedData, ReceiptDataSave
 from maivi_agent.infrastructure.whatsapp_service import WhatsAppService
 from maivi_agent.infrastructure.calcom_notification_service import get_calcom_service
+from shared.image_buffer import ImageBuffer
 from shared.init_logger import init_logger
 from shared.prompts import PromptManager
 from shared.config import settings
 from langgraph.types import Command
-from typing import Literal
+from typing import Literal, Optional
+import asyncio
+
+VALID_SERVICES = ("AGUA", "LUZ", "GAS")
+SERVICE_ICONS = {"LUZ": "💡", "AGUA": "💧", "GAS": "🔥"}
 
 class WorkFlowNodes:
     """class WorkFlowNodes"""
     
-    def __init__(self,llm_service : LlmService, wsp_service: WhatsAppService, image_service: ImageStorage, receipts_repository:ReceiptsRepository):
+    def __init__(self,llm_service : LlmService, wsp_service: WhatsAppService, image_service: ImageStorage, receipts_repository:ReceiptsRepository, batch_concurrency: int = 3, images: Optional[InFlightImages] = None):
         self.llm_service = llm_service
         self.wsp_service = wsp_service
         self.image_service = image_service
         self.receipts_repository = receipts_repository
+        # El estado solo lleva el hash de la imagen; los bytes se leen de aquí
+        self.images = images if images is not None else get_inflight_images()
+        self.batch_concurrency = max(1, batch_concurrency)
         self.log = init_logger(self.__class__.__name__)
 
+    async def _classify_image(self, image: ImageBuffer) -> ClassifyModel:
+        """Clasifica la imagen con el LLM en AGUA, LUZ, GAS o NO_VALIDO."""
+        request_config = LLMRequestConfig(
+            input_type=UserInputType.IMAGE,
+            image=image,
+            prompt= PromptManager.render("SystemPrompts","CLASSIFY_ASSISTANT", name_agent=settings.NAME_AGENT),
+            structured_output= ClassifyModel
+        )
+        chain = await self.llm_service.set_llm_Service(request_config)
+        
+        return await chain.ainvoke({
+            "text_content": PromptManager.render("UserPrompts","BUILD_USER_PROMPT_IMAGE")
+        })
+
+    async def _extract_data(self, image: ImageBuffer) -> ExtractedData:
+        """Extrae monto, vencimiento, período y compañía del recibo con el LLM."""
+        config = LLMRequestConfig(
+            image=image,
+            input_type=UserInputType.IMAGE,
+            temperature=0,
+            prompt= PromptManager.render("SystemPrompts","PROMPT_EXTRACT_DATA", name_agent=settings.NAME_AGENT),
+            structured_output=ExtractedData
+        )
+        
+        response = await self.llm_service.set_llm_Service(config)
+        
+        return await response.ainvoke({
+                "text_content": PromptManager.render("UserPrompts","USER_PROMPT_EXTRACT_DATA")
+            })
+
+    def _build_receipt(
+        self,
+        phone_number: str,
+        service_type: str,
+        is_valid: bool,
+        extracted_data: ExtractedData,
+        link_receipt_image: Optional[str],
+        link_receipt_preview: Optional[str] = None,
+        link_receipt_thumbnail: Optional[str] = None
+    ) -> ReceiptDataSave:
+        """Construye la entidad a persistir a partir de los datos extraídos."""
+        receipt = ReceiptDataSave(
+            phone_number= phone_number,
+            service_type= service_type,
+            is_valid= is_valid,
+            is_notified= False,
+            amount_total= extracted_data.amount_total,
+            date_expired= extracted_data.date_expired,
+            consumption_period= extracted_data.consumption_period,
+            company= extracted_data.company,
+            link_receipt_image= link_receipt_image,
+            link_receipt_preview= link_receipt_preview,
+            link_receipt_thumbnail= link_receipt_thumbnail
+        )
+        if receipt.date_expired_raw is not None:
+            self.log.warning(f"[NODE] Due date could not be parsed, saved as raw text: {receipt.date_expired_raw!r}")
+        return receipt
+
+    async def _schedule_notifications(self, phone_number: str, service_type: str, data_extracted: ExtractedData) -> int:
+        """Programa los recordatorios de pago con CAL.COM y devuelve cuántos se crearon."""
+        calcom = get_calcom_service()
+        # Generar email basado en el número de teléfono
+        phone_clean = (phone_number or "").replace("+", "")
+        attendee_email = f"{phone_clean}@notification.maivi.com"
+
+        notifications = await calcom.schedule_payment_notifications(
+            service_type=service_type or "SERVICIO",
+            company=data_extracted.company or "Compañía",
+            amount_total=data_extracted.amount_total or 0.0,
+            date_expired=data_extracted.date_expired or "N/A",
+            consumption_period=data_extracted.consumption_period or "N/A",
+            attendee_email=attendee_email,
+            attendee_name=f"Usuario {phone_clean}",
+            phone_number=phone_number
+        )
+        return len(notifications)
     
     async def classify_image_node(self, state: ReceiptState) -> Command[Literal["decision_nodes_with_interrupt","end_node"]]:
         self.log.info("[NODE - classify_image_node] Classifying image node started.")
@@ -31,17 +116,7 @@ class WorkFlowNodes:
             return Command(goto="end_node" ,update=state)
 
         try:
-            request_config = LLMRequestConfig(
-                input_type=UserInputType.IMAGE,
-                image_base64=state["image_base64"],
-                prompt= PromptManager.get_prompt("SystemPrompts","CLASSIFY_ASSISTANT").content.format(name_agent ="maivi"),
-                structured_output= ClassifyModel
-            )
-            chain = await self.llm_service.set_llm_Service(request_config)
-            
-            result = await chain.ainvoke({
-                "text_content": PromptManager.get_prompt("UserPrompts","BUILD_USER_PROMPT_IMAGE").content
-            })
+            result = await self._classify_image(self.images.get(state.get("image_sha256")))
             self.log.info("[NODE - classify_image_node] Classifying image node completed successfully.")
             
             return Command(update ={
@@ -81,21 +156,7 @@ class WorkFlowNodes:
     async def data_extraction_node(self, state: ReceiptState) -> Command[Literal["upload_image_node"]]:
         self.log.info("[NODE - data_extraction_node] start flow node data extraction from receipt. <<%s>>",state.get("service_type"),None)
         
-        promptSystem = PromptManager.get_prompt("SystemPrompts","PROMPT_EXTRACT_DATA").content
-        
-        config = LLMRequestConfig(
-            image_base64=state.get("image_base64"),
-            input_type=UserInputType.IMAGE,
-            temperature=0,
-            prompt= promptSystem.format(name_agent=settings.NAME_AGENT),
-            structured_output=ExtractedData
-        )
-        
-        response = await self.llm_service.set_llm_Service(config)
-        
-        result = await response.ainvoke({
-                "text_content": PromptManager.get_prompt("UserPrompts","USER_PROMPT_EXTRACT_DATA").content
-            })
+        result = await self._extract_data(self.images.get(state.get("image_sha256")))
         
         self.log.info("[NODE - data_extraction_node] Extraction from the receiving flow node, completed successfully")
         
@@ -111,51 +172,60 @@ class WorkFlowNodes:
 
         self.log.info("[NODE - upload_image_node] Start node upload image node")
         
-        image_base64= state.get("image_base64")
+        file_doc= self.images.get(state.get("image_sha256"))
         file_name= state.get("service_type","RECEIPT")
         tag = state.get("service_type")
         
-        url = await self.image_service.upload_image(file_doc=image_base64, file_name=file_name,tags= tag)
+        stored = await self.image_service.upload_image_variants(file_doc=file_doc, file_name=file_name,tags= tag)
         
         self.log.info("[NODE - upload_image_node] Finish node upload image node success")
         
         return Command(update={
             **state,
-            "image_base64" : url
+            "image_url" : stored.url,
+            "image_preview_url": stored.preview_url,
+            "image_thumbnail_url": stored.thumbnail_url
         }, goto="persistence_data_node")
 
-    def persistence_data_node(self, state: ReceiptState) -> Command[Literal["send_confirmation_node"]]:
+    async def persistence_data_node(self, state: ReceiptState) -> Command[Literal["send_confirmation_node"]]:
         
         self.log.info("[NODE - persistence_data_node] start of execution of the persistence node")
         
-        extracted_data = state.get("extracted_data", ExtractedData())
+        extracted_data = state.get("extracted_data")
         
-        body = ReceiptDataSave(
+        body = self._build_receipt(
             phone_number= state.get("phone_number"),
             service_type= state.get("service_type"),
             is_valid= state.get("is_valid", False),
-            is_notified= False,
-            amount_total= extracted_data.amount_total,
-            date_expired= extracted_data.date_expired,
-            consumption_period= extracted_data.consumption_period,
-            company= extracted_data.company,
-            link_receipt_image= state.get("image_base64")
+            extracted_data= extracted_data,
+            link_receipt_image= state.get("image_url"),
+            link_receipt_preview= state.get("image_preview_url"),
+            link_receipt_thumbnail= state.get("image_thumbnail_url")
         )
         
-        response = self.receipts_repository.save_receipt(body)
+        result = await self.receipts_repository.save_receipt(body)
         
-        self.log.info("[NODE - persistence_data_node] Receipt data saved successfully. ID: %s",response)
+        if result.created:
+            self.log.info("[NODE - persistence_data_node] Receipt data saved successfully. ID: %s", result.receipt_id)
+        else:
+            self.log.info("[NODE - persistence_data_node] Receipt already registered. ID: %s", result.receipt_id)
         
-        return Command(update=state, goto="send_confirmation_node")
+        return Command(update={
+            **state,
+            "receipt_id": result.receipt_id,
+            "is_new_receipt": result.created
+        }, goto="send_confirmation_node")
     
     async def send_confirmation_node(self, state: ReceiptState) -> Command[Literal["end_node"]]:
         self.log.info("[NODE] Sending confirmation message to user.")
         
-        data_extracted = state.get("extracted_data",ExtractedData())
+        data_extracted = state.get("extracted_data")
         
-        type_service = {"LUZ": "💡", "AGUA": "💧", "GAS": "🔥"}.get(state["service_type"], "📄")
+        type_service = SERVICE_ICONS.get(state["service_type"], "📄")
+        is_new_receipt = state.get("is_new_receipt") is not False
+        heading = "✅ Tu recibo ha sido procesado exitosamente." if is_new_receipt else "ℹ️ Este recibo ya estaba registrado."
         
-        message = f"""✅ Tu recibo ha sido procesado exitosamente.
+        message = f"""{heading}
         
         Detalles:
         - Tipo de servicio: {type_service} {state.get('service_type')}
@@ -166,26 +236,20 @@ class WorkFlowNodes:
         
         Gracias por usar Maivi, tu asistente de gestión de recibos."""
         
+        # Un recibo ya registrado ya tiene sus recordatorios: no se programan otra vez
+        if not is_new_receipt:
+            self.log.info("[NODE - send_confirmation_node] Receipt already registered, skipping reminders")
+            return Command(update={
+                **state,
+                "message_user": message
+            }, goto="end_node")
+        
         # Programar notificaciones con CAL.COM
         notifications_count = 0
         try:
-            calcom = get_calcom_service()
-            # Generar email basado en el número de teléfono
-            phone_clean = state.get("phone_number", "").replace("+", "")
-            attendee_email = f"{phone_clean}@notification.maivi.com"
-
-            notifications = await calcom.schedule_payment_notifications(
-                service_type=state.get("service_type", "SERVICIO"),
-                company=data_extracted.company or "Compañía",
-                amount_total=data_extracted.amount_total or 0.0,
-                date_expired=data_extracted.date_expired or "N/A",
-                consumption_period=data_extracted.consumption_period or "N/A",
-                attendee_email=attendee_email,
-                attendee_name=f"Usuario {phone_clean}",
-                phone_number=state.get("phone_number")
+            notifications_count = await self._schedule_notifications(
+                state.get("phone_number", ""), state.get("service_type", "SERVICIO"), data_extracted
             )
-
-            notifications_count = len(notifications)
             if notifications_count > 0:
                 self.log.info(f"[NODE - persistence_data_node] {notifications_count} notificaciones programadas")
         except Exception as e:
@@ -219,7 +283,7 @@ class WorkFlowNodes:
             **state,
             "intent_count": intent_count,
             "waiting_for_image": True,
-            "image_base64": ""
+            "image_sha256": None
         })
         
     def max_intent_limit_node(self, state: ReceiptState) -> ReceiptState:
@@ -254,6 +318,144 @@ class WorkFlowNodes:
         
         return state
 
+    # ===== MODO LOTE (varias imágenes por petición) =====
+
+    async def batch_process_images_node(self, state: BatchReceiptState) -> Command[Literal["batch_upload_images_node"]]:
+        """Clasifica y extrae los datos de todas las imágenes en paralelo, con concurrencia acotada."""
+        images = state.get("images", [])
+        self.log.info("[NODE - batch_process_images_node] Processing %s images (concurrency=%s)", len(images), self.batch_concurrency)
+        
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def process(index: int, image: ImageBuffer) -> dict:
+            item = {
+                "index": index,
+                "service_type": "NO_VALIDO",
+                "is_valid": False,
+                "extracted_data": None,
+                "link_receipt_image": None,
+                "link_receipt_preview": None,
+                "link_receipt_thumbnail": None,
+                "receipt_id": None,
+                "is_new": False,
+                "error": None
+            }
+            async with semaphore:
+                try:
+                    classification = await self._classify_image(image)
+                    item["service_type"] = classification.service.value
+                    
+                    if item["service_type"] not in VALID_SERVICES:
+                        return item
+                    
+                    item["extracted_data"] = await self._extract_data(image)
+                    item["is_valid"] = True
+                except Exception as e:
+                    self.log.error("[ERROR] Processing image %s of batch. Details %s", index, e)
+                    item["error"] = str(e)
+            return item
+        
+        items = await asyncio.gather(*(process(i, image) for i, image in enumerate(images)))
+        
+        self.log.info("[NODE - batch_process_images_node] %s of %s images are valid receipts",
+                      sum(1 for item in items if item["is_valid"]), len(items))
+        
+        return Command(update={"items": list(items)}, goto="batch_upload_images_node")
+
+    async def batch_upload_images_node(self, state: BatchReceiptState) -> Command[Literal["batch_persistence_node"]]:
+        """Sube en paralelo las imágenes de los recibos válidos."""
+        images = state.get("images", [])
+        items = [dict(item) for item in state.get("items", [])]
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def upload(item: dict) -> None:
+            image = images[item["index"]]
+            async with semaphore:
+                try:
+                    stored = await self.image_service.upload_image_variants(
+                        file_doc=image,
+                        file_name=item["service_type"],
+                        tags=item["service_type"]
+                    )
+                    item["link_receipt_image"] = stored.url
+                    item["link_receipt_preview"] = stored.preview_url
+                    item["link_receipt_thumbnail"] = stored.thumbnail_url
+                except Exception as e:
+                    self.log.error("[ERROR] Uploading image %s of batch. Details %s", item["index"], e)
+                    item["error"] = str(e)
+        
+        await asyncio.gather(*(upload(item) for item in items if item["is_valid"]))
+        
+        self.log.info("[NODE - batch_upload_images_node] Images uploaded")
+        
+        # Las imágenes ya no se necesitan: liberar memoria del estado
+        return Command(update={"items": items, "images": []}, goto="batch_persistence_node")
+
+    async def batch_persistence_node(self, state: BatchReceiptState) -> Command[Literal["batch_send_confirmation_node"]]:
+        """Guarda todos los recibos válidos con una única inserción masiva."""
+        items = [dict(item) for item in state.get("items", [])]
+        to_save = [item for item in items if item["is_valid"] and item["link_receipt_image"]]
+        
+        if to_save:
+            bodies = [
+                self._build_receipt(
+                    phone_number=state.get("phone_number"),
+                    service_type=item["service_type"],
+                    is_valid=True,
+                    extracted_data=item["extracted_data"],
+                    link_receipt_image=item["link_receipt_image"],
+                    link_receipt_preview=item.get("link_receipt_preview"),
+                    link_receipt_thumbnail=item.get("link_receipt_thumbnail")
+                )
+                for item in to_save
+            ]
+            results = await self.receipts_repository.save_receipts(bodies)
+            for item, result in zip(to_save, results):
+                item["receipt_id"] = result.receipt_id
+                item["is_new"] = result.created
+        
+        self.log.info("[NODE - batch_persistence_node] %s receipts saved in bulk (%s already registered)",
+                      len(to_save), sum(1 for item in to_save if not item["is_new"]))
+        
+        return Command(update={"items": items}, goto="batch_send_confirmation_node")
+
+    async def batch_send_confirmation_node(self, state: BatchReceiptState) -> BatchReceiptState:
+        """Envía un único mensaje con el resumen de todos los recibos y programa sus recordatorios."""
+        phone_number = state.get("phone_number", "")
+        items = state.get("items", [])
+        saved = [item for item in items if item["receipt_id"]]
+        
+        lines = [f"✅ Procesamos {len(saved)} de {len(items)} recibos enviados."]
+        for item in items:
+            position = item["index"] + 1
+            if item["receipt_id"]:
+                data = item["extracted_data"]
+                icon = SERVICE_ICONS.get(item["service_type"], "📄")
+                lines.append(
+                    f"{position}. {icon} {item['service_type']} - {data.company or 'N/A'}: "
+                    f"S/ {data.amount_total} vence {data.date_expired} ({data.consumption_period})"
+                    + ("" if item.get("is_new", True) else " - ya estaba registrado")
+                )
+            else:
+                lines.append(f"{position}. ❌ No se pudo procesar esta imagen. Por favor, envíala nuevamente más clara.")
+        lines.append("")
+        lines.append("Gracias por usar Maivi, tu asistente de gestión de recibos.")
+        message = "\n".join(lines)
+        
+        # Programar recordatorios de todos los recibos nuevos a la vez (los ya registrados ya los tienen)
+        results = await asyncio.gather(
+            *(self._schedule_notifications(phone_number, item["service_type"], item["extracted_data"])
+              for item in saved if item.get("is_new", True)),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.log.error(f"[NODE - batch_send_confirmation_node] Error al programar notificaciones: {result}")
+        
+        self.wsp_service.send_message(to=phone_number, message=message)
+        
+        return {"message_user": message}
+
 '''
     OPCION B USANDO INTERRUP_BEFORE WITH MEMORY
     def data_extraction_node(self, state: ReceiptState) -> Command[Literal["max_intent_node","extracted_data_node"]]:
@@ -312,7 +514,7 @@ class WorkFlowNodes:
                 **state,
                 "intent_count": intent_count,
                 "waiting_for_image": True,
-                "image_base64": "",
+                "image_sha256": None,
                 "message_user": f"La imagen no pudo ser clasificada. Por favor, envía una imagen más clara del recibo. Intento {intent_count} de {limit_intents}."
             }
         )
@@ -0,0 +1,327 @@
+"""
+Serialización de ejecuciones del grafo por usuario.
+
+Cada número de teléfono (thread_id del grafo) tiene un actor propio: las imágenes
+que llegan se encolan y un único worker por usuario las procesa en orden, de modo
+que dos peticiones simultáneas nunca leen ni escriben el mismo estado a la vez.
+Una imagen sola se procesa en cuanto llega; si se acumulan varias, las que llegan
+dentro de una ventana corta desde la segunda se agrupan en una sola ejecución del
+grafo en modo lote. Usuarios distintos tienen workers distintos y
+se ejecutan en paralelo.
+"""
+import asyncio
+import contextvars
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from maivi_agent.application.admission import get_admission_controller
+from maivi_agent.application.graph import get_batch_workflow, get_workflow
+from maivi_agent.application.inflight_images import get_inflight_images
+from shared.image_buffer import ImageBuffer
+from shared.init_logger import init_logger
+from shared.log_context import correlation_id_var
+from shared.config import settings
+
+
+@dataclass
+class WorkflowRunResult:
+    """Resultado de ejecutar el grafo para una imagen."""
+    values: dict[str, Any]
+    next_nodes: Optional[tuple] = None
+
+
+@dataclass
+class BatchRunResult:
+    """Resultado de ejecutar el grafo en modo lote."""
+    items: list[dict[str, Any]]
+    message: str
+
+
+@dataclass
+class _PendingRun:
+    images: list[ImageBuffer]
+    future: asyncio.Future
+    is_batch: bool = False
+    arrived_at: float = 0.0
+    # Contexto de la petición (correlation id, hash del teléfono) para los logs del grafo
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+@dataclass
+class _PhoneSession:
+    pending: list[_PendingRun] = field(default_factory=list)
+    worker: Optional[asyncio.Task] = None
+    arrived: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class ReceiptSessionRunner:
+    """Actor por usuario que serializa y agrupa las ejecuciones del grafo."""
+
+    def __init__(self, coalesce_window: float = 0.5, max_batch_size: int = 5):
+        """
+        Args:
+            coalesce_window: Segundos que el worker espera a más imágenes, contados desde
+                la llegada de la segunda pendiente; una imagen sola no espera
+            max_batch_size: Máximo de peticiones agrupadas en una misma ejecución
+        """
+        self.coalesce_window = coalesce_window
+        self.max_batch_size = max(1, max_batch_size)
+        self._sessions: dict[str, _PhoneSession] = {}
+        self.log = init_logger(self.__class__.__name__)
+
+    @property
+    def active_sessions(self) -> int:
+        """Número de usuarios con imágenes pendientes o en proceso."""
+        return len(self._sessions)
+
+    async def submit(self, phone_number: str, image: ImageBuffer) -> WorkflowRunResult:
+        """
+        Encola una imagen para el usuario y espera el resultado de su ejecución.
+
+        Args:
+            phone_number: Número de teléfono del usuario (thread_id del grafo)
+            image: Imagen decodificada del recibo
+
+        Returns:
+            WorkflowRunResult: Estado final del grafo para esta imagen
+        """
+        return await self._enqueue(phone_number, [image], is_batch=False)
+
+    async def submit_batch(self, phone_number: str, images: list[ImageBuffer]) -> BatchRunResult:
+        """
+        Encola varias imágenes del usuario para procesarlas en una sola ejecución en lote.
+
+        Args:
+            phone_number: Número de teléfono del usuario
+            images: Imágenes decodificadas de los recibos
+
+        Returns:
+            BatchRunResult: Resultado por imagen y mensaje combinado enviado al usuario
+        """
+        return await self._enqueue(phone_number, images, is_batch=True)
+
+    async def _enqueue(self, phone_number: str, images: list[ImageBuffer], is_batch: bool):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        session = self._sessions.setdefault(phone_number, _PhoneSession())
+        session.pending.append(_PendingRun(images, future, is_batch, arrived_at=loop.time()))
+        session.arrived.set()
+
+        if session.worker is None or session.worker.done():
+            session.worker = asyncio.create_task(self._drain(phone_number, session))
+
+        return await future
+
+    async def _drain(self, phone_number: str, session: _PhoneSession) -> None:
+        """Procesa los lotes pendientes de un usuario hasta vaciar su cola."""
+        try:
+            while session.pending:
+                await self._coalesce(session)
+
+                batch = session.pending[:self.max_batch_size]
+                del session.pending[:self.max_batch_size]
+                # Las peticiones canceladas (cliente desconectado) no se procesan
+                batch = [item for item in batch if not item.future.done()]
+                if not batch:
+                    continue
+
+                try:
+                    # El turno de ejecución solo se ocupa mientras el grafo corre, no en la cola del usuario
+                    async with get_admission_controller().slot(phone_number):
+                        await self._run_batch(phone_number, batch)
+                except Exception as e:
+                    # Un fallo fuera de la ejecución del grafo (p. ej. al consultar el checkpointer)
+                    # no debe dejar peticiones esperando ni detener el worker del usuario
+                    self.log.error(f"❌ Error procesando el lote de {phone_number}: {e}")
+                    for item in batch:
+                        if not item.future.done():
+                            item.future.set_exception(e)
+        finally:
+            if self._sessions.get(phone_number) is session and not session.pending:
+                del self._sessions[phone_number]
+
+    async def _coalesce(self, session: _PhoneSession) -> None:
+        """
+        Con más de una petición pendiente, espera a que lleguen más para agruparlas.
+
+        La ventana empieza con la llegada de la segunda petición y termina antes si
+        se completa el lote; una petición sola se procesa sin esperar.
+        """
+        if self.coalesce_window <= 0 or len(session.pending) < 2:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = session.pending[1].arrived_at + self.coalesce_window
+        while len(session.pending) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            session.arrived.clear()
+            try:
+                await asyncio.wait_for(session.arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _run_batch(self, phone_number: str, batch: list[_PendingRun]) -> None:
+        """
+        Ejecuta las peticiones agrupadas de un usuario.
+
+        Si en total hay una sola imagen, o el usuario tiene un grafo pausado esperando
+        un reintento, cada petición se ejecuta por separado en orden. En otro caso
+        todas las imágenes se procesan juntas con el grafo en modo lote.
+        """
+        total_images = sum(len(item.images) for item in batch)
+
+        if total_images == 1 or self._is_paused(phone_number):
+            for item in batch:
+                run = asyncio.create_task(self._run_item(phone_number, item), context=item.context)
+                await self._settle([item], run)
+            return
+
+        # El lote combinado se registra con el correlation id de la primera petición
+        correlation_ids = [item.context.get(correlation_id_var) for item in batch]
+        self.log.info(f"📦 Agrupando {total_images} imágenes de {phone_number} en un lote "
+                      f"(peticiones: {', '.join(filter(None, correlation_ids)) or '-'})")
+        run = asyncio.create_task(self._run_combined(phone_number, batch), context=batch[0].context)
+        await self._settle(batch, run)
+
+    async def _settle(self, items: list[_PendingRun], run) -> None:
+        """Espera la ejecución y entrega su resultado (o su error) a cada petición."""
+        try:
+            results = await run
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        for item, result in zip(items, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def _is_paused(self, phone_number: str) -> bool:
+        """Indica si el grafo del usuario está pausado esperando una nueva imagen."""
+        config = {"configurable": {"thread_id": phone_number}}
+        graph = get_workflow()
+        if graph.get_state(config).next:
+            return True
+        # La consulta deja una entrada vacía para el usuario en el checkpointer en memoria
+        graph.checkpointer.delete_thread(phone_number)
+        return False
+
+    async def _run_item(self, phone_number: str, item: _PendingRun) -> list:
+        if item.is_batch:
+            return [await self._run_batch_graph(phone_number, item.images)]
+        return [await self._run_single(phone_number, item.images[0])]
+
+    async def _run_combined(self, phone_number: str, batch: list[_PendingRun]) -> list:
+        """Ejecuta todas las imágenes en un solo lote y reparte los resultados por petición."""
+        images = [image for item in batch for image in item.images]
+        combined = await self._run_batch_graph(phone_number, images)
+
+        results = []
+        offset = 0
+        for item in batch:
+            own_items = combined.items[offset:offset + len(item.images)]
+            offset += len(item.images)
+            if item.is_batch:
+                results.append(BatchRunResult(items=own_items, message=combined.message))
+            else:
+                results.append(WorkflowRunResult(values={
+                    "phone_number": phone_number,
+                    "service_type": own_items[0]["service_type"],
+                    "is_valid": bool(own_items[0]["receipt_id"]),
+                    "extracted_data": own_items[0]["extracted_data"],
+                    "waiting_for_image": False,
+                    "intent_count": 0,
+                    "message_user": combined.message
+                }))
+        return results
+
+    async def _run_batch_graph(self, phone_number: str, images: list[ImageBuffer]) -> BatchRunResult:
+        """Ejecuta el grafo en modo lote para las imágenes dadas."""
+        result = await get_batch_workflow().ainvoke({
+            "phone_number": phone_number,
+            "images": images,
+            "items": [],
+            "message_user": ""
+        })
+        return BatchRunResult(items=result.get("items", []), message=result.get("message_user", ""))
+
+    async def _run_single(self, phone_number: str, image: ImageBuffer) -> WorkflowRunResult:
+        """
+        Ejecuta el grafo para la imagen recibida, sea una sesión nueva o un reintento.
+
+        Args:
+            phone_number: Número de teléfono del usuario (thread_id del grafo)
+            image: Imagen decodificada del recibo
+
+        Returns:
+            WorkflowRunResult: Estado final del grafo
+        """
+        graph = get_workflow()
+        config = {"configurable": {"thread_id": phone_number}}
+
+        # 🔍 Verificar si hay un grafo pausado para este usuario
+        current_state = graph.get_state(config)
+
+        if current_state.next:  # ⭐ Hay un grafo pausado esperando
+            self.log.info(f"🔄 REINTENTO - Usuario {phone_number} envió nueva imagen")
+            self.log.info(f"   Grafo pausado en: {current_state.next}")
+            self.log.info(f"   Intentos previos: {current_state.values.get('intent_count', 0)}")
+
+            # Actualizar estado con la NUEVA imagen
+            state = {
+                **current_state.values,  # ✅ Preserva intent_count, limit_intents, phone_number, etc.
+                "image_sha256": image.sha256,  # 🔄 Nueva imagen del usuario
+                "waiting_for_image": False  # ✅ Resetear flag de espera
+            }
+            self.log.info("▶️  Continuando grafo desde la interrupción...")
+
+        else:  # 🆕 Primera imagen del usuario (nueva sesión)
+            self.log.info(f"🆕 NUEVA SESIÓN - Usuario {phone_number} envió primera imagen")
+
+            state = {
+                "image_sha256": image.sha256,
+                "image_url": None,
+                "phone_number": phone_number,
+                "intent_count": 0,
+                "limit_intents": 3,
+                "waiting_for_image": False,
+                "is_valid": False,
+                "service_type": None,
+                "extracted_data": None,
+                "message_user": ""
+            }
+            self.log.info("▶️  Iniciando nuevo grafo...")
+
+        # Los nodos leen la imagen del registro: el estado (y sus checkpoints) solo lleva el hash
+        with get_inflight_images().hold(image):
+            result = await graph.ainvoke(state, config)
+
+        # Verificar si se pausó (clasificación falló)
+        final_state = graph.get_state(config)
+        self.log.info(f"   Resultado: service_type={result.get('service_type')}, "
+                      f"intent_count={result.get('intent_count')}")
+
+        if final_state.next:
+            self.log.info(f"⏸️  Grafo pausado en: {final_state.next} - Esperando reintento")
+        else:
+            # Sesión terminada: sus checkpoints ya no se van a leer, no se retienen
+            await graph.checkpointer.adelete_thread(phone_number)
+            self.log.info("🏁 Grafo completado para este usuario")
+
+        return WorkflowRunResult(values=result, next_nodes=final_state.next or None)
+
+
+# Instancia singleton
+_session_runner = None
+
+
+def get_session_runner() -> ReceiptSessionRunner:
+    """Obtiene la instancia del actor de sesiones por usuario."""
+    global _session_runner
+    if _session_runner is None:
+        _session_runner = ReceiptSessionRunner(
+            coalesce_window=settings.SESSION_COALESCE_WINDOW_MS / 1000,
+            max_batch_size=settings.SESSION_MAX_BATCH_SIZE
+        )
+    return _session_runner
@@ -1,7 +1,10 @@
-from datetime import datetime, timezone
+import base64
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Any, Optional, Union
+from pydantic import BaseModel, Field, field_validator, model_validator
+from maivi_agent.domain.receipts_exceptions import InvalidReceiptDataError
 
 class Service(Enum):
     AGUA = "AGUA"
@@ -29,14 +32,202 @@ class ExtractedData(BaseModel):
 
 class ReceiptDataSave(BaseModel):
     """Entidad para almacenar datos del recibo procesado."""
-    #id_receipt: Optional[str] = Field(description="ID único del recibo en la base de datos")
+    id_receipt: Optional[str] = Field(default=None, exclude=True, description="ID único del recibo en la base de datos")
     phone_number: str = Field(description="Número de teléfono del usuario (sin @s.whatsapp.net)")
     service_type: Service = Field(description="Tipo de servicio clasificado")
     is_valid: bool = Field(description="Indica si el recibo es válido")
     is_notified : bool = Field(description="Indica si el usuario fue notificado del resultado del procesamiento")
     created_at: datetime = Field(default_factory=lambda : datetime.now(timezone.utc))
     amount_total : Optional[float] = Field(description="Monto total a pagar del recibo")
-    date_expired: Optional[str] = Field(description="Fecha de vencimiento del recibo en el formato dd/MM/yyyy. Ejm: 10/05/2025")
+    date_expired: Optional[datetime] = Field(description="Fecha de vencimiento del recibo (medianoche UTC). Acepta dd/MM/yyyy")
+    date_expired_raw: Optional[str] = Field(default=None, description="Fecha de vencimiento tal como llegó, solo si no se pudo interpretar")
     consumption_period : Optional[str] =  Field(description="Período de consumo (ej: Octubre 2024)")
     company : Optional[str] = Field(description="Nombre de la compañia el cual factura el recibo")
-    link_receipt_image : Optional[str] = Field(description="Link a la imagen del recibo almacenada")
\ No newline at end of file
+    link_receipt_image : Optional[str] = Field(description="Link a la imagen del recibo almacenada")
+    link_receipt_preview : Optional[str] = Field(default=None, description="Link a la vista previa de la imagen del recibo")
+    link_receipt_thumbnail : Optional[str] = Field(default=None, description="Link a la miniatura de la imagen del recibo")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _parse_date_expired(cls, data: Any) -> Any:
+        """
+        Convierte la fecha extraída (dd/MM/yyyy) a datetime UTC.
+
+        Una fecha ilegible deja `date_expired` en None y conserva el texto original
+        en `date_expired_raw`, para poder revisarla o corregirla después.
+        """
+        if not isinstance(data, dict) or "date_expired" not in data:
+            return data
+        value = data["date_expired"]
+        parsed = parse_due_date(value)
+        data = {**data, "date_expired": parsed}
+        if parsed is None and value not in (None, ""):
+            data["date_expired_raw"] = str(value)
+        return data
+
+    @field_validator("created_at", mode="after")
+    @classmethod
+    def _as_utc(cls, value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+@dataclass(slots=True)
+class ReceiptRecord:
+    """
+    Vista ligera de un recibo para recorridos masivos.
+
+    Se construye directamente desde el documento proyectado, sin la validación de
+    `ReceiptDataSave`, así que los campos quedan tal como están almacenados.
+    """
+    id_receipt: str
+    phone_number: str
+    service_type: str
+    is_notified: bool
+    amount_total: Optional[float]
+    date_expired: Optional[datetime]
+    consumption_period: Optional[str]
+    company: Optional[str]
+    created_at: Optional[datetime]
+    link_receipt_thumbnail: Optional[str] = None
+
+    @classmethod
+    def from_document(cls, document: dict) -> "ReceiptRecord":
+        return cls(
+            id_receipt=str(document["_id"]),
+            phone_number=document.get("phone_number"),
+            service_type=document.get("service_type"),
+            is_notified=document.get("is_notified", False),
+            amount_total=document.get("amount_total"),
+            date_expired=document.get("date_expired"),
+            consumption_period=document.get("consumption_period"),
+            company=document.get("company"),
+            created_at=document.get("created_at"),
+            link_receipt_thumbnail=document.get("link_receipt_thumbnail"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StoredImage:
+    """Imagen almacenada: URL de cada variante y tamaños en bytes para medir el ahorro."""
+    url: str
+    preview_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    original_bytes: int = 0
+    stored_bytes: int = 0
+    preview_bytes: int = 0
+    thumbnail_bytes: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class ReceiptSaveResult:
+    """Resultado de guardar un recibo: su id y si se creó o ya existía."""
+    receipt_id: str
+    created: bool
+
+
+@dataclass(slots=True)
+class MonthlySpend:
+    """Gasto acumulado de un usuario en un servicio durante un mes (YYYY-MM)."""
+    service_type: str
+    month: str
+    total: float
+    count: int
+
+
+def rollup_month(receipt: Union[ReceiptDataSave, dict]) -> str:
+    """Mes (YYYY-MM) en el que se acumula un recibo: el de su vencimiento o, si no lo tiene, el de su registro."""
+    if isinstance(receipt, ReceiptDataSave):
+        moment = receipt.date_expired or receipt.created_at
+    else:
+        moment = receipt.get("date_expired") or receipt.get("created_at")
+    return moment.strftime("%Y-%m")
+
+
+@dataclass(slots=True)
+class ReceiptPage:
+    """Página del historial de recibos, ordenada por created_at y id descendentes."""
+    items: list[ReceiptRecord]
+    next_cursor: Optional[str] = None
+
+
+def encode_history_cursor(created_at: datetime, receipt_id: str) -> str:
+    """Cursor opaco que apunta justo después del recibo (created_at, id) dado."""
+    raw = f"{created_at.astimezone(timezone.utc).isoformat()}|{receipt_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Recupera (created_at, id) de un cursor de `encode_history_cursor`.
+
+    Raises:
+        InvalidReceiptDataError: Si el cursor no es válido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, receipt_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), receipt_id
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidReceiptDataError("Cursor de paginación inválido", field="cursor")
+
+
+# Campos que identifican un mismo recibo aunque se procese varias veces
+RECEIPT_NATURAL_KEY = ("phone_number", "company", "consumption_period", "amount_total")
+
+
+def receipt_natural_key(receipt: Union[ReceiptDataSave, dict]) -> Optional[dict]:
+    """
+    Clave natural del recibo (teléfono, compañía, período y monto).
+
+    Returns:
+        Optional[dict]: Los campos de la clave, o None si falta alguno
+            (sin clave completa no se puede deduplicar el recibo)
+    """
+    if isinstance(receipt, ReceiptDataSave):
+        key = {field: getattr(receipt, field) for field in RECEIPT_NATURAL_KEY}
+    else:
+        key = {field: receipt.get(field) for field in RECEIPT_NATURAL_KEY}
+    if any(value is None or value == "" for value in key.values()):
+        return None
+    return key
+
+
+def parse_due_date(value: Any) -> Optional[datetime]:
+    """
+    Normaliza una fecha de vencimiento a medianoche UTC.
+
+    Args:
+        value: datetime, date o texto en formato dd/MM/yyyy (también acepta yyyy-MM-dd)
+
+    Returns:
+        Optional[datetime]: Fecha en UTC, o None si no se puede interpretar
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    if isinstance(value, str):
+        for date_format in ("%d/%m/%Y", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(value.strip(), date_format).replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+    return None
+
+
+def due_date_range(value: Any) -> tuple[datetime, datetime]:
+    """
+    Rango [inicio, fin) en UTC del día de vencimiento indicado.
+
+    Args:
+        value: datetime, date o texto en formato dd/MM/yyyy (también acepta yyyy-MM-dd)
+
+    Raises:
+        ValueError: Si la fecha no se puede interpretar
+    """
+    start = parse_due_date(value)
+    if start is None:
+        raise ValueError(f"Fecha de vencimiento inválida: {value}. Use dd/MM/yyyy")
+    return start, start + timedelta(days=1)
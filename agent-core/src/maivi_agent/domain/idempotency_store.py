@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class IdempotencyStore(ABC):
+    """Almacén con expiración de los resultados ya entregados por clave de idempotencia."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Obtiene el resultado guardado para una clave.
+        Args:
+            key (str): Clave de idempotencia.
+        Returns:
+            Optional[Any]: Resultado guardado o None si no existe o ya expiró.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """
+        Guarda el resultado de una clave durante un tiempo limitado.
+        Args:
+            key (str): Clave de idempotencia.
+            value (Any): Resultado serializable a guardar.
+            ttl_seconds (float): Segundos que el resultado permanece disponible.
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Elimina el resultado guardado para una clave.
+        Args:
+            key (str): Clave de idempotencia.
+        """
+        pass
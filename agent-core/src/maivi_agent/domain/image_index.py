@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from maivi_agent.domain.entities import StoredImage
+
+
+class ImageIndex(ABC):
+    """Índice hash de contenido -> imagen ya almacenada (URL de cada variante)."""
+
+    @abstractmethod
+    async def get(self, content_hash: str) -> Optional[StoredImage]:
+        """
+        Obtiene una imagen ya almacenada.
+        Args:
+            content_hash (str): Hash SHA-256 (hex) del contenido de la imagen.
+        Returns:
+            Optional[StoredImage]: Imagen almacenada o None si no está indexada.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, content_hash: str, image: StoredImage) -> None:
+        """
+        Registra una imagen recién almacenada.
+        Args:
+            content_hash (str): Hash SHA-256 (hex) del contenido de la imagen.
+            image (StoredImage): URLs de la imagen y de sus variantes.
+        """
+        pass
@@ -1,19 +1,38 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Union
+from maivi_agent.domain.entities import StoredImage
+from shared.image_buffer import ImageBuffer
 
 
 class ImageStorage(ABC):
     
     @abstractmethod
-    async def upload_image(self, file_doc: str, file_name: str,folder: Optional[str] = None, tags:str = None) -> str:
+    async def upload_image(self, file_doc: Union[str, bytes, ImageBuffer], file_name: str,folder: Optional[str] = None, tags:str = None) -> str:
         """
         Carga las images a un proveedor de guardado de imagenes
         Args:
-            file_doc: Contenido del archivo a subir en base64
+            file_doc: Contenido del archivo a subir en base64, en bytes o ya decodificado en un ImageBuffer
             folder: folder donde se ubicará el archivo
             file_name: nombre del archivo
             tags: identificador para el archivo a subir
         Returns:
             str: Url de acceso para el archivo
         """
+        pass
+
+    async def upload_image_variants(self, file_doc: Union[str, bytes, ImageBuffer], file_name: str, folder: Optional[str] = None, tags: str = None) -> StoredImage:
+        """
+        Carga la imagen junto con sus variantes reducidas (vista previa y miniatura)
+        Args:
+            file_doc: Contenido del archivo a subir en base64, en bytes o ya decodificado en un ImageBuffer
+            folder: folder donde se ubicará el archivo
+            file_name: nombre del archivo
+            tags: identificador para el archivo a subir
+        Returns:
+            StoredImage: Urls de la imagen y de sus variantes; por defecto solo la original
+        """
+        return StoredImage(url=await self.upload_image(file_doc, file_name, folder, tags))
+
+    async def aclose(self) -> None:
+        """Libera las conexiones abiertas con el proveedor (no-op por defecto)."""
         pass
\ No newline at end of file
@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class ReceiptCache(ABC):
+    """Backend de la caché de lecturas de recibos (en memoria o compartido entre procesos)."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Obtiene el valor cacheado para una clave.
+        Args:
+            key (str): Clave de la consulta cacheada.
+        Returns:
+            Optional[Any]: Valor cacheado o None si no existe o ya expiró.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """
+        Guarda el resultado de una consulta durante un tiempo limitado.
+        Args:
+            key (str): Clave de la consulta cacheada.
+            value (Any): Resultado a guardar (un backend compartido debe serializarlo).
+            ttl_seconds (float): Segundos que el valor permanece disponible.
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Invalida el valor cacheado para una clave.
+        Args:
+            key (str): Clave de la consulta cacheada.
+        """
+        pass
@@ -1,21 +1,36 @@
 from abc import ABC, abstractmethod
-from maivi_agent.domain.entities import ReceiptDataSave
+from datetime import date, datetime
+from typing import AsyncIterator, Optional, Union
+from maivi_agent.domain.entities import MonthlySpend, ReceiptDataSave, ReceiptPage, ReceiptRecord, ReceiptSaveResult
 
 class ReceiptsRepository(ABC):
-    """Repositorio abstracto para la gestión de recibos procesados."""
+    """Repositorio abstracto (asíncrono) para la gestión de recibos procesados."""
     @abstractmethod
-    def save_receipt(self, receipt_data: ReceiptDataSave) -> str:
+    async def save_receipt(self, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
         """
         Guarda los datos del recibo procesado en el repositorio.
+        Si ya existe un recibo con la misma clave natural (teléfono, compañía,
+        período y monto) no se duplica: se devuelve el existente.
         Args:
             receipt_data (ReceiptDataSave): Datos del recibo a guardar.
         Returns:
-            str: ID único del recibo guardado.
+            ReceiptSaveResult: ID del recibo y si se creó en esta llamada.
         """
         pass
     
     @abstractmethod
-    def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+    async def save_receipts(self, receipts_data: list[ReceiptDataSave]) -> list[ReceiptSaveResult]:
+        """
+        Guarda varios recibos en una sola operación masiva, sin duplicar los ya existentes.
+        Args:
+            receipts_data (list[ReceiptDataSave]): Recibos a guardar.
+        Returns:
+            list[ReceiptSaveResult]: Resultado de cada recibo, en el mismo orden recibido.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
         """
         Obtiene los recibos procesados por tipo de servicio para un usuario específico.
         Args:
@@ -26,7 +41,60 @@ class ReceiptsRepository(ABC):
         pass
     
     @abstractmethod
-    def mark_as_notified(self, receipt_id: str) -> None:
+    async def get_receipt_history(
+        self,
+        phone_number: str,
+        service_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> ReceiptPage:
+        """
+        Obtiene una página del historial de recibos de un usuario, más recientes primero.
+        La paginación es por clave (created_at, id): cada página cuesta lo mismo
+        sin importar cuántos recibos tenga el usuario.
+        Args:
+            phone_number (str): Número de teléfono del usuario.
+            service_type (str, optional): Tipo de servicio (AGUA, LUZ, GAS).
+            created_from (datetime, optional): Solo recibos creados desde este instante (incluido).
+            created_to (datetime, optional): Solo recibos creados antes de este instante (excluido).
+            limit (int): Máximo de recibos en la página.
+            cursor (str, optional): `next_cursor` de la página anterior.
+        Returns:
+            ReceiptPage: Recibos de la página y cursor de la siguiente (None si no hay más).
+        Raises:
+            InvalidReceiptDataError: Si el cursor no es válido.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_monthly_summary(
+        self, phone_number: str, year: Optional[int] = None, service_type: Optional[str] = None
+    ) -> list[MonthlySpend]:
+        """
+        Obtiene el gasto mensual de un usuario desde los acumulados (sin recorrer los recibos).
+        Los acumulados se actualizan al guardar cada recibo nuevo.
+        Args:
+            phone_number (str): Número de teléfono del usuario.
+            year (int, optional): Solo los meses de este año.
+            service_type (str, optional): Tipo de servicio (AGUA, LUZ, GAS).
+        Returns:
+            list[MonthlySpend]: Acumulados por servicio y mes, ordenados por mes.
+        """
+        pass
+    
+    @abstractmethod
+    async def rebuild_monthly_rollups(self) -> int:
+        """
+        Recalcula todos los acumulados mensuales desde los recibos guardados.
+        Returns:
+            int: Número de acumulados (usuario, servicio, mes) resultantes.
+        """
+        pass
+    
+    @abstractmethod
+    async def mark_as_notified(self, receipt_id: str) -> None:
         """Marca un recibo como notificado al usuario.
         Args:
             receipt_id (str): ID del recibo a marcar.
@@ -34,11 +102,49 @@ class ReceiptsRepository(ABC):
         pass
     
     @abstractmethod
-    def obtain_receipt_expire_by_date(self, date_expired: str) -> list[ReceiptDataSave]:
-        """Obtiene los recibos que vencen en una fecha específica.
+    async def obtain_receipt_expire_by_date(self, date_expired: Union[str, date]) -> list[ReceiptDataSave]:
+        """Obtiene los recibos no notificados que vencen en una fecha específica.
         Args:
-            date_expired (str): Fecha de vencimiento en formato dd/MM/yyyy.
+            date_expired (str | date): Fecha de vencimiento (date o texto dd/MM/yyyy).
         Returns:
             list[ReceiptDataSave]: Lista de recibos que vencen en la fecha dada.
         """
-        pass
\ No newline at end of file
+        pass
+    
+    @abstractmethod
+    def iter_receipts_by_service(
+        self, phone_number: str, service_type: str, batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        """
+        Recorre los recibos de un usuario por tipo de servicio, más recientes primero,
+        sin cargarlos todos en memoria.
+        Args:
+            phone_number (str): Número de teléfono del usuario.
+            service_type (str): Tipo de servicio (AGUA, LUZ, GAS).
+            batch_size (int): Documentos que se piden al servidor por lote.
+        Returns:
+            AsyncIterator[ReceiptRecord]: Recibos en su vista ligera.
+        """
+        pass
+    
+    @abstractmethod
+    def iter_receipts_expire_by_date(
+        self, date_expired: Union[str, date], batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        """
+        Recorre los recibos no notificados que vencen en una fecha, sin cargarlos todos en memoria.
+        Args:
+            date_expired (str | date): Fecha de vencimiento (date o texto dd/MM/yyyy).
+            batch_size (int): Documentos que se piden al servidor por lote.
+        Returns:
+            AsyncIterator[ReceiptRecord]: Recibos en su vista ligera.
+        """
+        pass
+    
+    async def ensure_indexes(self) -> None:
+        """Crea los índices que necesitan las consultas del repositorio (no-op por defecto)."""
+        pass
+    
+    async def close(self) -> None:
+        """Libera las conexiones abiertas por el repositorio (no-op por defecto)."""
+        pass
@@ -1,10 +1,11 @@
 from typing import Optional, TypedDict, Literal
+from shared.image_buffer import ImageBuffer
 
 
 class ReceiptState(TypedDict):
     """Estado del grafo para procesamiento de recibos"""
     #input usuer
-    image_base64 : str
+    image_sha256 : Optional[str]  # Referencia a la imagen en InFlightImages: los bytes no entran en los checkpoints
     phone_number : str
     
     #Validation
@@ -20,4 +21,27 @@ class ReceiptState(TypedDict):
     service_type : Optional[Literal["AGUA","LUZ","GAS", "NO_VALIDO"]]
     
     #Extracttion data
-    extracted_data :  Optional[dict]
\ No newline at end of file
+    extracted_data :  Optional[dict]
+    
+    #Upload: URLs de la imagen almacenada
+    image_url : Optional[str]
+    image_preview_url : Optional[str]
+    image_thumbnail_url : Optional[str]
+    
+    #Persistence
+    receipt_id : Optional[str]
+    is_new_receipt : Optional[bool]  # False si el recibo ya estaba registrado (no se reprograman recordatorios)
+
+
+class BatchReceiptState(TypedDict):
+    """Estado del grafo para procesar varias imágenes de un mismo usuario en un solo paso"""
+    phone_number : str
+    
+    #input usuer: imágenes decodificadas al recibirlas
+    images : list[ImageBuffer]
+    
+    #Resultado por imagen: index, service_type, is_valid, extracted_data, link_receipt_image,
+    #link_receipt_preview, link_receipt_thumbnail, receipt_id, is_new, error
+    items : list[dict]
+    
+    message_user : str
\ No newline at end of file
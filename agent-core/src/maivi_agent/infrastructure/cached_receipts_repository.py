@@ -0,0 +1,216 @@
+"""
+Caché de lectura (read-through) sobre el repositorio de recibos.
+
+`CachedReceiptsRepository` envuelve cualquier `ReceiptsRepository` y sirve
+`get_receipts_by_service` desde un `ReceiptCache` por teléfono y servicio:
+- en un fallo consulta el repositorio y guarda el resultado con TTL; las
+  consultas concurrentes de la misma clave esperan a una sola lectura
+- `save_receipt`, `save_receipts` y `mark_as_notified` invalidan las claves
+  afectadas después de escribir (write-through). Si `mark_as_notified` recibe
+  un recibo que este proceso no ha leído no puede saber su clave, y cambia la
+  generación de la caché (una clave más en el backend) que forma parte de
+  todas las claves: así se invalidan también en los demás procesos
+- cada llamada recibe sus propias copias de los recibos, nunca los objetos
+  guardados en la caché
+- los aciertos y fallos se exponen en /metrics
+
+El resto de operaciones pasan directamente al repositorio envuelto.
+"""
+import uuid
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, Optional, Union
+from maivi_agent.domain.entities import MonthlySpend, ReceiptDataSave, ReceiptPage, ReceiptRecord, ReceiptSaveResult
+from maivi_agent.domain.receipt_cache import ReceiptCache
+from maivi_agent.domain.receipts_repository import ReceiptsRepository
+from shared.init_logger import init_logger
+from shared.metrics import get_metrics
+from shared.single_flight import SingleFlight
+from shared.ttl_lru_cache import TtlLruCache
+
+CACHE_REQUESTS = get_metrics().counter(
+    "maivi_receipt_cache_requests_total",
+    "Lecturas del historial de recibos por resultado de la caché (hit/miss)"
+)
+CACHE_INVALIDATIONS = get_metrics().counter(
+    "maivi_receipt_cache_invalidations_total",
+    "Claves del historial de recibos invalidadas por escrituras"
+)
+
+
+# Generación vigente de las claves; cambiarla invalida todos los historiales cacheados
+GENERATION_KEY = "receipts:generation"
+GENERATION_TTL_SECONDS = 24 * 3600
+
+
+def _copies(receipts: Iterable[ReceiptDataSave]) -> list[ReceiptDataSave]:
+    return [receipt.model_copy() for receipt in receipts]
+
+
+class CachedReceiptsRepository(ReceiptsRepository):
+    """Repositorio de recibos con caché de lectura del historial por usuario."""
+
+    def __init__(
+        self,
+        repository: ReceiptsRepository,
+        cache: ReceiptCache,
+        ttl_seconds: float = 60,
+        max_tracked_ids: int = 100_000
+    ):
+        """
+        Args:
+            repository: Repositorio que se consulta en los fallos de caché
+            cache: Backend donde se guardan los historiales
+            ttl_seconds: Segundos que un historial cacheado se considera válido
+            max_tracked_ids: Recibos recientes cuyo teléfono y servicio se recuerdan para invalidar
+                solo su clave en mark_as_notified (los demás invalidan toda la caché)
+        """
+        self.repository = repository
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # Lecturas en curso por clave, para no consultar dos veces la misma
+        self._loading: SingleFlight[list[ReceiptDataSave]] = SingleFlight()
+        # Claves invalidadas mientras se leían: ese resultado ya no se guarda
+        self._stale: set[str] = set()
+        # id del recibo -> (teléfono, servicio), para invalidar solo su clave desde mark_as_notified
+        self._keys_by_id: TtlLruCache[tuple[str, str]] = TtlLruCache(max_tracked_ids)
+        self.log = init_logger(self.__class__.__name__)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """Aciertos, fallos y tasa de aciertos de la caché en este proceso."""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4)}
+
+    async def _generation(self) -> str:
+        generation = await self.cache.get(GENERATION_KEY)
+        if generation is None:
+            # Sin generación guardada (primera lectura o expirada) se empieza una nueva:
+            # las claves anteriores quedan huérfanas, nunca se sirven
+            generation = uuid.uuid4().hex[:12]
+            await self.cache.set(GENERATION_KEY, generation, GENERATION_TTL_SECONDS)
+        return generation
+
+    async def _cache_key(self, phone_number: str, service_type: str) -> str:
+        return f"receipts:{await self._generation()}:{phone_number}:{service_type}"
+
+    async def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+        key = await self._cache_key(phone_number, service_type)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(result="hit")
+            return _copies(cached)
+
+        self.misses += 1
+        CACHE_REQUESTS.inc(result="miss")
+        stale = False
+
+        async def load() -> list[ReceiptDataSave]:
+            nonlocal stale
+            try:
+                return await self.repository.get_receipts_by_service(phone_number, service_type)
+            finally:
+                stale = key in self._stale
+                self._stale.discard(key)
+
+        receipts, shared = await self._loading.run(key, load)
+        if shared:
+            # La lectura la hizo otra petición, que también la guarda en la caché
+            return _copies(receipts)
+
+        if not stale:
+            await self.cache.set(key, tuple(_copies(receipts)), self.ttl_seconds)
+            for receipt in receipts:
+                if receipt.id_receipt:
+                    self._track(receipt.id_receipt, phone_number, service_type)
+        return receipts
+
+    def _track(self, receipt_id: str, phone_number: str, service_type: str) -> None:
+        self._keys_by_id.set(receipt_id, (phone_number, service_type))
+
+    async def _invalidate(self, phone_number: str, service_type: str) -> None:
+        key = await self._cache_key(phone_number, service_type)
+        if key in self._loading:
+            self._stale.add(key)
+        await self.cache.delete(key)
+        CACHE_INVALIDATIONS.inc()
+
+    async def _invalidate_all(self) -> None:
+        """Cambia la generación: ninguna clave cacheada hasta ahora vuelve a servirse."""
+        self._stale.update(self._loading.keys())
+        await self.cache.set(GENERATION_KEY, uuid.uuid4().hex[:12], GENERATION_TTL_SECONDS)
+        CACHE_INVALIDATIONS.inc()
+
+    async def save_receipt(self, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
+        result = await self.repository.save_receipt(receipt_data)
+        if result.created:
+            self._track(result.receipt_id, receipt_data.phone_number, receipt_data.service_type.value)
+            await self._invalidate(receipt_data.phone_number, receipt_data.service_type.value)
+        return result
+
+    async def save_receipts(self, receipts_data: list[ReceiptDataSave]) -> list[ReceiptSaveResult]:
+        results = await self.repository.save_receipts(receipts_data)
+        affected = set()
+        for receipt, result in zip(receipts_data, results):
+            if result.created:
+                self._track(result.receipt_id, receipt.phone_number, receipt.service_type.value)
+                affected.add((receipt.phone_number, receipt.service_type.value))
+        for phone_number, service_type in affected:
+            await self._invalidate(phone_number, service_type)
+        return results
+
+    async def mark_as_notified(self, receipt_id: str) -> None:
+        await self.repository.mark_as_notified(receipt_id)
+        tracked = self._keys_by_id.get(receipt_id)
+        if tracked is not None:
+            await self._invalidate(*tracked)
+        else:
+            # Recibo no visto por este proceso: no se conoce su clave
+            await self._invalidate_all()
+
+    async def get_receipt_history(
+        self,
+        phone_number: str,
+        service_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> ReceiptPage:
+        # Cada página ya es acotada e indexada; cachear todas las combinaciones de filtros no compensa
+        return await self.repository.get_receipt_history(
+            phone_number, service_type, created_from, created_to, limit, cursor
+        )
+
+    async def get_monthly_summary(
+        self, phone_number: str, year: Optional[int] = None, service_type: Optional[str] = None
+    ) -> list[MonthlySpend]:
+        return await self.repository.get_monthly_summary(phone_number, year, service_type)
+
+    async def rebuild_monthly_rollups(self) -> int:
+        return await self.repository.rebuild_monthly_rollups()
+
+    async def obtain_receipt_expire_by_date(self, date_expired: Union[str, date]) -> list[ReceiptDataSave]:
+        return await self.repository.obtain_receipt_expire_by_date(date_expired)
+
+    def iter_receipts_by_service(
+        self, phone_number: str, service_type: str, batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        return self.repository.iter_receipts_by_service(phone_number, service_type, batch_size)
+
+    def iter_receipts_expire_by_date(
+        self, date_expired: Union[str, date], batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        return self.repository.iter_receipts_expire_by_date(date_expired, batch_size)
+
+    async def ensure_indexes(self) -> None:
+        await self.repository.ensure_indexes()
+
+    async def close(self) -> None:
+        self.log.info(f"[CACHE] Historial de recibos: {self.stats()}")
+        await self.repository.close()
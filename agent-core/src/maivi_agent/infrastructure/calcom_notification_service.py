@@ -1,21 +1,70 @@
 """
 Servicio simple de notificaciones con CAL.COM.
 Permite agendar recordatorios de pago un día antes y el día del vencimiento.
+
+Todas las reservas salen por un único `httpx.AsyncClient` del proceso (HTTP/2
+si `h2` está instalado), creado al primer uso y cerrado en el apagado: las
+reservas reutilizan conexiones abiertas en lugar de pagar DNS, TCP y TLS cada
+vez. Los dos recordatorios de un recibo se crean en paralelo.
 """
 from shared.init_logger import init_logger
+from shared.metrics import get_metrics
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
+import asyncio
 import random
+import time
 import httpx
 from shared.config import settings
 
+BOOKING_DURATION = get_metrics().histogram(
+    "maivi_calcom_booking_duration_seconds",
+    "Duración de cada reserva en CAL.COM por resultado (ok/rejected/error)"
+)
+CONNECTIONS_OPENED = get_metrics().counter(
+    "maivi_calcom_connections_opened_total",
+    "Conexiones TCP abiertas hacia CAL.COM; frente al número de reservas mide la reutilización"
+)
+
+
+async def _trace_connections(event_name: str, info: dict) -> None:
+    """Hook de httpcore: cuenta las conexiones nuevas (las reutilizadas no pasan por connect_tcp)."""
+    if event_name == "connection.connect_tcp.complete":
+        CONNECTIONS_OPENED.inc()
+
+
 class CalComNotificationService:
     """Servicio para programar notificaciones de pago usando CAL.COM."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: str = "https://api.cal.com/v2",
+        http2: bool = True,
+        max_connections: int = 10,
+        keepalive_expiry_seconds: float = 30,
+        timeout_seconds: float = 15,
+        connect_timeout_seconds: float = 5
+    ):
+        """
+        Args:
+            base_url: URL base de la API v2 de CAL.COM
+            http2: Negociar HTTP/2 (todas las reservas multiplexadas en una conexión)
+            max_connections: Conexiones simultáneas (y en keep-alive) como máximo
+            keepalive_expiry_seconds: Tiempo que una conexión ociosa sigue abierta
+            timeout_seconds: Tiempo máximo de lectura/escritura de cada reserva
+            connect_timeout_seconds: Tiempo máximo para abrir la conexión
+        """
         self.api_key = settings.CALCOM_API_KEY
         self.event_type_id = settings.CALCOM_EVENT_TYPE_ID
-        self.base_url = "https://api.cal.com/v2"
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry_seconds
+        )
+        self.timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self._client: Optional[httpx.AsyncClient] = None
         self.logger = init_logger(self.__class__.__name__)
         
         if not self.api_key or self.api_key == "":
@@ -24,6 +73,31 @@ class CalComNotificationService:
         if self.event_type_id == 0:
             self.logger.warning("CALCOM_EVENT_TYPE_ID no configurado - notificaciones deshabilitadas")
     
+    def _build_client(self) -> httpx.AsyncClient:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "cal-api-version": "2024-08-13"
+        }
+        try:
+            return httpx.AsyncClient(http2=self.http2, limits=self.limits, timeout=self.timeout, headers=headers)
+        except ImportError:
+            self.logger.warning("Paquete h2 no instalado (httpx[http2]): CAL.COM usará HTTP/1.1 con keep-alive")
+            return httpx.AsyncClient(limits=self.limits, timeout=self.timeout, headers=headers)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido por todas las reservas (se crea al primer uso)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def aclose(self) -> None:
+        """Cierra las conexiones abiertas con CAL.COM."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     def _parse_date(self, date_str: str) -> datetime:
         """Convierte fecha dd/MM/yyyy a datetime."""
         try:
@@ -135,51 +209,56 @@ class CalComNotificationService:
         if phone_number:
             description += f"\nTeléfono: {phone_number}"
         
-        results = []
+        # Minutos aleatorios para no chocar con otras reservas (entre 0 y 90 minutos)
+        random_offset = random.randint(0, 90)
+        random_offset_2 = random.randint(0, 90)
         
-        # Notificación 1: Un día antes - Horario aleatorio entre 8:00-9:30 AM
-        try:
-            day_before = due_date - timedelta(days=1)
-            title_before = f"⏰ Mañana vence: {service_type} - S/ {amount_total}"
-            
-            # Usar minutos aleatorios para evitar conflictos (entre 0 y 90 minutos = 8:00-9:30 AM)
-            random_offset = random.randint(0, 90)
-            
-            booking_before = await self._create_booking(
-                day_before, title_before, description, attendee_email, attendee_name, 
-                additional_emails, offset_minutes=-60 + random_offset  # Entre 8:00-9:30 AM
+        # Las dos reservas son independientes: se envían a la vez por el cliente compartido
+        reminders = await asyncio.gather(
+            # Notificación 1: Un día antes - Horario aleatorio entre 8:00-9:30 AM
+            self._schedule_reminder(
+                "day_before", due_date - timedelta(days=1), f"⏰ Mañana vence: {service_type} - S/ {amount_total}",
+                description, attendee_email, attendee_name, additional_emails,
+                offset_minutes=-60 + random_offset, first_hour=8
+            ),
+            # Notificación 2: El mismo día - Horario aleatorio entre 7:00-8:30 AM
+            self._schedule_reminder(
+                "due_date", due_date, f"🚨 HOY VENCE: {service_type} - S/ {amount_total}",
+                description, attendee_email, attendee_name, additional_emails,
+                offset_minutes=-120 + random_offset_2, first_hour=7
             )
-            
-            if booking_before:
-                results.append({"type": "day_before", "booking": booking_before})
-                hour = 8 + (random_offset // 60)
-                minute = random_offset % 60
-                self.logger.info(f"✅ Notificación programada para {day_before.date()} {hour:02d}:{minute:02d} AM")
-        except Exception as e:
-            self.logger.error(f"❌ Error al programar notificación día anterior: {e}")
-
-
-        # Notificación 2: El mismo día - Horario aleatorio entre 7:00-8:30 AM
+        )
+        
+        return [reminder for reminder in reminders if reminder]
+    
+    async def _schedule_reminder(
+        self,
+        reminder_type: str,
+        date_time: datetime,
+        title: str,
+        description: str,
+        attendee_email: str,
+        attendee_name: str,
+        additional_emails: Optional[List[str]],
+        offset_minutes: int,
+        first_hour: int
+    ) -> Optional[Dict]:
+        """Crea uno de los recordatorios; un error no impide crear el otro."""
         try:
-            title_same_day = f"🚨 HOY VENCE: {service_type} - S/ {amount_total}"
-            
-            # Usar minutos aleatorios diferentes (entre 0 y 90 minutos = 7:00-8:30 AM)
-            random_offset_2 = random.randint(0, 90)
-            
-            booking_same_day = await self._create_booking(
-                due_date, title_same_day, description, attendee_email, attendee_name, 
-                additional_emails, offset_minutes=-120 + random_offset_2  # Entre 7:00-8:30 AM
+            booking = await self._create_booking(
+                date_time, title, description, attendee_email, attendee_name,
+                additional_emails, offset_minutes=offset_minutes
             )
-            
-            if booking_same_day:
-                results.append({"type": "due_date", "booking": booking_same_day})
-                hour = 7 + (random_offset_2 // 60)
-                minute = random_offset_2 % 60
-                self.logger.info(f"✅ Notificación programada para {due_date.date()} {hour:02d}:{minute:02d} AM")
         except Exception as e:
-            self.logger.error(f"❌ Error al programar notificación mismo día: {e}")
+            self.logger.error(f"❌ Error al programar notificación {reminder_type}: {e}")
+            return None
         
-        return results
+        if not booking:
+            return None
+        minutes_after = offset_minutes + (9 - first_hour) * 60
+        self.logger.info(f"✅ Notificación programada para {date_time.date()} "
+                         f"{first_hour + minutes_after // 60:02d}:{minutes_after % 60:02d} AM")
+        return {"type": reminder_type, "booking": booking}
     
     async def _create_booking(
         self,
@@ -200,36 +279,36 @@ class CalComNotificationService:
         # Log para debug
         self.logger.info(f"Creando booking: {payload.get('start')} - {title}")
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "cal-api-version": "2024-08-13"
-        }
-        
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/bookings",
-                    headers=headers,
-                    json=payload
-                )
-                
-                if response.status_code in [200, 201]:
-                    result = response.json()
-                    if result.get("status") == "success":
-                        booking_data = result.get('data', {})
-                        self.logger.info(f"✅ Booking creado: {booking_data.get('uid')}")
-                        return booking_data
-                    else:
-                        self.logger.error(f"❌ CAL.COM error: {result}")
-                        return None
+            response = await self.client.post(
+                f"{self.base_url}/bookings",
+                json=payload,
+                extensions={"trace": _trace_connections}
+            )
+            
+            if response.status_code in [200, 201]:
+                result = response.json()
+                if result.get("status") == "success":
+                    booking_data = result.get('data', {})
+                    outcome = "ok"
+                    self.logger.info(f"✅ Booking creado: {booking_data.get('uid')} ({response.http_version})")
+                    return booking_data
                 else:
-                    self.logger.error(f"❌ Error HTTP {response.status_code}: {response.text}")
+                    outcome = "rejected"
+                    self.logger.error(f"❌ CAL.COM error: {result}")
                     return None
-                    
+            else:
+                outcome = "rejected"
+                self.logger.error(f"❌ Error HTTP {response.status_code}: {response.text}")
+                return None
+                
         except Exception as e:
             self.logger.error(f"Excepción al crear booking: {e}")
             return None
+        finally:
+            BOOKING_DURATION.observe(time.perf_counter() - started, outcome=outcome)
 
 
 # Instancia singleton
@@ -240,5 +319,12 @@ def get_calcom_service() -> CalComNotificationService:
     """Obtiene la instancia del servicio de CAL.COM."""
     global _calcom_service
     if _calcom_service is None:
-        _calcom_service = CalComNotificationService()
+        _calcom_service = CalComNotificationService(
+            base_url=settings.CALCOM_BASE_URL,
+            http2=settings.CALCOM_HTTP2,
+            max_connections=settings.CALCOM_MAX_CONNECTIONS,
+            keepalive_expiry_seconds=settings.CALCOM_KEEPALIVE_EXPIRY_SECONDS,
+            timeout_seconds=settings.CALCOM_TIMEOUT_SECONDS,
+            connect_timeout_seconds=settings.CALCOM_CONNECT_TIMEOUT_SECONDS
+        )
     return _calcom_service
@@ -1,17 +1,28 @@
-from typing import Optional
-from llm.application.llm_orchestrator import LlmOrchestrator
-from llm.domain.llm_client import LlmClient
-from llm.domain.llm_service import LlmService
-from llm.infrastructure.openai_client import OpenAIClient
-from llm.infrastructure.openai_service import OpenAiService
+"""
+Contenedor de dependencias.
+
+Las integraciones pesadas (LangChain/OpenAI, ImageKit, MongoDB, WhatsApp, CAL.COM,
+Google Calendar)
+se importan dentro de cada propiedad, de modo que importar el contenedor (y con él
+la API) no las carga: se cargan al construir la dependencia, en el lifespan.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+from maivi_agent.domain.idempotency_store import IdempotencyStore
 from maivi_agent.domain.image_storage import ImageStorage
 from maivi_agent.domain.receipts_repository import ReceiptsRepository
-from maivi_agent.infrastructure.image_storage_service import ImageStorageService
-from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
-from maivi_agent.infrastructure.whatsapp_service import WhatsAppService
 from shared.init_logger import init_logger
 from shared.config import settings
 
+if TYPE_CHECKING:
+    from llm.application.llm_orchestrator import LlmOrchestrator
+    from llm.domain.llm_client import LlmClient
+    from llm.domain.llm_service import LlmService
+    from maivi_agent.infrastructure.calcom_notification_service import CalComNotificationService
+    from maivi_agent.infrastructure.google_calendar_service import GoogleCalendarNotificationService
+    from maivi_agent.infrastructure.whatsapp_service import WhatsAppService
+
 class Container:
 
     def __init__(self):
@@ -23,6 +34,8 @@ class Container:
         self._wsp_service: Optional[WhatsAppService] = None
         self._image_storage_service: Optional[ImageStorage]= None
         self._receipt_repository: Optional[ReceiptsRepository]= None
+        self._idempotency_store: Optional[IdempotencyStore]= None
+        self._google_calendar_service: Optional[GoogleCalendarNotificationService]= None
         self.log.info("[CONTAINER] Dependency container initialized successfully")
 
     @property
@@ -35,6 +48,7 @@ class Container:
         """
         if self._openai_client is None:
             self.log.info("[CONTAINER] Creating OpenAI client instance")
+            from llm.infrastructure.openai_client import OpenAIClient
             self._openai_client = OpenAIClient()
         return self._openai_client
 
@@ -48,6 +62,7 @@ class Container:
         """
         if self._openai_service is None:
             self.log.info("[CONTAINER] Creating OpenAI service instance")
+            from llm.infrastructure.openai_service import OpenAiService
             self._openai_service = OpenAiService()
             
         return self._openai_service
@@ -62,6 +77,7 @@ class Container:
         """
         if self._llm_orchestrator is None:
             self.log.info("[CONTAINER] Creating LLM orchestrator instance")
+            from llm.application.llm_orchestrator import LlmOrchestrator
             self._llm_orchestrator = LlmOrchestrator(llm_service=self.instance_openai_service)
             
         return self._llm_orchestrator
@@ -76,6 +92,7 @@ class Container:
         """
         if self._wsp_service is None:
             self.log.info("[CONTAINER] Creating WhatsApp service instance")
+            from maivi_agent.infrastructure.whatsapp_service import WhatsAppService
             self._wsp_service = WhatsAppService(settings.URL_WSP, settings.PHONE_NUMBER)
             
         return self._wsp_service
@@ -90,24 +107,173 @@ class Container:
         """
         if self._image_storage_service is None:
             self.log.info("[CONTAINER] Creating Image Storage service instance")
-            self._image_storage_service = ImageStorageService()
+            self._image_storage_service = self._build_image_storage()
             
         return self._image_storage_service
 
+    def _build_image_storage(self) -> ImageStorage:
+        """Build the image backend selected by IMAGE_STORAGE_BACKEND (imagekit by default)."""
+        from maivi_agent.infrastructure.memory_image_index import InMemoryImageIndex
+        index = InMemoryImageIndex(max_entries=settings.IMAGE_INDEX_MAX_ENTRIES)
+        transcoder = None
+        if settings.IMAGE_TRANSCODE_ENABLED:
+            from maivi_agent.infrastructure.image_transcoder import ImageTranscoder
+            transcoder = ImageTranscoder(
+                output_format=settings.IMAGE_FORMAT,
+                quality=settings.IMAGE_QUALITY,
+                max_dimension=settings.IMAGE_MAX_DIMENSION,
+                preview_dimension=settings.IMAGE_PREVIEW_DIMENSION,
+                thumbnail_dimension=settings.IMAGE_THUMBNAIL_DIMENSION
+            )
+        backend = settings.IMAGE_STORAGE_BACKEND
+        self.log.info(f"[CONTAINER] Image storage backend: {backend}")
+        if backend == "local":
+            from maivi_agent.infrastructure.local_image_storage import LocalImageStorage
+            return LocalImageStorage(
+                root_dir=settings.IMAGE_STORAGE_LOCAL_DIR,
+                base_url=settings.IMAGE_STORAGE_LOCAL_BASE_URL,
+                index=index,
+                transcoder=transcoder
+            )
+        from maivi_agent.infrastructure.image_storage_service import ImageStorageService
+        return ImageStorageService(
+            max_concurrent_uploads=settings.IMAGEKIT_MAX_CONCURRENT_UPLOADS,
+            timeout_seconds=settings.IMAGEKIT_TIMEOUT_SECONDS,
+            connect_timeout_seconds=settings.IMAGEKIT_CONNECT_TIMEOUT_SECONDS,
+            max_retries=settings.IMAGEKIT_MAX_RETRIES,
+            index=index,
+            transcoder=transcoder
+        )
+
     @property
     def receipt_repository(self) -> ReceiptsRepository:
         """
-        Get or create Image Storage instance (Singleton).
+        Get or create Receipts Repository instance (Singleton).
         
         Returns:
-            ImageStorage: Singleton instance of Image Storage service
+            ReceiptsRepository: Singleton instance of the receipts repository
         """
         if self._receipt_repository is None:
-            self.log.info("[CONTAINER] Creating Image Storage service instance")
-            self._receipt_repository = ReceiptsRepositoryImpl()
+            self.log.info("[CONTAINER] Creating Receipts Repository instance")
+            repository = self._build_receipt_repository()
+            if settings.RECEIPTS_CACHE_ENABLED:
+                from maivi_agent.infrastructure.cached_receipts_repository import CachedReceiptsRepository
+                from maivi_agent.infrastructure.memory_receipt_cache import InMemoryReceiptCache
+                repository = CachedReceiptsRepository(
+                    repository,
+                    InMemoryReceiptCache(max_entries=settings.RECEIPTS_CACHE_MAX_ENTRIES),
+                    ttl_seconds=settings.RECEIPTS_CACHE_TTL_SECONDS
+                )
+            self._receipt_repository = repository
             
         return self._receipt_repository
 
+    def _build_receipt_repository(self) -> ReceiptsRepository:
+        """Build the receipts backend selected by RECEIPTS_BACKEND (mongo by default)."""
+        backend = settings.RECEIPTS_BACKEND
+        self.log.info(f"[CONTAINER] Receipts backend: {backend}")
+        if backend == "memory":
+            from maivi_agent.infrastructure.memory_receipts_repository import InMemoryReceiptsRepository
+            return InMemoryReceiptsRepository()
+        if backend == "sqlite":
+            from maivi_agent.infrastructure.sqlite_receipts_repository import SqliteReceiptsRepository
+            return SqliteReceiptsRepository(settings.RECEIPTS_SQLITE_PATH)
+        from maivi_agent.infrastructure.receipts_repository_impl import ReceiptsRepositoryImpl
+        return ReceiptsRepositoryImpl(
+            write_buffer=settings.RECEIPTS_WRITE_BUFFER_ENABLED,
+            buffer_max_batch_size=settings.RECEIPTS_WRITE_BUFFER_MAX_BATCH,
+            buffer_flush_interval=settings.RECEIPTS_WRITE_BUFFER_FLUSH_MS / 1000
+        )
+
+    @property
+    def idempotency_store(self) -> IdempotencyStore:
+        """
+        Get or create Idempotency Store instance (Singleton).
+        
+        Returns:
+            IdempotencyStore: Singleton instance of the idempotency store
+        """
+        if self._idempotency_store is None:
+            self.log.info("[CONTAINER] Creating Idempotency Store instance")
+            from maivi_agent.infrastructure.memory_idempotency_store import InMemoryIdempotencyStore
+            self._idempotency_store = InMemoryIdempotencyStore(max_entries=settings.IDEMPOTENCY_MAX_ENTRIES)
+            
+        return self._idempotency_store
+
+    @property
+    def calcom_service(self) -> CalComNotificationService:
+        """
+        Get the CAL.COM notification service (Singleton).
+        
+        Returns:
+            CalComNotificationService: Singleton instance of the CAL.COM service
+        """
+        from maivi_agent.infrastructure.calcom_notification_service import get_calcom_service
+        return get_calcom_service()
+
+    @property
+    def google_calendar_service(self) -> GoogleCalendarNotificationService:
+        """
+        Get or create the Google Calendar notification service (Singleton).
+        
+        Not built at startup: the receipt flow schedules reminders with CAL.COM,
+        so googleapiclient is only loaded by callers that use it.
+        
+        Returns:
+            GoogleCalendarNotificationService: Singleton instance of the Google Calendar service
+        """
+        if self._google_calendar_service is None:
+            self.log.info("[CONTAINER] Creating Google Calendar service instance")
+            from maivi_agent.infrastructure.google_calendar_service import get_google_calendar_service
+            self._google_calendar_service = get_google_calendar_service()
+            
+        return self._google_calendar_service
+
+    async def startup(self) -> None:
+        """
+        Eagerly build every dependency so the first request does not pay for it.
+        
+        Called once from the application lifespan before serving traffic.
+        """
+        self.log.info("[CONTAINER] Warming up dependencies")
+        dependencies = (
+            self.instance_openai_client,
+            self.instance_openai_service,
+            self.llm_orchestrator,
+            self.wsp_service,
+            self.storage_service,
+            self.receipt_repository,
+            self.idempotency_store,
+            self.calcom_service,
+        )
+        for dependency in dependencies:
+            self.log.info(f"[CONTAINER] {type(dependency).__name__} ready")
+        try:
+            await self.receipt_repository.ensure_indexes()
+            self.log.info("[CONTAINER] Receipt indexes ensured")
+        except Exception as e:
+            # Sin base de datos el servicio sigue clasificando; el guardado fallará con su propio error
+            self.log.error(f"[CONTAINER] Could not ensure receipt indexes: {e}")
+        from shared.prompts import PromptManager
+        prompts = PromptManager.warm_up(settings.NAME_AGENT)
+        self.log.info(f"[CONTAINER] Dependencies ready ({prompts} prompts cached)")
+
+    async def shutdown(self) -> None:
+        """
+        Release connections held by the dependencies (Mongo client, HTTP pools, thread pools).
+        
+        Called once from the application lifespan on shutdown.
+        """
+        self.log.info("[CONTAINER] Closing dependencies")
+        if self._image_storage_service is not None:
+            await self._image_storage_service.aclose()
+        if self._receipt_repository is not None:
+            await self._receipt_repository.close()
+        await self.calcom_service.aclose()
+        if self._google_calendar_service is not None:
+            await self._google_calendar_service.aclose()
+        self.log.info("[CONTAINER] Dependencies closed")
+
 instance = None
 
 def get_container() -> Container:
@@ -0,0 +1,147 @@
+"""
+Almacenamiento de imágenes direccionado por contenido.
+
+Cada imagen se guarda con el nombre `<sha256>.<ext>`: la misma imagen produce
+siempre el mismo objeto y dos imágenes distintas nunca colisionan, aunque se
+suban en el mismo segundo. Antes de subir se consulta un `ImageIndex`
+(hash -> URLs): una imagen ya conocida devuelve sus URLs sin volver a subirse, y
+las subidas concurrentes de la misma imagen esperan a una sola.
+
+Con un `ImageTranscoder`, la primera vez que se ve una imagen se transcodifica
+(WebP/JPEG) y se guardan también su vista previa y su miniatura:
+`<sha256>.<ext>`, `<sha256>_preview.<ext>` y `<sha256>_thumb.<ext>`. El hash es
+siempre el del archivo recibido, así que la deduplicación no cambia.
+
+Los backends concretos (ImageKit, disco local) solo implementan `_store`.
+"""
+import asyncio
+from abc import abstractmethod
+from typing import Optional, Union
+from maivi_agent.domain.entities import StoredImage
+from maivi_agent.domain.image_index import ImageIndex
+from maivi_agent.domain.image_storage import ImageStorage
+from maivi_agent.infrastructure.image_transcoder import ImageTranscoder, ImageVariant
+from maivi_agent.infrastructure.memory_image_index import InMemoryImageIndex
+from shared.image_buffer import ImageBuffer
+from shared.init_logger import init_logger
+from shared.metrics import get_metrics
+from shared.single_flight import SingleFlight
+
+DEFAULT_FOLDER = "/AGENT-AI/recibos"
+
+# Por debajo de este tamaño decodificar y calcular el hash en el event loop es más barato que cambiar de hilo
+INLINE_DIGEST_MAX_BYTES = 256 * 1024
+
+DEDUP_REQUESTS = get_metrics().counter(
+    "maivi_image_dedup_requests_total",
+    "Subidas de imágenes por resultado del índice de contenido (hit/coalesced/miss)"
+)
+IMAGE_BYTES = get_metrics().counter(
+    "maivi_image_bytes_total",
+    "Bytes de imágenes nuevas: recibidos (original) y almacenados por variante (full/preview/thumbnail)"
+)
+
+# Sufijo del nombre de cada variante
+VARIANT_SUFFIXES = {"full": "", "preview": "_preview", "thumbnail": "_thumb"}
+
+
+def _to_buffer(file_doc: Union[str, bytes]) -> ImageBuffer:
+    if isinstance(file_doc, (bytes, bytearray, memoryview)):
+        return ImageBuffer.from_bytes(file_doc)
+    return ImageBuffer.from_base64(file_doc)
+
+
+class ContentAddressedImageStorage(ImageStorage):
+    """Base de los backends de imágenes: nombre por hash, índice hash -> URLs, variantes y subidas coalescidas."""
+
+    def __init__(self, index: Optional[ImageIndex] = None, transcoder: Optional[ImageTranscoder] = None):
+        """
+        Args:
+            index: Índice hash -> URLs; por defecto uno LRU en memoria del proceso
+            transcoder: Genera la versión comprimida y las variantes; None guarda solo el original
+        """
+        self.index = index if index is not None else InMemoryImageIndex()
+        self.transcoder = transcoder
+        # Subidas en curso por hash, para no subir dos veces la misma imagen
+        self._storing: SingleFlight[StoredImage] = SingleFlight()
+        self.log = init_logger(self.__class__.__name__)
+
+    @abstractmethod
+    async def _store(self, data: bytes, object_name: str, folder: str, tags: Optional[str]) -> str:
+        """
+        Guarda el contenido con el nombre dado y devuelve su URL.
+
+        El nombre depende solo del contenido, así que guardar dos veces el mismo
+        objeto debe ser inofensivo.
+        """
+        pass
+
+    async def upload_image(self, file_doc: Union[str, bytes, ImageBuffer], file_name: str, folder: Optional[str] = None, tags: str = None) -> str:
+        stored = await self.upload_image_variants(file_doc, file_name, folder, tags)
+        return stored.url
+
+    async def upload_image_variants(self, file_doc: Union[str, bytes, ImageBuffer], file_name: str, folder: Optional[str] = None, tags: str = None) -> StoredImage:
+        if isinstance(file_doc, ImageBuffer):
+            # Ya decodificada y hasheada al recibirla: ni copia ni segundo hash
+            image = file_doc
+        elif isinstance(file_doc, str) or len(file_doc) > INLINE_DIGEST_MAX_BYTES:
+            # Decodificar base64 y hashear varios MB bloquea: fuera del event loop (hashlib libera el GIL)
+            image = await asyncio.to_thread(_to_buffer, file_doc)
+        else:
+            image = _to_buffer(file_doc)
+        content_hash = image.sha256
+
+        stored = await self.index.get(content_hash)
+        if stored is not None:
+            DEDUP_REQUESTS.inc(result="hit")
+            self.log.info(f"♻️  Imagen {content_hash[:12]} ({file_name}) ya almacenada, se reutiliza su URL")
+            return stored
+
+        async def store() -> StoredImage:
+            stored = await self._store_variants(image, folder or DEFAULT_FOLDER, tags)
+            await self.index.set(content_hash, stored)
+            return stored
+
+        DEDUP_REQUESTS.inc(result="coalesced" if content_hash in self._storing else "miss")
+        stored, _ = await self._storing.run(content_hash, store)
+        return stored
+
+    async def _variants(self, image: ImageBuffer) -> list[ImageVariant]:
+        variants = None
+        if self.transcoder is not None:
+            # Decodificar y recomprimir una foto de cámara son cientos de ms de CPU
+            variants = await asyncio.to_thread(self.transcoder.transcode, image.data, image.extension)
+        if not variants:
+            return [ImageVariant("full", image.data, image.extension, 0, 0)]
+        return variants
+
+    async def _store_variants(self, image: ImageBuffer, folder: str, tags: Optional[str]) -> StoredImage:
+        content_hash = image.sha256
+        variants = await self._variants(image)
+        urls = await asyncio.gather(*(
+            self._store(variant.data, f"{content_hash}{VARIANT_SUFFIXES[variant.name]}.{variant.extension}", folder, tags)
+            for variant in variants
+        ))
+        by_name = {variant.name: (url, len(variant.data)) for variant, url in zip(variants, urls)}
+
+        url, stored_bytes = by_name["full"]
+        preview_url, preview_bytes = by_name.get("preview", (None, 0))
+        thumbnail_url, thumbnail_bytes = by_name.get("thumbnail", (None, 0))
+        IMAGE_BYTES.inc(len(image), kind="original")
+        for variant in variants:
+            IMAGE_BYTES.inc(len(variant.data), kind=variant.name)
+        if len(variants) > 1:
+            saved = 1 - stored_bytes / len(image) if image.data else 0
+            self.log.info(
+                f"🗜️  Imagen {content_hash[:12]}: {len(image) / 1024:.0f} KB -> {stored_bytes / 1024:.0f} KB "
+                f"({saved:.0%} menos), vista previa {preview_bytes / 1024:.0f} KB, miniatura {thumbnail_bytes / 1024:.0f} KB"
+            )
+        return StoredImage(
+            url=url,
+            preview_url=preview_url,
+            thumbnail_url=thumbnail_url,
+            original_bytes=len(image),
+            stored_bytes=stored_bytes,
+            preview_bytes=preview_bytes,
+            thumbnail_bytes=thumbnail_bytes
+        )
@@ -1,29 +1,93 @@
 """
 Servicio de notificaciones con Google Calendar.
 Permite agendar recordatorios de pago un día antes y el día del vencimiento.
+
+`googleapiclient` es bloqueante: cada `.execute()` se ejecuta en un pool de
+hilos acotado (GOOGLE_CALENDAR_MAX_WORKERS), nunca en el event loop, y cada
+hilo usa su propio cliente httplib2 (no es thread-safe). Para muchos recibos,
+`schedule_payment_notifications_bulk` agrupa los eventos en peticiones batch de
+hasta GOOGLE_CALENDAR_BATCH_SIZE eventos.
+
+El servicio se construye con el documento de discovery local (el incluido en
+google-api-python-client o GOOGLE_CALENDAR_DISCOVERY_PATH), sin pedirlo a
+Google al arrancar.
 """
 from shared.init_logger import init_logger
+from shared.metrics import get_metrics
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Tuple, TypeVar
+import asyncio
 import random
-import json
+import threading
+import time
 from pathlib import Path
+import httplib2
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 from shared.config import settings
 
+T = TypeVar("T")
+
+# (tipo de recordatorio, payload del evento, hay invitados)
+Reminder = Tuple[str, Dict, bool]
+
+REQUEST_DURATION = get_metrics().histogram(
+    "maivi_google_calendar_request_duration_seconds",
+    "Duración de cada petición a Google Calendar por tipo (insert/batch/delete/list)"
+)
+EVENTS_CREATED = get_metrics().counter(
+    "maivi_google_calendar_events_total",
+    "Eventos de Google Calendar por resultado (ok/error)"
+)
+
 
 class GoogleCalendarNotificationService:
     """Servicio para programar notificaciones de pago usando Google Calendar."""
 
     SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = 4,
+        batch_size: int = 50,
+        timeout_seconds: float = 15,
+        discovery_path: str = "",
+        credentials: Optional[Any] = None,
+        api_endpoint: Optional[str] = None,
+        batch_uri: Optional[str] = None
+    ):
+        """
+        Args:
+            max_workers: Hilos que ejecutan las llamadas bloqueantes a la API
+            batch_size: Eventos por petición batch (Google recomienda no pasar de 50)
+            timeout_seconds: Tiempo máximo de cada petición HTTP
+            discovery_path: Documento de discovery de Calendar v3; vacío usa el incluido en la librería
+            credentials: Credenciales ya construidas; por defecto las de GOOGLE_CALENDAR_CREDENTIALS_PATH
+            api_endpoint: URL base de la API (pruebas o proxies); por defecto la de Google
+            batch_uri: URL del endpoint batch cuando se cambia `api_endpoint`
+        """
         self.calendar_id = settings.GOOGLE_CALENDAR_ID
         self.credentials_path = settings.GOOGLE_CALENDAR_CREDENTIALS_PATH
+        self.batch_size = batch_size
+        self.timeout_seconds = timeout_seconds
+        self.discovery_path = discovery_path
+        self.api_endpoint = api_endpoint
+        self.batch_uri = batch_uri
         self.logger = init_logger(self.__class__.__name__)
         self.service = None
+        self.events = None
+        self.credentials = credentials
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="google-calendar")
+        # Un cliente httplib2 autorizado por hilo del pool
+        self._local = threading.local()
+        
+        if credentials is not None:
+            self._initialize_service()
+            return
         
         if not self.credentials_path or self.credentials_path == "":
             self.logger.warning("GOOGLE_CALENDAR_CREDENTIALS_PATH no configurado - notificaciones deshabilitadas")
@@ -40,17 +104,38 @@ class GoogleCalendarNotificationService:
     def _initialize_service(self):
         """Inicializa el servicio de Google Calendar con las credenciales."""
         try:
-            credentials_file = Path(self.credentials_path)
-            if not credentials_file.exists():
-                self.logger.error(f"Archivo de credenciales no encontrado: {self.credentials_path}")
-                return
-            
-            credentials = service_account.Credentials.from_service_account_file(
-                str(credentials_file),
-                scopes=self.SCOPES
-            )
+            if self.credentials is None:
+                credentials_file = Path(self.credentials_path)
+                if not credentials_file.exists():
+                    self.logger.error(f"Archivo de credenciales no encontrado: {self.credentials_path}")
+                    return
+                
+                self.credentials = service_account.Credentials.from_service_account_file(
+                    str(credentials_file),
+                    scopes=self.SCOPES
+                )
             
-            self.service = build('calendar', 'v3', credentials=credentials)
+            client_options = {"api_endpoint": self.api_endpoint} if self.api_endpoint else None
+            discovery_file = Path(self.discovery_path) if self.discovery_path else None
+            if discovery_file is not None and discovery_file.exists():
+                self.service = build_from_document(
+                    discovery_file.read_text(encoding="utf-8"),
+                    credentials=self.credentials,
+                    client_options=client_options
+                )
+            else:
+                if discovery_file is not None:
+                    self.logger.warning(f"Documento de discovery no encontrado: {self.discovery_path}, se usa el de la librería")
+                # static_discovery: documento incluido en la librería, sin petición HTTP al arrancar
+                self.service = build(
+                    'calendar', 'v3',
+                    credentials=self.credentials,
+                    client_options=client_options,
+                    static_discovery=True,
+                    cache_discovery=False
+                )
+            # events() arma la colección desde el documento de discovery en cada llamada (~ms): una sola vez
+            self.events = self.service.events()
             self.logger.info("✅ Servicio de Google Calendar inicializado correctamente")
             
         except Exception as e:
@@ -58,6 +143,33 @@ class GoogleCalendarNotificationService:
             self.service = None
 
 
+    def _http(self) -> AuthorizedHttp:
+        """Cliente HTTP autorizado del hilo actual (httplib2 no se puede compartir entre hilos)."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout_seconds))
+            self._local.http = http
+        return http
+
+
+    async def _run(self, kind: str, operation: Callable[[AuthorizedHttp], T]) -> T:
+        """Ejecuta una llamada bloqueante de googleapiclient en el pool, fuera del event loop."""
+        def call() -> T:
+            started = time.perf_counter()
+            try:
+                return operation(self._http())
+            finally:
+                REQUEST_DURATION.observe(time.perf_counter() - started, kind=kind)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+
+    async def aclose(self) -> None:
+        """Espera a las llamadas en curso y detiene el pool de hilos."""
+        await asyncio.to_thread(self._executor.shutdown, True)
+
+
     def _parse_date(self, date_str: str) -> datetime:
         """Convierte fecha dd/MM/yyyy a datetime."""
         try:
@@ -157,6 +269,76 @@ class GoogleCalendarNotificationService:
             self.logger.warning("Google Calendar no configurado - saltando notificaciones")
             return []
         
+        reminders = self._build_reminders(
+            service_type, company, amount_total, date_expired, consumption_period,
+            attendee_email, attendee_name, phone_number, additional_emails
+        )
+        
+        # Los dos eventos son independientes: se crean a la vez en el pool
+        events = await asyncio.gather(*(
+            self._insert_event(payload, has_attendees) for _, payload, has_attendees in reminders
+        ))
+        return self._collect(reminders, events)
+
+
+    async def schedule_payment_notifications_bulk(self, receipts: List[Dict]) -> List[List[Dict]]:
+        """
+        Programa las notificaciones de muchos recibos agrupando los eventos en peticiones batch.
+        
+        API para procesos masivos (reprogramaciones, cargas iniciales): el flujo de
+        recibos agenda cada recibo con CAL.COM y no pasa por aquí.
+        
+        Args:
+            receipts: Argumentos de `schedule_payment_notifications` para cada recibo
+            
+        Returns:
+            Por cada recibo (en el mismo orden), la lista de notificaciones creadas;
+            vacía para los recibos con argumentos inválidos
+        """
+        if not self.service:
+            self.logger.warning("Google Calendar no configurado - saltando notificaciones")
+            return [[] for _ in receipts]
+        
+        reminders_by_receipt = [self._build_receipt_reminders(index, receipt)
+                                for index, receipt in enumerate(receipts)]
+        reminders = [reminder for receipt_reminders in reminders_by_receipt for reminder in receipt_reminders]
+        batches = [reminders[i:i + self.batch_size] for i in range(0, len(reminders), self.batch_size)]
+        
+        # Cada batch ocupa un hilo del pool: como mucho max_workers batches en vuelo
+        results = await asyncio.gather(*(self._insert_batch(batch) for batch in batches))
+        events = iter([event for batch_events in results for event in batch_events])
+        
+        scheduled = [self._collect(receipt_reminders, [next(events) for _ in receipt_reminders])
+                     for receipt_reminders in reminders_by_receipt]
+        self.logger.info(f"✅ {sum(map(len, scheduled))}/{len(reminders)} notificaciones programadas "
+                         f"para {len(receipts)} recibos en {len(batches)} peticiones batch")
+        return scheduled
+
+
+    def _build_receipt_reminders(self, index: int, receipt: Dict) -> List[Reminder]:
+        """Arma los eventos de un recibo del bulk; un recibo inválido no aborta el resto."""
+        try:
+            if not isinstance(receipt, dict):
+                raise TypeError(f"se esperaba un dict, se recibió {type(receipt).__name__}")
+            return self._build_reminders(**receipt)
+        except (TypeError, ValueError) as e:
+            self.logger.error(f"❌ Recibo {index} inválido, se omite: {e}")
+            return []
+
+
+    def _build_reminders(
+        self,
+        service_type: str,
+        company: str,
+        amount_total: float,
+        date_expired: str,
+        consumption_period: str,
+        attendee_email: str,
+        attendee_name: str = "Usuario",
+        phone_number: Optional[str] = None,
+        additional_emails: Optional[List[str]] = None
+    ) -> List[Reminder]:
+        """Arma los eventos del día anterior y del día del vencimiento de un recibo."""
         try:
             due_date = self._parse_date(date_expired)
         except ValueError as e:
@@ -180,56 +362,102 @@ class GoogleCalendarNotificationService:
         if additional_emails:
             all_attendees.extend(additional_emails)
         
-        results = []
+        # Minutos aleatorios para evitar conflictos (entre 0 y 90 minutos)
+        random_offset = random.randint(0, 90)
+        random_offset_2 = random.randint(0, 90)
         
-        # Notificación 1: Un día antes - Horario aleatorio entre 8:00-9:30 AM
-        try:
-            day_before = due_date - timedelta(days=1)
-            title_before = f"⏰ Mañana vence: {service_type} - S/ {amount_total}"
-            
-            # Usar minutos aleatorios para evitar conflictos (entre 0 y 90 minutos = 8:00-9:30 AM)
-            random_offset = random.randint(0, 90)
-            
-            event_before = await self._create_event(
-                day_before,
-                title_before,
+        return [
+            # Notificación 1: Un día antes - Horario aleatorio entre 8:00-9:30 AM
+            ("day_before", self._create_event_payload(
+                due_date - timedelta(days=1),
+                f"⏰ Mañana vence: {service_type} - S/ {amount_total}",
                 description,
                 all_attendees,
-                offset_minutes=-60 + random_offset  # Entre 8:00-9:30 AM
-            )
-            
-            if event_before:
-                results.append({"type": "day_before", "event": event_before})
-                hour = 8 + (random_offset // 60)
-                minute = random_offset % 60
-                self.logger.info(f"✅ Notificación programada para {day_before.date()} {hour:02d}:{minute:02d} AM")
-        except Exception as e:
-            self.logger.error(f"❌ Error al programar notificación día anterior: {e}")
-        
-        # Notificación 2: El mismo día - Horario aleatorio entre 7:00-8:30 AM
-        try:
-            title_same_day = f"🚨 HOY VENCE: {service_type} - S/ {amount_total}"
-            
-            # Usar minutos aleatorios diferentes (entre 0 y 90 minutos = 7:00-8:30 AM)
-            random_offset_2 = random.randint(0, 90)
-            
-            event_same_day = await self._create_event(
+                offset_minutes=-60 + random_offset
+            ), bool(all_attendees)),
+            # Notificación 2: El mismo día - Horario aleatorio entre 7:00-8:30 AM
+            ("due_date", self._create_event_payload(
                 due_date,
-                title_same_day,
+                f"🚨 HOY VENCE: {service_type} - S/ {amount_total}",
                 description,
                 all_attendees,
-                offset_minutes=-120 + random_offset_2  # Entre 7:00-8:30 AM
-            )
-            
-            if event_same_day:
-                results.append({"type": "due_date", "event": event_same_day})
-                hour = 7 + (random_offset_2 // 60)
-                minute = random_offset_2 % 60
-                self.logger.info(f"✅ Notificación programada para {due_date.date()} {hour:02d}:{minute:02d} AM")
+                offset_minutes=-120 + random_offset_2
+            ), bool(all_attendees)),
+        ]
+
+
+    def _collect(self, reminders: List[Reminder], events: List[Optional[Dict]]) -> List[Dict]:
+        results = []
+        for (reminder_type, payload, _), event in zip(reminders, events):
+            if event:
+                results.append({"type": reminder_type, "event": event})
+                self.logger.info(f"✅ Notificación programada para {payload['start']['dateTime']}")
+        return results
+
+
+    def _insert_request(self, payload: Dict, has_attendees: bool):
+        return self.events.insert(
+            calendarId=self.calendar_id,
+            body=payload,
+            sendUpdates='all' if has_attendees else 'none'
+        )
+
+
+    async def _insert_event(self, payload: Dict, has_attendees: bool) -> Optional[Dict]:
+        # Log para debug
+        self.logger.info(f"Creando evento: {payload.get('start', {}).get('dateTime')} - {payload.get('summary')}")
+        
+        try:
+            event = await self._run("insert", lambda http: self._insert_request(payload, has_attendees).execute(http=http))
+        except HttpError as error:
+            EVENTS_CREATED.inc(outcome="error")
+            self.logger.error(f"❌ Error HTTP al crear evento: {error}")
+            return None
         except Exception as e:
-            self.logger.error(f"❌ Error al programar notificación mismo día: {e}")
+            EVENTS_CREATED.inc(outcome="error")
+            self.logger.error(f"❌ Excepción al crear evento: {e}")
+            return None
         
-        return results
+        EVENTS_CREATED.inc(outcome="ok")
+        self.logger.info(f"✅ Evento creado: {event.get('id')} - {event.get('htmlLink')}")
+        return event
+
+
+    async def _insert_batch(self, reminders: List[Reminder]) -> List[Optional[Dict]]:
+        """Crea los eventos en una sola petición batch; un evento con error queda en None."""
+        events: List[Optional[Dict]] = [None] * len(reminders)
+        # Eventos cuya respuesta ya llegó (y ya se contó en EVENTS_CREATED)
+        answered = [False] * len(reminders)
+        
+        def on_response(request_id: str, response: Optional[Dict], exception: Optional[Exception]) -> None:
+            answered[int(request_id)] = True
+            if exception is not None:
+                EVENTS_CREATED.inc(outcome="error")
+                self.logger.error(f"❌ Error al crear evento en batch: {exception}")
+                return
+            EVENTS_CREATED.inc(outcome="ok")
+            events[int(request_id)] = response
+        
+        def execute_batch(http: AuthorizedHttp) -> None:
+            # Armar las peticiones (validar y serializar cada evento) también es CPU: se hace en el hilo
+            if self.batch_uri:
+                batch = BatchHttpRequest(callback=on_response, batch_uri=self.batch_uri)
+            else:
+                batch = self.service.new_batch_http_request(callback=on_response)
+            for position, (_, payload, has_attendees) in enumerate(reminders):
+                batch.add(self._insert_request(payload, has_attendees), request_id=str(position))
+            batch.execute(http=http)
+        
+        try:
+            await self._run("batch", execute_batch)
+        except Exception as e:
+            # La petición batch falló: los eventos sin respuesta cuentan como error
+            unanswered = answered.count(False)
+            if unanswered:
+                EVENTS_CREATED.inc(unanswered, outcome="error")
+            self.logger.error(f"❌ Error en petición batch de {len(reminders)} eventos "
+                              f"({unanswered} sin respuesta): {e}")
+        return events
 
 
     async def _create_event(
@@ -253,25 +481,7 @@ class GoogleCalendarNotificationService:
             offset_minutes
         )
         
-        # Log para debug
-        self.logger.info(f"Creando evento: {event_payload.get('start', {}).get('dateTime')} - {title}")
-        
-        try:
-            event = self.service.events().insert(
-                calendarId=self.calendar_id,
-                body=event_payload,
-                sendUpdates='all' if attendee_emails else 'none'
-            ).execute()
-            
-            self.logger.info(f"✅ Evento creado: {event.get('id')} - {event.get('htmlLink')}")
-            return event
-            
-        except HttpError as error:
-            self.logger.error(f"❌ Error HTTP al crear evento: {error}")
-            return None
-        except Exception as e:
-            self.logger.error(f"❌ Excepción al crear evento: {e}")
-            return None
+        return await self._insert_event(event_payload, bool(attendee_emails))
 
 
     async def delete_event(self, event_id: str) -> bool:
@@ -289,11 +499,11 @@ class GoogleCalendarNotificationService:
             return False
         
         try:
-            self.service.events().delete(
+            await self._run("delete", lambda http: self.events.delete(
                 calendarId=self.calendar_id,
                 eventId=event_id,
                 sendUpdates='all'
-            ).execute()
+            ).execute(http=http))
             
             self.logger.info(f"✅ Evento eliminado: {event_id}")
             return True
@@ -323,13 +533,13 @@ class GoogleCalendarNotificationService:
         try:
             now = datetime.utcnow().isoformat() + 'Z'  # 'Z' indica UTC
             
-            events_result = self.service.events().list(
+            events_result = await self._run("list", lambda http: self.events.list(
                 calendarId=self.calendar_id,
                 timeMin=now,
                 maxResults=max_results,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ).execute(http=http))
             
             events = events_result.get('items', [])
             
@@ -356,5 +566,10 @@ def get_google_calendar_service() -> GoogleCalendarNotificationService:
     """Obtiene la instancia del servicio de Google Calendar."""
     global _google_calendar_service
     if _google_calendar_service is None:
-        _google_calendar_service = GoogleCalendarNotificationService()
+        _google_calendar_service = GoogleCalendarNotificationService(
+            max_workers=settings.GOOGLE_CALENDAR_MAX_WORKERS,
+            batch_size=settings.GOOGLE_CALENDAR_BATCH_SIZE,
+            timeout_seconds=settings.GOOGLE_CALENDAR_TIMEOUT_SECONDS,
+            discovery_path=settings.GOOGLE_CALENDAR_DISCOVERY_PATH
+        )
     return _google_calendar_service
@@ -1,54 +1,109 @@
-import base64
-from datetime import datetime
+"""
+Almacenamiento de imágenes de recibos en ImageKit.
+
+Usa el cliente asíncrono del SDK (`AsyncImageKit`) sobre el transporte aiohttp
+del extra `imagekitio[aiohttp]`, así una subida de varios MB no bloquea el event
+loop mientras viaja por la red:
+- un único cliente por proceso reutiliza las conexiones (keep-alive)
+- IMAGEKIT_MAX_CONCURRENT_UPLOADS limita las subidas simultáneas; el resto espera turno
+- IMAGEKIT_TIMEOUT_SECONDS / IMAGEKIT_CONNECT_TIMEOUT_SECONDS acotan cada intento
+  e IMAGEKIT_MAX_RETRIES los reintentos del SDK
+
+Los objetos se nombran por el hash de su contenido (ver `ContentAddressedImageStorage`).
+"""
+import asyncio
+import time
 from typing import Optional
-from maivi_agent.domain.image_storage import ImageStorage
-from imagekitio import ImageKit
+import httpx
+from imagekitio import AsyncImageKit, DefaultAioHttpClient, DefaultAsyncHttpxClient
+from maivi_agent.domain.image_index import ImageIndex
+from maivi_agent.infrastructure.content_addressed_image_storage import ContentAddressedImageStorage
+from maivi_agent.infrastructure.image_transcoder import ImageTranscoder
 from shared.config import settings
-from shared.init_logger import init_logger
-
-class ImageStorageService(ImageStorage):
-    
-    def __init__(self):
-        self.imagekit = ImageKit(
-                private_key=settings.IMAGEKIT_PRIVATE_KEY
-            )
-        self.log= init_logger(self.__class__.__name__)
-        
-    
-    def _imagebase64_to_byte(self, image_base64: str) -> str :
-        return base64.b64decode(image_base64)
-    
-    def _image_to_base64(self, image_url: str) -> str:
-        base64_string= ""
-        with open(image_url, "rb") as image_file:
-            base64_string = base64.b64encode(image_file.read()).decode('utf-8')
-        return base64_string
-    
-    async def upload_image(self, file_doc: str, file_name: str, folder: Optional[str]=None, tags:str = None) -> str:
-        self.log.info(f"⬆️  Subiendo imagen a ImageKit en folder: {folder} con nombre: {file_name}")
+from shared.metrics import get_metrics
+
+UPLOAD_DURATION = get_metrics().histogram(
+    "maivi_image_upload_duration_seconds",
+    "Duración de las subidas de imágenes a ImageKit (incluida la espera de turno) por resultado"
+)
+
+
+def _build_http_client(max_connections: int, timeout: httpx.Timeout) -> httpx.AsyncClient:
+    """Cliente HTTP del SDK: aiohttp si el extra está instalado, httpx si no."""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    try:
+        return DefaultAioHttpClient(limits=limits, timeout=timeout)
+    except RuntimeError:
+        return DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+
+
+class ImageStorageService(ContentAddressedImageStorage):
+
+    def __init__(
+        self,
+        max_concurrent_uploads: int = 8,
+        timeout_seconds: float = 30,
+        connect_timeout_seconds: float = 5,
+        max_retries: int = 2,
+        index: Optional[ImageIndex] = None,
+        transcoder: Optional[ImageTranscoder] = None
+    ):
+        """
+        Args:
+            max_concurrent_uploads: Subidas simultáneas (y conexiones abiertas) como máximo
+            timeout_seconds: Tiempo máximo de cada intento de subida
+            connect_timeout_seconds: Tiempo máximo para abrir la conexión
+            max_retries: Reintentos del SDK ante errores de red, 408, 429 y 5xx
+            index: Índice hash -> URLs de las imágenes ya subidas
+            transcoder: Genera la versión comprimida y las variantes de cada imagen
+        """
+        super().__init__(index, transcoder)
+        timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self.imagekit = AsyncImageKit(
+            private_key=settings.IMAGEKIT_PRIVATE_KEY,
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=_build_http_client(max_concurrent_uploads, timeout)
+        )
+        self._uploads = asyncio.Semaphore(max_concurrent_uploads)
+
+    async def _store(self, data: bytes, object_name: str, folder: str, tags: Optional[str]) -> str:
+        self.log.info(f"⬆️  Subiendo imagen a ImageKit en folder: {folder} con nombre: {object_name}")
+        started = time.perf_counter()
+        outcome = "error"
         try:
-            name_file = datetime.now().strftime(f"{file_name}%Y%m%d_%H%M%S.png")
-            
-            file_byte = self._imagebase64_to_byte(file_doc)
-            
-            response= self.imagekit.files.upload(
-                file=file_byte,
-                file_name=name_file,
-                folder= folder if folder is not None and folder != "" else "/AGENT-AI/recibos",
-                tags=tags
-            )
-            
+            async with self._uploads:
+                # Nombre por contenido y sin sufijo aleatorio: la misma imagen siempre queda en la misma URL
+                response = await self.imagekit.files.upload(
+                    file=data,
+                    file_name=object_name,
+                    folder=folder,
+                    use_unique_file_name=False,
+                    tags=tags
+                )
+
+            outcome = "ok"
             return response.url
-            
+
         except Exception as e:
             self.log.error(f"❌ Error subiendo imagen a ImageKit: {e}", exc_info=True)
             raise e
-        
+        finally:
+            UPLOAD_DURATION.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def aclose(self) -> None:
+        await self.imagekit.close()
+
 _instance = None
 
 def get_instance() -> ImageStorageService:
     global _instance
 
     if _instance is None:
-        _instance = ImageStorageService()
-    return _instance
\ No newline at end of file
+        _instance = ImageStorageService(
+            max_concurrent_uploads=settings.IMAGEKIT_MAX_CONCURRENT_UPLOADS,
+            timeout_seconds=settings.IMAGEKIT_TIMEOUT_SECONDS,
+            connect_timeout_seconds=settings.IMAGEKIT_CONNECT_TIMEOUT_SECONDS,
+            max_retries=settings.IMAGEKIT_MAX_RETRIES
+        )
+    return _instance
@@ -0,0 +1,118 @@
+"""
+Transcodificación de las imágenes de recibos antes de almacenarlas.
+
+Las fotos llegan como PNG o JPEG a resolución de cámara y se guardaban tal cual
+(siempre con extensión .png). `ImageTranscoder` genera, una sola vez al subir:
+- full: la imagen en WebP (o JPEG) a la calidad configurada, limitada a
+  `max_dimension` píxeles por lado; si el resultado pesa más que el original y
+  no hacía falta reducirla, se conserva el original
+- preview: versión intermedia para verla en pantalla
+- thumbnail: miniatura para listados
+
+Pillow se importa al transcodificar, no al importar el módulo. Si no está
+instalado o la imagen no se puede abrir, solo se guarda el original.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+from shared.init_logger import init_logger
+
+# Formato de salida -> (formato de Pillow, extensión)
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ImageVariant:
+    """Una versión de la imagen lista para almacenar."""
+    name: str  # full | preview | thumbnail
+    data: bytes
+    extension: str
+    width: int
+    height: int
+
+
+class ImageTranscoder:
+    """Convierte una imagen a un formato eficiente y genera sus variantes reducidas."""
+
+    def __init__(
+        self,
+        output_format: str = "webp",
+        quality: int = 80,
+        max_dimension: int = 2048,
+        preview_dimension: int = 1024,
+        thumbnail_dimension: int = 256
+    ):
+        """
+        Args:
+            output_format: webp o jpeg
+            quality: Calidad de compresión (1-100)
+            max_dimension: Lado máximo de la imagen completa
+            preview_dimension: Lado máximo de la vista previa
+            thumbnail_dimension: Lado máximo de la miniatura
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de imagen no soportado: {output_format}. Use {', '.join(OUTPUT_FORMATS)}")
+        self.pillow_format, self.extension = OUTPUT_FORMATS[output_format]
+        self.quality = quality
+        self.max_dimension = max_dimension
+        self.preview_dimension = preview_dimension
+        self.thumbnail_dimension = thumbnail_dimension
+        self._pillow_missing = False
+        self.log = init_logger(self.__class__.__name__)
+
+    def _encode(self, image, name: str) -> ImageVariant:
+        buffer = BytesIO()
+        if self.pillow_format == "JPEG":
+            image.save(buffer, "JPEG", quality=self.quality, optimize=True, progressive=True)
+        else:
+            image.save(buffer, "WEBP", quality=self.quality, method=4)
+        return ImageVariant(name, buffer.getvalue(), self.extension, image.width, image.height)
+
+    def transcode(self, data: bytes, original_extension: str) -> Optional[list[ImageVariant]]:
+        """
+        Genera las variantes full, preview y thumbnail (bloqueante: llamar fuera del event loop).
+
+        Returns:
+            Optional[list[ImageVariant]]: Variantes, o None si no se puede transcodificar
+        """
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            if not self._pillow_missing:
+                self._pillow_missing = True
+                self.log.warning("Pillow no está instalado: se guardan las imágenes originales sin variantes")
+            return None
+
+        try:
+            with Image.open(BytesIO(data)) as opened:
+                # Las fotos del móvil traen la rotación en EXIF; se aplica antes de perder los metadatos
+                image = ImageOps.exif_transpose(opened)
+                image.load()
+        except Exception as e:
+            self.log.warning(f"No se pudo abrir la imagen para transcodificarla: {e}")
+            return None
+
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        if self.pillow_format == "JPEG" and image.mode == "RGBA":
+            # JPEG no tiene canal alfa: se aplana sobre blanco, como el papel del recibo
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+        original_size = image.size
+        full = image.copy()
+        full.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS)
+        full_variant = self._encode(full, "full")
+        if full.size == original_size and len(full_variant.data) >= len(data):
+            full_variant = ImageVariant("full", data, original_extension, *original_size)
+
+        variants = [full_variant]
+        for name, dimension in (("preview", self.preview_dimension), ("thumbnail", self.thumbnail_dimension)):
+            reduced = full.copy()
+            reduced.thumbnail((dimension, dimension), Image.Resampling.LANCZOS)
+            variants.append(self._encode(reduced, name))
+        return variants
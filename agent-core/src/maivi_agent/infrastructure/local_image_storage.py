@@ -0,0 +1,70 @@
+"""
+Almacenamiento de imágenes en el sistema de archivos local.
+
+Para despliegues on-prem y pruebas sin ImageKit (IMAGE_STORAGE_BACKEND=local).
+Las imágenes (y sus variantes) se guardan como `<raíz>/<folder>/<sha256>.<ext>`; si el archivo ya
+existe no se vuelve a escribir, así que la deduplicación sobrevive a reinicios
+aunque el índice en memoria se pierda. La escritura va a un archivo temporal que
+luego se renombra: un lector nunca ve una imagen a medias.
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from maivi_agent.domain.image_index import ImageIndex
+from maivi_agent.infrastructure.content_addressed_image_storage import ContentAddressedImageStorage
+from maivi_agent.infrastructure.image_transcoder import ImageTranscoder
+
+
+class LocalImageStorage(ContentAddressedImageStorage):
+    """Backend de imágenes sobre un directorio local, direccionado por contenido."""
+
+    def __init__(
+        self,
+        root_dir: str = "images",
+        base_url: str = "",
+        index: Optional[ImageIndex] = None,
+        transcoder: Optional[ImageTranscoder] = None
+    ):
+        """
+        Args:
+            root_dir: Directorio raíz donde se guardan las imágenes
+            base_url: URL pública bajo la que se sirve `root_dir`; vacía para devolver URIs file://
+            index: Índice hash -> URLs de las imágenes ya guardadas
+            transcoder: Genera la versión comprimida y las variantes de cada imagen
+        """
+        super().__init__(index, transcoder)
+        self.root = Path(root_dir).resolve()
+        self.base_url = base_url.rstrip("/")
+
+    def _url(self, relative_path: str) -> str:
+        if self.base_url:
+            return f"{self.base_url}/{relative_path}"
+        return (self.root / relative_path).as_uri()
+
+    def _write(self, data: bytes, relative_path: str) -> bool:
+        path = self.root / relative_path
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return True
+
+    async def _store(self, data: bytes, object_name: str, folder: str, tags: Optional[str]) -> str:
+        relative_path = f"{folder.strip('/')}/{object_name}" if folder.strip("/") else object_name
+        try:
+            written = await asyncio.to_thread(self._write, data, relative_path)
+        except Exception as e:
+            self.log.error(f"❌ Error guardando imagen en {self.root}: {e}", exc_info=True)
+            raise e
+        if written:
+            self.log.info(f"💾 Imagen guardada en {self.root} con nombre: {relative_path}")
+        return self._url(relative_path)
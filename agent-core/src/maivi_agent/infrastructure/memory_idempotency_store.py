@@ -0,0 +1,19 @@
+from typing import Any, Optional
+from maivi_agent.domain.idempotency_store import IdempotencyStore
+from shared.ttl_lru_cache import TtlLruCache
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Implementación en memoria del proceso, con TTL por entrada y tamaño máximo."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self._entries: TtlLruCache[Any] = TtlLruCache(max_entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        self._entries.set(key, value, ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        self._entries.delete(key)
@@ -0,0 +1,20 @@
+from typing import Optional
+from maivi_agent.domain.entities import StoredImage
+from maivi_agent.domain.image_index import ImageIndex
+from shared.ttl_lru_cache import TtlLruCache
+
+
+class InMemoryImageIndex(ImageIndex):
+    """Índice LRU en memoria del proceso, con tamaño máximo."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self._images: TtlLruCache[StoredImage] = TtlLruCache(max_entries)
+
+    async def get(self, content_hash: str) -> Optional[StoredImage]:
+        return self._images.get(content_hash)
+
+    async def set(self, content_hash: str, image: StoredImage) -> None:
+        self._images.set(content_hash, image)
+
+    def __len__(self) -> int:
+        return len(self._images)
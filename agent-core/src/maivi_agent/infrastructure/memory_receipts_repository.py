@@ -0,0 +1,199 @@
+"""
+Repositorio de recibos en memoria del proceso.
+
+Pensado para pruebas y benchmarks sin MongoDB (RECEIPTS_BACKEND=memory). Replica
+la semántica de `ReceiptsRepositoryImpl` y también sus índices, para que el coste
+de cada consulta se parezca al real:
+- clave natural única: un recibo repetido devuelve el existente
+- (teléfono, servicio) y teléfono -> lista ordenada por (created_at, id), que
+  resuelve el historial con búsqueda binaria sin recorrer todos los recibos
+- vencimiento -> recibos aún no notificados
+- acumulados mensuales por (teléfono, servicio, mes)
+
+Los datos se pierden al terminar el proceso.
+"""
+import asyncio
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from typing import AsyncIterator, Optional, Union
+from bson import ObjectId
+from maivi_agent.domain.entities import (
+    MonthlySpend,
+    ReceiptDataSave,
+    ReceiptPage,
+    ReceiptRecord,
+    ReceiptSaveResult,
+    decode_history_cursor,
+    due_date_range,
+    encode_history_cursor,
+    receipt_natural_key,
+    rollup_month,
+)
+from maivi_agent.domain.receipts_exceptions import InvalidReceiptDataError, ReceiptNotFoundError, ReceiptQueryError
+from maivi_agent.domain.receipts_repository import ReceiptsRepository
+
+
+def _to_document(receipt_data: ReceiptDataSave) -> dict:
+    document = receipt_data.model_dump()
+    document["service_type"] = receipt_data.service_type.value
+    document["_id"] = str(ObjectId())
+    return document
+
+
+class InMemoryReceiptsRepository(ReceiptsRepository):
+    """Repositorio de recibos en memoria con índices equivalentes a los de MongoDB."""
+
+    def __init__(self):
+        self._documents: dict[str, dict] = {}
+        self._by_natural_key: dict[tuple, str] = {}
+        # Listas ascendentes de (created_at, id); las consultas las recorren al revés
+        self._by_phone_service: dict[tuple[str, str], list[tuple[datetime, str]]] = {}
+        self._by_phone: dict[str, list[tuple[datetime, str]]] = {}
+        self._pending_by_due_date: dict[datetime, set[str]] = {}
+        self._rollups: dict[tuple[str, str, str], list] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _insert(self, document: dict) -> ReceiptSaveResult:
+        key = receipt_natural_key(document)
+        if key is not None:
+            key_tuple = tuple(key.values())
+            existing = self._by_natural_key.get(key_tuple)
+            if existing is not None:
+                return ReceiptSaveResult(existing, created=False)
+            self._by_natural_key[key_tuple] = document["_id"]
+
+        receipt_id = document["_id"]
+        self._documents[receipt_id] = document
+        position = (document["created_at"], receipt_id)
+        insort(self._by_phone_service.setdefault((document["phone_number"], document["service_type"]), []), position)
+        insort(self._by_phone.setdefault(document["phone_number"], []), position)
+        if document.get("date_expired") is not None and not document.get("is_notified"):
+            self._pending_by_due_date.setdefault(document["date_expired"], set()).add(receipt_id)
+
+        rollup = self._rollups.setdefault(
+            (document["phone_number"], document["service_type"], rollup_month(document)), [0, 0]
+        )
+        rollup[0] += document.get("amount_total") or 0
+        rollup[1] += 1
+        return ReceiptSaveResult(receipt_id, created=True)
+
+    async def save_receipt(self, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
+        return self._insert(_to_document(receipt_data))
+
+    async def save_receipts(self, receipts_data: list[ReceiptDataSave]) -> list[ReceiptSaveResult]:
+        return [self._insert(_to_document(receipt)) for receipt in receipts_data]
+
+    def _receipt(self, receipt_id: str) -> ReceiptDataSave:
+        document = dict(self._documents[receipt_id])
+        return ReceiptDataSave(id_receipt=document.pop("_id"), **document)
+
+    def _record(self, receipt_id: str) -> ReceiptRecord:
+        return ReceiptRecord.from_document(self._documents[receipt_id])
+
+    async def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+        positions = self._by_phone_service.get((phone_number, service_type), [])
+        return [self._receipt(receipt_id) for _, receipt_id in reversed(positions)]
+
+    async def iter_receipts_by_service(
+        self, phone_number: str, service_type: str, batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        # Copia de las posiciones: los recibos guardados durante el recorrido no lo alteran
+        positions = list(self._by_phone_service.get((phone_number, service_type), []))
+        for index, (_, receipt_id) in enumerate(reversed(positions), start=1):
+            yield self._record(receipt_id)
+            if index % batch_size == 0:
+                # Un lote por vuelta del event loop, como un cursor real
+                await asyncio.sleep(0)
+
+    async def get_receipt_history(
+        self,
+        phone_number: str,
+        service_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> ReceiptPage:
+        if service_type:
+            positions = self._by_phone_service.get((phone_number, service_type), [])
+        else:
+            positions = self._by_phone.get(phone_number, [])
+
+        # Rango [lower, upper) de la lista ascendente; (t,) ordena antes que cualquier (t, id)
+        lower = bisect_left(positions, (created_from,)) if created_from is not None else 0
+        upper = bisect_left(positions, (created_to,)) if created_to is not None else len(positions)
+        if cursor:
+            created_at, receipt_id = decode_history_cursor(cursor)
+            if not ObjectId.is_valid(receipt_id):
+                raise InvalidReceiptDataError("Cursor de paginación inválido", field="cursor")
+            upper = min(upper, bisect_left(positions, (created_at, receipt_id)))
+
+        start = max(lower, upper - limit)
+        items = [self._record(receipt_id) for _, receipt_id in reversed(positions[start:upper])]
+        next_cursor = None
+        if start > lower and items:
+            last = items[-1]
+            next_cursor = encode_history_cursor(last.created_at, last.id_receipt)
+        return ReceiptPage(items=items, next_cursor=next_cursor)
+
+    async def get_monthly_summary(
+        self, phone_number: str, year: Optional[int] = None, service_type: Optional[str] = None
+    ) -> list[MonthlySpend]:
+        summary = [
+            MonthlySpend(rollup_service, month, round(total, 2), count)
+            for (rollup_phone, rollup_service, month), (total, count) in self._rollups.items()
+            if rollup_phone == phone_number
+            and (not service_type or rollup_service == service_type)
+            and (year is None or month.startswith(f"{year:04d}-"))
+        ]
+        return sorted(summary, key=lambda spend: spend.month)
+
+    async def rebuild_monthly_rollups(self) -> int:
+        rollups: dict[tuple[str, str, str], list] = {}
+        for document in self._documents.values():
+            rollup = rollups.setdefault(
+                (document["phone_number"], document["service_type"], rollup_month(document)), [0, 0]
+            )
+            rollup[0] += document.get("amount_total") or 0
+            rollup[1] += 1
+        self._rollups = rollups
+        return len(rollups)
+
+    async def mark_as_notified(self, receipt_id: str) -> None:
+        document = self._documents.get(receipt_id)
+        if document is None:
+            raise ReceiptNotFoundError(receipt_id)
+        document["is_notified"] = True
+        pending = self._pending_by_due_date.get(document.get("date_expired"))
+        if pending is not None:
+            pending.discard(receipt_id)
+
+    def _pending_ids(self, date_expired: Union[str, date]) -> list[str]:
+        start, end = due_date_range(date_expired)
+        return sorted(
+            receipt_id
+            for due_date, receipt_ids in self._pending_by_due_date.items()
+            if start <= due_date < end
+            for receipt_id in receipt_ids
+        )
+
+    async def obtain_receipt_expire_by_date(self, date_expired: Union[str, date]) -> list[ReceiptDataSave]:
+        try:
+            receipt_ids = self._pending_ids(date_expired)
+        except ValueError as e:
+            raise ReceiptQueryError("obtain_receipt_expire_by_date", original_error=e)
+        return [self._receipt(receipt_id) for receipt_id in receipt_ids]
+
+    async def iter_receipts_expire_by_date(
+        self, date_expired: Union[str, date], batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        try:
+            receipt_ids = self._pending_ids(date_expired)
+        except ValueError as e:
+            raise ReceiptQueryError("iter_receipts_expire_by_date", original_error=e)
+        for index, receipt_id in enumerate(receipt_ids, start=1):
+            yield self._record(receipt_id)
+            if index % batch_size == 0:
+                await asyncio.sleep(0)
@@ -0,0 +1,132 @@
+"""
+Buffer de escritura diferida para los recibos.
+
+Agrupa los documentos que llegan de ejecuciones concurrentes del grafo en una
+sola `insert_many(ordered=False)`. Cada llamada recibe su propio id (o su propio
+error) a través de un future, así que para el nodo que guarda el recibo es
+transparente. El lote se escribe al alcanzar `max_batch_size` documentos o al
+cumplirse `flush_interval` segundos desde el primer documento pendiente.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+from bson import ObjectId
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError
+from maivi_agent.domain.receipts_exceptions import DuplicateReceiptError, ReceiptSaveError
+from shared.init_logger import init_logger
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ReceiptWriteBuffer:
+    """Agrupa inserciones de recibos en escrituras masivas."""
+
+    def __init__(
+        self,
+        collection: AsyncCollection,
+        max_batch_size: int = 100,
+        flush_interval: float = 0.05,
+        on_batch_written: Optional[Callable[[list[dict]], Awaitable[None]]] = None
+    ):
+        """
+        Args:
+            collection: Colección de MongoDB donde se insertan los recibos
+            max_batch_size: Documentos que disparan una escritura inmediata
+            flush_interval: Segundos máximos que un documento espera en el buffer
+            on_batch_written: Se llama con los documentos insertados de cada lote,
+                después de entregar los ids
+        """
+        self.collection = collection
+        self.on_batch_written = on_batch_written
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+        self._closed = False
+        self.batches_written = 0
+        self.log = init_logger(self.__class__.__name__)
+
+    async def submit(self, document: dict) -> str:
+        """
+        Encola un documento y espera a que su lote se escriba.
+
+        Si quien espera se cancela, el documento se escribe igualmente.
+
+        Returns:
+            str: Id del documento insertado
+
+        Raises:
+            DuplicateReceiptError: Si el documento viola el índice único de recibos
+            ReceiptSaveError: Si la inserción de este documento falla
+        """
+        if self._closed:
+            raise ReceiptSaveError("El buffer de escritura de recibos está cerrado")
+
+        loop = asyncio.get_running_loop()
+        document.setdefault("_id", ObjectId())
+        future = loop.create_future()
+        # Marca el error como consumido aunque quien esperaba se haya cancelado
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending.append((document, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._start_flush)
+
+        return await asyncio.shield(future)
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        failed: dict[int, dict] = {}
+        try:
+            await self.collection.insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            # Con ordered=False el resto del lote se inserta; solo fallan los documentos reportados
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            self.log.error(f"Error al escribir un lote de {len(batch)} recibos: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ReceiptSaveError("Error al guardar los recibos en lote", original_error=e))
+            return
+
+        self.batches_written += 1
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed and failed[index].get("code") == DUPLICATE_KEY_ERROR:
+                future.set_exception(DuplicateReceiptError(str(failed[index].get("keyValue", document["_id"]))))
+            elif index in failed:
+                future.set_exception(ReceiptSaveError(original_error=Exception(failed[index].get("errmsg", "write error"))))
+            else:
+                future.set_result(str(document["_id"]))
+
+        if self.on_batch_written is not None:
+            written = [document for index, (document, _) in enumerate(batch) if index not in failed]
+            try:
+                await self.on_batch_written(written)
+            except Exception as e:
+                self.log.error(f"Error tras escribir un lote de {len(written)} recibos: {e}")
+
+    async def flush(self) -> None:
+        """Escribe los documentos pendientes y espera a las escrituras en curso."""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def aclose(self) -> None:
+        """Deja de aceptar documentos y vacía el buffer."""
+        self._closed = True
+        await self.flush()
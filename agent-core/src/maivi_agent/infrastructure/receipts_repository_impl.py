@@ -1,53 +1,419 @@
+from datetime import date, datetime
+from typing import AsyncIterator, Optional, Union
 import pymongo
 from bson import ObjectId
-from maivi_agent.domain.entities import ReceiptDataSave
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from maivi_agent.domain.entities import (
+    RECEIPT_NATURAL_KEY,
+    MonthlySpend,
+    ReceiptDataSave,
+    ReceiptPage,
+    ReceiptRecord,
+    ReceiptSaveResult,
+    decode_history_cursor,
+    due_date_range,
+    encode_history_cursor,
+    receipt_natural_key,
+    rollup_month,
+)
 from maivi_agent.domain.receipts_repository import ReceiptsRepository
 from maivi_agent.domain.receipts_exceptions import (
+    DuplicateReceiptError,
+    InvalidReceiptDataError,
     ReceiptSaveError,
     ReceiptUpdateError,
     ReceiptQueryError,
     DatabaseConnectionError,
     ReceiptNotFoundError,
 )
+from maivi_agent.infrastructure.receipt_write_buffer import DUPLICATE_KEY_ERROR, ReceiptWriteBuffer
 from shared.config import settings
+from shared.init_logger import init_logger
+
+# Índices que usan las consultas del repositorio
+RECEIPT_INDEXES = [
+    # get_receipts_by_service y get_receipt_history por servicio: más recientes primero, _id desempata
+    pymongo.IndexModel(
+        [
+            ("phone_number", pymongo.ASCENDING),
+            ("service_type", pymongo.ASCENDING),
+            ("created_at", pymongo.DESCENDING),
+            ("_id", pymongo.DESCENDING),
+        ],
+        name="phone_service_created_at_id"
+    ),
+    # get_receipt_history sin filtro de servicio
+    pymongo.IndexModel(
+        [("phone_number", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+        name="phone_created_at_id"
+    ),
+    # obtain_receipt_expire_by_date: rango de fechas sobre los recibos aún no notificados
+    pymongo.IndexModel(
+        [("date_expired", pymongo.ASCENDING)],
+        name="date_expired_pending",
+        partialFilterExpression={"is_notified": False}
+    ),
+    # save_receipt: un mismo recibo procesado dos veces no genera otro documento
+    pymongo.IndexModel(
+        [(field, pymongo.ASCENDING) for field in RECEIPT_NATURAL_KEY],
+        name="receipt_natural_key",
+        unique=True,
+        partialFilterExpression={
+            "company": {"$type": "string"},
+            "consumption_period": {"$type": "string"},
+            "amount_total": {"$type": "number"},
+        }
+    ),
+]
+
+# Acumulados de gasto por usuario, servicio y mes (colección <COLLECTION_NAME>_monthly)
+ROLLUP_COLLECTION_SUFFIX = "_monthly"
+ROLLUP_INDEXES = [
+    pymongo.IndexModel(
+        [("phone_number", pymongo.ASCENDING), ("service_type", pymongo.ASCENDING), ("month", pymongo.ASCENDING)],
+        name="phone_service_month",
+        unique=True
+    ),
+    # get_monthly_summary sin filtro de servicio
+    pymongo.IndexModel([("phone_number", pymongo.ASCENDING), ("month", pymongo.ASCENDING)], name="phone_month"),
+]
+
+# Campos que necesita ReceiptRecord; el resto del documento no viaja por la red
+RECORD_PROJECTION = {
+    "phone_number": 1,
+    "service_type": 1,
+    "is_notified": 1,
+    "amount_total": 1,
+    "date_expired": 1,
+    "consumption_period": 1,
+    "company": 1,
+    "created_at": 1,
+    "link_receipt_thumbnail": 1,
+}
+
+
+def _to_document(receipt_data: Union[ReceiptDataSave, dict]) -> dict:
+    """Convierte el recibo al documento de MongoDB, con fechas como datetime nativos."""
+    if isinstance(receipt_data, dict):
+        return receipt_data
+    document = receipt_data.model_dump()
+    document["service_type"] = receipt_data.service_type.value
+    return document
+
+
+def _to_receipt(document: dict) -> ReceiptDataSave:
+    """Construye el recibo completo desde su documento, conservando el _id como id_receipt."""
+    return ReceiptDataSave(id_receipt=str(document.pop("_id")), **document)
+
+
+def _key_tuple(document: dict) -> tuple:
+    return tuple(document.get(field) for field in RECEIPT_NATURAL_KEY)
+
 
 class ReceiptsRepositoryImpl(ReceiptsRepository):
+    """
+    Repositorio de recibos sobre MongoDB con el cliente asíncrono de pymongo.
+    
+    Las operaciones se esperan en el event loop sin bloquearlo; el pool de
+    conexiones y los timeouts se configuran con las variables MONGO_*.
+    Opcionalmente `save_receipt` pasa por un buffer de escritura diferida que
+    agrupa las inserciones concurrentes en una sola `insert_many`.
+    """
     
-    def __init__(self):
+    def __init__(self, write_buffer: bool = False, buffer_max_batch_size: int = 100, buffer_flush_interval: float = 0.05):
+        self.client = None
         self.db = self._init_database()
+        self.rollups: AsyncCollection = self.db.database.get_collection(f"{settings.COLLECTION_NAME}{ROLLUP_COLLECTION_SUFFIX}")
+        self.log = init_logger(self.__class__.__name__)
+        self.write_buffer: Optional[ReceiptWriteBuffer] = None
+        if write_buffer:
+            self.write_buffer = ReceiptWriteBuffer(
+                self.db, buffer_max_batch_size, buffer_flush_interval, on_batch_written=self._add_to_rollups
+            )
         
-    def _init_database(self) -> pymongo.collection.Collection:
+    def _init_database(self) -> AsyncCollection:
         try:
-            client = pymongo.MongoClient(settings.DATABASE_URL)
+            # El cliente no abre conexiones hasta la primera operación
+            client = pymongo.AsyncMongoClient(
+                settings.DATABASE_URL,
+                tz_aware=True,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            )
+            self.client = client
             database = client.get_database(settings.DATABASE_NAME)
             collection = database.get_collection(settings.COLLECTION_NAME)
             return collection
         except Exception as e:
             raise DatabaseConnectionError(original_error=e)
 
-    def save_receipt(self, receipt_data: ReceiptDataSave) -> str:
+    async def ensure_indexes(self) -> None:
         try:
-            data = receipt_data if isinstance(receipt_data, dict) else receipt_data.model_dump(mode='json')
-            result = self.db.insert_one(data)
-            return str(result.inserted_id)
+            await self.db.create_indexes(RECEIPT_INDEXES)
+            await self.rollups.create_indexes(ROLLUP_INDEXES)
+        except Exception as e:
+            raise DatabaseConnectionError("Error al crear los índices de recibos", original_error=e)
+
+    async def save_receipt(self, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
+        document = _to_document(receipt_data)
+        document.setdefault("_id", ObjectId())
+        result = await self._save_document(document)
+        # Con el buffer, los acumulados se actualizan por lote al escribirlo
+        if result.created and self.write_buffer is None:
+            await self._add_to_rollups([document])
+        return result
+
+    async def _save_document(self, document: dict) -> ReceiptSaveResult:
+        key = receipt_natural_key(document)
+
+        if self.write_buffer is not None:
+            try:
+                return ReceiptSaveResult(await self.write_buffer.submit(document), created=True)
+            except DuplicateReceiptError:
+                return await self._existing_receipt(key)
+
+        if key is None:
+            # Sin clave natural completa no hay forma de detectar duplicados
+            try:
+                await self.db.insert_one(document)
+            except Exception as e:
+                raise ReceiptSaveError(original_error=e)
+            return ReceiptSaveResult(str(document["_id"]), created=True)
+
+        try:
+            previous = await self.db.find_one_and_update(
+                key,
+                {"$setOnInsert": document},
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Otra petición insertó el mismo recibo entre la búsqueda y la inserción
+            return await self._existing_receipt(key)
         except Exception as e:
             raise ReceiptSaveError(original_error=e)
 
-    def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+        if previous is None:
+            return ReceiptSaveResult(str(document["_id"]), created=True)
+        return ReceiptSaveResult(str(previous["_id"]), created=False)
+
+    async def _existing_receipt(self, key: Optional[dict]) -> ReceiptSaveResult:
+        try:
+            existing = await self.db.find_one(key, {"_id": 1}) if key else None
+        except Exception as e:
+            raise ReceiptSaveError(original_error=e)
+        if existing is None:
+            raise ReceiptSaveError("El recibo duplicado no se encontró al consultarlo")
+        return ReceiptSaveResult(str(existing["_id"]), created=False)
+
+    async def save_receipts(self, receipts_data: list[ReceiptDataSave]) -> list[ReceiptSaveResult]:
+        if not receipts_data:
+            return []
+
+        documents = [_to_document(receipt) for receipt in receipts_data]
+        keys = []
+        operations = []
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            key = receipt_natural_key(document)
+            keys.append(key)
+            operations.append(UpdateOne(key, {"$setOnInsert": document}, upsert=True) if key else InsertOne(document))
+
         try:
-            receipts = self.db.find({
+            result = await self.db.bulk_write(operations, ordered=False)
+            created = {index for index, key in enumerate(keys) if key is None} | set(result.upserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            # Los duplicados (p. ej. el mismo recibo dos veces en el lote) se resuelven abajo; el resto es un fallo real
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise ReceiptSaveError("Error al guardar los recibos en lote", original_error=e)
+            failed = {error["index"] for error in errors}
+            created = {upserted["index"] for upserted in e.details.get("upserted", [])}
+            created |= {index for index, key in enumerate(keys) if key is None and index not in failed}
+        except Exception as e:
+            raise ReceiptSaveError("Error al guardar los recibos en lote", original_error=e)
+
+        existing_ids = {}
+        existing_keys = [keys[index] for index in range(len(documents)) if index not in created]
+        if existing_keys:
+            try:
+                cursor = self.db.find({"$or": existing_keys}, {"_id": 1, **{field: 1 for field in RECEIPT_NATURAL_KEY}})
+                async for existing in cursor:
+                    existing_ids[_key_tuple(existing)] = str(existing["_id"])
+            except Exception as e:
+                raise ReceiptSaveError("Error al consultar los recibos ya existentes", original_error=e)
+
+        results = []
+        for index, (document, key) in enumerate(zip(documents, keys)):
+            if index in created:
+                results.append(ReceiptSaveResult(str(document["_id"]), created=True))
+            elif _key_tuple(key) in existing_ids:
+                results.append(ReceiptSaveResult(existing_ids[_key_tuple(key)], created=False))
+            else:
+                raise ReceiptSaveError(f"El recibo {index} del lote no se guardó ni existía")
+
+        await self._add_to_rollups([documents[index] for index in sorted(created)])
+        return results
+
+    async def _add_to_rollups(self, documents: list[dict]) -> None:
+        """Suma los recibos nuevos a sus acumulados mensuales; un fallo aquí no invalida el guardado."""
+        if not documents:
+            return
+        increments: dict[tuple[str, str, str], list] = {}
+        for document in documents:
+            rollup = increments.setdefault(
+                (document["phone_number"], document["service_type"], rollup_month(document)), [0, 0]
+            )
+            rollup[0] += document.get("amount_total") or 0
+            rollup[1] += 1
+        operations = [
+            UpdateOne(
+                {"phone_number": phone_number, "service_type": service_type, "month": month},
+                {"$inc": {"total": total, "count": count}},
+                upsert=True
+            )
+            for (phone_number, service_type, month), (total, count) in increments.items()
+        ]
+        try:
+            await self.rollups.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # rebuild_monthly_rollups recalcula los acumulados desde los recibos
+            self.log.error(f"Error al actualizar los acumulados mensuales de {len(documents)} recibos: {e}")
+
+    async def get_monthly_summary(
+        self, phone_number: str, year: Optional[int] = None, service_type: Optional[str] = None
+    ) -> list[MonthlySpend]:
+        query = {"phone_number": phone_number}
+        if service_type:
+            query["service_type"] = service_type
+        if year is not None:
+            query["month"] = {"$gte": f"{year:04d}-01", "$lte": f"{year:04d}-12"}
+        try:
+            cursor = self.rollups.find(query, {"_id": 0, "service_type": 1, "month": 1, "total": 1, "count": 1})
+            rollups = await cursor.sort("month", pymongo.ASCENDING).to_list(length=None)
+        except Exception as e:
+            raise ReceiptQueryError("get_monthly_summary", original_error=e)
+        return [
+            MonthlySpend(rollup["service_type"], rollup["month"], round(rollup["total"], 2), rollup["count"])
+            for rollup in rollups
+        ]
+
+    async def rebuild_monthly_rollups(self) -> int:
+        pipeline = [
+            {"$group": {
+                "_id": {
+                    "phone_number": "$phone_number",
+                    "service_type": "$service_type",
+                    # Las fechas se guardan en UTC, la zona por defecto de $dateToString
+                    "month": {"$dateToString": {
+                        "format": "%Y-%m",
+                        "date": {"$ifNull": ["$date_expired", "$created_at"]},
+                    }},
+                },
+                "total": {"$sum": {"$ifNull": ["$amount_total", 0]}},
+                "count": {"$sum": 1},
+            }},
+            {"$project": {
+                "_id": 0,
+                "phone_number": "$_id.phone_number",
+                "service_type": "$_id.service_type",
+                "month": "$_id.month",
+                "total": 1,
+                "count": 1,
+            }},
+            # $out sustituye la colección de acumulados de forma atómica y conserva sus índices
+            {"$out": self.rollups.name},
+        ]
+        try:
+            await (await self.db.aggregate(pipeline, allowDiskUse=True)).close()
+            await self.rollups.create_indexes(ROLLUP_INDEXES)
+            return await self.rollups.count_documents({})
+        except Exception as e:
+            raise ReceiptQueryError("rebuild_monthly_rollups", "Error al recalcular los acumulados mensuales", original_error=e)
+
+    async def close(self) -> None:
+        if self.write_buffer is not None:
+            await self.write_buffer.aclose()
+        if self.client is not None:
+            await self.client.close()
+
+    async def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+        try:
+            cursor = self.db.find({
                 "phone_number": phone_number,
                 "service_type": service_type
-            })
-            return [ReceiptDataSave(**receipt) for receipt in receipts]
+            }).sort("created_at", pymongo.DESCENDING)
+            return [_to_receipt(receipt) async for receipt in cursor]
         except Exception as e:
             raise ReceiptQueryError("get_receipts_by_service", original_error=e)
 
-    def mark_as_notified(self, receipt_id: str) -> None:
+    async def iter_receipts_by_service(
+        self, phone_number: str, service_type: str, batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        cursor = self.db.find(
+            {"phone_number": phone_number, "service_type": service_type},
+            RECORD_PROJECTION
+        ).sort("created_at", pymongo.DESCENDING).batch_size(batch_size)
+        async for record in self._stream(cursor, "iter_receipts_by_service"):
+            yield record
+
+    async def get_receipt_history(
+        self,
+        phone_number: str,
+        service_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> ReceiptPage:
+        query = {"phone_number": phone_number}
+        if service_type:
+            query["service_type"] = service_type
+        created_range = {}
+        if created_from is not None:
+            created_range["$gte"] = created_from
+        if created_to is not None:
+            created_range["$lt"] = created_to
+        if created_range:
+            query["created_at"] = created_range
+        if cursor:
+            created_at, receipt_id = decode_history_cursor(cursor)
+            if not ObjectId.is_valid(receipt_id):
+                raise InvalidReceiptDataError("Cursor de paginación inválido", field="cursor")
+            # Recibos estrictamente posteriores al último de la página anterior en orden (created_at, _id) desc
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": ObjectId(receipt_id)}},
+            ]
+
+        try:
+            # Un documento de más indica si hay otra página
+            documents = await self.db.find(query, RECORD_PROJECTION).sort(
+                [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+            ).limit(limit + 1).to_list(length=None)
+        except Exception as e:
+            raise ReceiptQueryError("get_receipt_history", original_error=e)
+
+        items = [ReceiptRecord.from_document(document) for document in documents[:limit]]
+        next_cursor = None
+        if len(documents) > limit and items:
+            last = items[-1]
+            next_cursor = encode_history_cursor(last.created_at, last.id_receipt)
+        return ReceiptPage(items=items, next_cursor=next_cursor)
+
+    async def mark_as_notified(self, receipt_id: str) -> None:
         try:
-            result = self.db.update_one(
+            result = await self.db.update_one(
                 {"_id": ObjectId(receipt_id)},
-                {"$set": {"notified": True}}
+                {"$set": {"is_notified": True}}
             )
             if result.matched_count == 0:
                 raise ReceiptNotFoundError(receipt_id)
@@ -56,12 +422,37 @@ class ReceiptsRepositoryImpl(ReceiptsRepository):
         except Exception as e:
             raise ReceiptUpdateError(receipt_id, original_error=e)
 
-    def obtain_receipt_expire_by_date(self, date_expired: str) -> list[ReceiptDataSave]:
+    def _expire_by_date_filter(self, date_expired: Union[str, date]) -> dict:
+        start, end = due_date_range(date_expired)
+        return {
+            "date_expired": {"$gte": start, "$lt": end},
+            "is_notified": False
+        }
+
+    async def obtain_receipt_expire_by_date(self, date_expired: Union[str, date]) -> list[ReceiptDataSave]:
         try:
-            receipts = self.db.find({
-                "expiration_date": date_expired,
-                "notified": {"$ne": True}
-            })
-            return [ReceiptDataSave(**receipt) for receipt in receipts]
+            cursor = self.db.find(self._expire_by_date_filter(date_expired))
+            return [_to_receipt(receipt) async for receipt in cursor]
         except Exception as e:
-            raise ReceiptQueryError("obtain_receipt_expire_by_date", original_error=e)
\ No newline at end of file
+            raise ReceiptQueryError("obtain_receipt_expire_by_date", original_error=e)
+
+    async def iter_receipts_expire_by_date(
+        self, date_expired: Union[str, date], batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        try:
+            query = self._expire_by_date_filter(date_expired)
+        except ValueError as e:
+            raise ReceiptQueryError("iter_receipts_expire_by_date", original_error=e)
+        cursor = self.db.find(query, RECORD_PROJECTION).batch_size(batch_size)
+        async for record in self._stream(cursor, "iter_receipts_expire_by_date"):
+            yield record
+
+    @staticmethod
+    async def _stream(cursor, operation: str) -> AsyncIterator[ReceiptRecord]:
+        """Convierte cada documento del cursor en un ReceiptRecord; el cursor se cierra aunque se corte el recorrido."""
+        async with cursor:
+            try:
+                async for document in cursor:
+                    yield ReceiptRecord.from_document(document)
+            except Exception as e:
+                raise ReceiptQueryError(operation, original_error=e)
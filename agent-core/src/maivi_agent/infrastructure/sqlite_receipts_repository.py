@@ -0,0 +1,417 @@
+"""
+Repositorio de recibos sobre SQLite.
+
+Pensado para pruebas de carga en una sola máquina sin MongoDB
+(RECEIPTS_BACKEND=sqlite). Replica la semántica de `ReceiptsRepositoryImpl` con
+los mismos índices, así que los planes de consulta son comparables:
+- índice único parcial sobre la clave natural: `INSERT ... ON CONFLICT DO NOTHING`
+  y, si no se insertó, se devuelve el recibo existente
+- (teléfono, servicio, created_at, id) y (teléfono, created_at, id) para el
+  historial con paginación por clave
+- índice parcial de vencimiento sobre los recibos no notificados
+- tabla de acumulados mensuales, actualizada en la misma transacción que el recibo
+
+sqlite3 es bloqueante: la conexión vive en un único hilo propio y cada operación
+se espera desde el event loop con `run_in_executor`. Las fechas se guardan como
+texto ISO 8601 en UTC, que ordena igual que el instante que representa.
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Callable, Optional, TypeVar, Union
+from bson import ObjectId
+from maivi_agent.domain.entities import (
+    MonthlySpend,
+    ReceiptDataSave,
+    ReceiptPage,
+    ReceiptRecord,
+    ReceiptSaveResult,
+    decode_history_cursor,
+    due_date_range,
+    encode_history_cursor,
+    receipt_natural_key,
+    rollup_month,
+)
+from maivi_agent.domain.receipts_exceptions import (
+    DatabaseConnectionError,
+    InvalidReceiptDataError,
+    ReceiptNotFoundError,
+    ReceiptQueryError,
+    ReceiptSaveError,
+    ReceiptUpdateError,
+)
+from maivi_agent.domain.receipts_repository import ReceiptsRepository
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipts (
+    id TEXT PRIMARY KEY,
+    phone_number TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    is_valid INTEGER NOT NULL,
+    is_notified INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    amount_total REAL,
+    date_expired TEXT,
+    consumption_period TEXT,
+    company TEXT,
+    link_receipt_image TEXT,
+    link_receipt_preview TEXT,
+    link_receipt_thumbnail TEXT,
+    date_expired_raw TEXT
+);
+CREATE INDEX IF NOT EXISTS phone_service_created_at_id
+    ON receipts (phone_number, service_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS phone_created_at_id
+    ON receipts (phone_number, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS date_expired_pending
+    ON receipts (date_expired) WHERE is_notified = 0;
+CREATE UNIQUE INDEX IF NOT EXISTS receipt_natural_key
+    ON receipts (phone_number, company, consumption_period, amount_total)
+    WHERE company IS NOT NULL AND consumption_period IS NOT NULL AND amount_total IS NOT NULL;
+CREATE TABLE IF NOT EXISTS receipts_monthly (
+    phone_number TEXT NOT NULL,
+    service_type TEXT NOT NULL,
+    month TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (phone_number, service_type, month)
+);
+"""
+
+COLUMNS = (
+    "id", "phone_number", "service_type", "is_valid", "is_notified", "created_at",
+    "amount_total", "date_expired", "consumption_period", "company", "link_receipt_image",
+    "link_receipt_preview", "link_receipt_thumbnail", "date_expired_raw",
+)
+# Columnas que necesita ReceiptRecord, en el orden de sus campos
+RECORD_COLUMNS = (
+    "id, phone_number, service_type, is_notified, amount_total, date_expired, "
+    "consumption_period, company, created_at, link_receipt_thumbnail"
+)
+
+INSERT_RECEIPT = (
+    f"INSERT INTO receipts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    "ON CONFLICT DO NOTHING"
+)
+SELECT_BY_NATURAL_KEY = (
+    "SELECT id FROM receipts "
+    "WHERE phone_number = ? AND company = ? AND consumption_period = ? AND amount_total = ?"
+)
+ADD_TO_ROLLUP = (
+    "INSERT INTO receipts_monthly (phone_number, service_type, month, total, count) VALUES (?, ?, ?, ?, 1) "
+    "ON CONFLICT (phone_number, service_type, month) "
+    "DO UPDATE SET total = total + excluded.total, count = count + 1"
+)
+
+
+def _to_text(value: Optional[datetime]) -> Optional[str]:
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds") if value is not None else None
+
+
+def _from_text(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _to_row(receipt_data: ReceiptDataSave) -> tuple:
+    return (
+        str(ObjectId()),
+        receipt_data.phone_number,
+        receipt_data.service_type.value,
+        int(receipt_data.is_valid),
+        int(receipt_data.is_notified),
+        _to_text(receipt_data.created_at),
+        receipt_data.amount_total,
+        _to_text(receipt_data.date_expired),
+        receipt_data.consumption_period,
+        receipt_data.company,
+        receipt_data.link_receipt_image,
+        receipt_data.link_receipt_preview,
+        receipt_data.link_receipt_thumbnail,
+        receipt_data.date_expired_raw,
+    )
+
+
+def _to_receipt(row: sqlite3.Row) -> ReceiptDataSave:
+    return ReceiptDataSave(
+        id_receipt=row["id"],
+        phone_number=row["phone_number"],
+        service_type=row["service_type"],
+        is_valid=bool(row["is_valid"]),
+        is_notified=bool(row["is_notified"]),
+        created_at=_from_text(row["created_at"]),
+        amount_total=row["amount_total"],
+        date_expired=_from_text(row["date_expired"]),
+        consumption_period=row["consumption_period"],
+        company=row["company"],
+        link_receipt_image=row["link_receipt_image"],
+        link_receipt_preview=row["link_receipt_preview"],
+        link_receipt_thumbnail=row["link_receipt_thumbnail"],
+        date_expired_raw=row["date_expired_raw"],
+    )
+
+
+def _to_record(row: sqlite3.Row) -> ReceiptRecord:
+    return ReceiptRecord(
+        id_receipt=row["id"],
+        phone_number=row["phone_number"],
+        service_type=row["service_type"],
+        is_notified=bool(row["is_notified"]),
+        amount_total=row["amount_total"],
+        date_expired=_from_text(row["date_expired"]),
+        consumption_period=row["consumption_period"],
+        company=row["company"],
+        created_at=_from_text(row["created_at"]),
+        link_receipt_thumbnail=row["link_receipt_thumbnail"],
+    )
+
+
+class SqliteReceiptsRepository(ReceiptsRepository):
+    """Repositorio de recibos sobre un archivo SQLite (o `:memory:`), con índices equivalentes a los de MongoDB."""
+
+    def __init__(self, path: str = "receipts.db"):
+        """
+        Args:
+            path: Archivo de la base de datos; `:memory:` la mantiene solo en este proceso
+        """
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        # Un solo hilo: sqlite3 serializa las escrituras y la conexión no se comparte entre hilos
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-receipts")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, operation: Callable[[sqlite3.Connection], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: operation(self._connect()))
+
+    async def ensure_indexes(self) -> None:
+        try:
+            await self._run(lambda connection: None)
+        except sqlite3.Error as e:
+            raise DatabaseConnectionError("Error al crear el esquema de recibos", original_error=e)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._run(lambda connection: connection.close())
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
+        row = _to_row(receipt_data)
+        if connection.execute(INSERT_RECEIPT, row).rowcount:
+            connection.execute(ADD_TO_ROLLUP, (
+                receipt_data.phone_number,
+                receipt_data.service_type.value,
+                rollup_month(receipt_data),
+                receipt_data.amount_total or 0,
+            ))
+            return ReceiptSaveResult(row[0], created=True)
+
+        key = receipt_natural_key(receipt_data)
+        existing = connection.execute(SELECT_BY_NATURAL_KEY, tuple(key.values())).fetchone() if key else None
+        if existing is None:
+            raise ReceiptSaveError("El recibo duplicado no se encontró al consultarlo")
+        return ReceiptSaveResult(existing["id"], created=False)
+
+    async def save_receipt(self, receipt_data: ReceiptDataSave) -> ReceiptSaveResult:
+        def save(connection: sqlite3.Connection) -> ReceiptSaveResult:
+            with connection:
+                return self._insert(connection, receipt_data)
+
+        try:
+            return await self._run(save)
+        except sqlite3.Error as e:
+            raise ReceiptSaveError(original_error=e)
+
+    async def save_receipts(self, receipts_data: list[ReceiptDataSave]) -> list[ReceiptSaveResult]:
+        if not receipts_data:
+            return []
+
+        def save(connection: sqlite3.Connection) -> list[ReceiptSaveResult]:
+            # Una sola transacción para todo el lote
+            with connection:
+                return [self._insert(connection, receipt) for receipt in receipts_data]
+
+        try:
+            return await self._run(save)
+        except sqlite3.Error as e:
+            raise ReceiptSaveError("Error al guardar los recibos en lote", original_error=e)
+
+    async def _query(self, operation: str, sql: str, parameters: tuple) -> list[sqlite3.Row]:
+        try:
+            return await self._run(lambda connection: connection.execute(sql, parameters).fetchall())
+        except sqlite3.Error as e:
+            raise ReceiptQueryError(operation, original_error=e)
+
+    async def get_receipts_by_service(self, phone_number: str, service_type: str) -> list[ReceiptDataSave]:
+        rows = await self._query(
+            "get_receipts_by_service",
+            "SELECT * FROM receipts WHERE phone_number = ? AND service_type = ? ORDER BY created_at DESC, id DESC",
+            (phone_number, service_type)
+        )
+        return [_to_receipt(row) for row in rows]
+
+    async def iter_receipts_by_service(
+        self, phone_number: str, service_type: str, batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        # Lotes por clave (created_at, id): ninguna consulta mantiene un cursor abierto entre lotes
+        after = None
+        while True:
+            if after is None:
+                rows = await self._query(
+                    "iter_receipts_by_service",
+                    f"SELECT {RECORD_COLUMNS} FROM receipts WHERE phone_number = ? AND service_type = ? "
+                    "ORDER BY created_at DESC, id DESC LIMIT ?",
+                    (phone_number, service_type, batch_size)
+                )
+            else:
+                rows = await self._query(
+                    "iter_receipts_by_service",
+                    f"SELECT {RECORD_COLUMNS} FROM receipts WHERE phone_number = ? AND service_type = ? "
+                    "AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                    (phone_number, service_type, *after, batch_size)
+                )
+            for row in rows:
+                yield _to_record(row)
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+
+    async def get_receipt_history(
+        self,
+        phone_number: str,
+        service_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> ReceiptPage:
+        conditions = ["phone_number = ?"]
+        parameters: list = [phone_number]
+        if service_type:
+            conditions.append("service_type = ?")
+            parameters.append(service_type)
+        if created_from is not None:
+            conditions.append("created_at >= ?")
+            parameters.append(_to_text(created_from))
+        if created_to is not None:
+            conditions.append("created_at < ?")
+            parameters.append(_to_text(created_to))
+        if cursor:
+            created_at, receipt_id = decode_history_cursor(cursor)
+            if not ObjectId.is_valid(receipt_id):
+                raise InvalidReceiptDataError("Cursor de paginación inválido", field="cursor")
+            conditions.append("(created_at, id) < (?, ?)")
+            parameters.extend((_to_text(created_at), receipt_id))
+
+        # Una fila de más indica si hay otra página
+        rows = await self._query(
+            "get_receipt_history",
+            f"SELECT {RECORD_COLUMNS} FROM receipts WHERE {' AND '.join(conditions)} "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*parameters, limit + 1)
+        )
+        items = [_to_record(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = encode_history_cursor(last.created_at, last.id_receipt)
+        return ReceiptPage(items=items, next_cursor=next_cursor)
+
+    async def get_monthly_summary(
+        self, phone_number: str, year: Optional[int] = None, service_type: Optional[str] = None
+    ) -> list[MonthlySpend]:
+        conditions = ["phone_number = ?"]
+        parameters: list = [phone_number]
+        if service_type:
+            conditions.append("service_type = ?")
+            parameters.append(service_type)
+        if year is not None:
+            conditions.append("month BETWEEN ? AND ?")
+            parameters.extend((f"{year:04d}-01", f"{year:04d}-12"))
+        rows = await self._query(
+            "get_monthly_summary",
+            f"SELECT service_type, month, total, count FROM receipts_monthly WHERE {' AND '.join(conditions)} "
+            "ORDER BY month",
+            tuple(parameters)
+        )
+        return [MonthlySpend(row["service_type"], row["month"], round(row["total"], 2), row["count"]) for row in rows]
+
+    async def rebuild_monthly_rollups(self) -> int:
+        def rebuild(connection: sqlite3.Connection) -> int:
+            with connection:
+                connection.execute("DELETE FROM receipts_monthly")
+                # Las fechas están en UTC, así que los 7 primeros caracteres son el mes (YYYY-MM)
+                connection.execute(
+                    "INSERT INTO receipts_monthly (phone_number, service_type, month, total, count) "
+                    "SELECT phone_number, service_type, substr(coalesce(date_expired, created_at), 1, 7), "
+                    "sum(coalesce(amount_total, 0)), count(*) FROM receipts GROUP BY 1, 2, 3"
+                )
+                return connection.execute("SELECT count(*) FROM receipts_monthly").fetchone()[0]
+
+        try:
+            return await self._run(rebuild)
+        except sqlite3.Error as e:
+            raise ReceiptQueryError("rebuild_monthly_rollups", "Error al recalcular los acumulados mensuales", original_error=e)
+
+    async def mark_as_notified(self, receipt_id: str) -> None:
+        def mark(connection: sqlite3.Connection) -> int:
+            with connection:
+                return connection.execute("UPDATE receipts SET is_notified = 1 WHERE id = ?", (receipt_id,)).rowcount
+
+        try:
+            matched = await self._run(mark)
+        except sqlite3.Error as e:
+            raise ReceiptUpdateError(receipt_id, original_error=e)
+        if matched == 0:
+            raise ReceiptNotFoundError(receipt_id)
+
+    @staticmethod
+    def _expire_by_date_range(date_expired: Union[str, date]) -> tuple[str, str]:
+        start, end = due_date_range(date_expired)
+        return _to_text(start), _to_text(end)
+
+    async def obtain_receipt_expire_by_date(self, date_expired: Union[str, date]) -> list[ReceiptDataSave]:
+        try:
+            date_range = self._expire_by_date_range(date_expired)
+        except ValueError as e:
+            raise ReceiptQueryError("obtain_receipt_expire_by_date", original_error=e)
+        rows = await self._query(
+            "obtain_receipt_expire_by_date",
+            "SELECT * FROM receipts WHERE is_notified = 0 AND date_expired >= ? AND date_expired < ?",
+            date_range
+        )
+        return [_to_receipt(row) for row in rows]
+
+    async def iter_receipts_expire_by_date(
+        self, date_expired: Union[str, date], batch_size: int = 500
+    ) -> AsyncIterator[ReceiptRecord]:
+        try:
+            start, end = self._expire_by_date_range(date_expired)
+        except ValueError as e:
+            raise ReceiptQueryError("iter_receipts_expire_by_date", original_error=e)
+        after = ""
+        while True:
+            rows = await self._query(
+                "iter_receipts_expire_by_date",
+                f"SELECT {RECORD_COLUMNS} FROM receipts "
+                "WHERE is_notified = 0 AND date_expired >= ? AND date_expired < ? AND id > ? ORDER BY id LIMIT ?",
+                (start, end, after, batch_size)
+            )
+            for row in rows:
+                yield _to_record(row)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["id"]
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,21 +9,103 @@ class Settings(BaseSettings):
     NAME_AGENT :str
     PORT : int = Field(default= 3003)
     LOG_NAME : str = Field(default= "ai_service")
+    LOG_FORMAT: str = Field(default="text")  # text | json
+    LOG_SAMPLE_RATE: float = Field(default=1.0)  # fracción de INFO conservada en rutas calientes
+    TRACING_EXPORTER: str = Field(default="none")  # none | file | otlp
+    TRACING_FILE_PATH: str = Field(default="traces.jsonl")
+    OTLP_ENDPOINT: str = Field(default="http://localhost:4318")
     URL_WSP : str = Field(default= "ws://localhost:3003/ws")
     PHONE_NUMBER : str = Field(default= "+1234567890")
     IMAGEKIT_PRIVATE_KEY: str
     IMAGEKIT_PUBLIC_KEY: str
     URL_ENDPOINT_IMAGEKIT: str
+    IMAGEKIT_MAX_CONCURRENT_UPLOADS: int = Field(default=8)
+    IMAGEKIT_TIMEOUT_SECONDS: float = Field(default=30)
+    IMAGEKIT_CONNECT_TIMEOUT_SECONDS: float = Field(default=5)
+    IMAGEKIT_MAX_RETRIES: int = Field(default=2)
+    IMAGE_STORAGE_BACKEND: str = Field(default="imagekit")  # imagekit | local
+    IMAGE_STORAGE_LOCAL_DIR: str = Field(default="images")
+    IMAGE_STORAGE_LOCAL_BASE_URL: str = Field(default="")  # vacío: URIs file://
+    IMAGE_INDEX_MAX_ENTRIES: int = Field(default=10_000)
+    IMAGE_TRANSCODE_ENABLED: bool = Field(default=True)
+    IMAGE_FORMAT: str = Field(default="webp")  # webp | jpeg
+    IMAGE_QUALITY: int = Field(default=80)
+    IMAGE_MAX_DIMENSION: int = Field(default=2048)
+    IMAGE_PREVIEW_DIMENSION: int = Field(default=1024)
+    IMAGE_THUMBNAIL_DIMENSION: int = Field(default=256)
     DATABASE_URL: str
     DATABASE_NAME :str
     COLLECTION_NAME:str
+    RECEIPTS_BACKEND: str = Field(default="mongo")  # mongo | sqlite | memory
+    RECEIPTS_SQLITE_PATH: str = Field(default="receipts.db")
+    MONGO_MAX_POOL_SIZE: int = Field(default=50)
+    MONGO_MIN_POOL_SIZE: int = Field(default=2)
+    MONGO_MAX_IDLE_TIME_MS: int = Field(default=60_000)
+    MONGO_CONNECT_TIMEOUT_MS: int = Field(default=5_000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = Field(default=5_000)
+    MONGO_SOCKET_TIMEOUT_MS: int = Field(default=10_000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = Field(default=2_000)
+    RECEIPTS_WRITE_BUFFER_ENABLED: bool = Field(default=False)
+    RECEIPTS_WRITE_BUFFER_MAX_BATCH: int = Field(default=100)
+    RECEIPTS_WRITE_BUFFER_FLUSH_MS: int = Field(default=50)
+    RECEIPTS_CACHE_ENABLED: bool = Field(default=True)
+    RECEIPTS_CACHE_TTL_SECONDS: int = Field(default=60)
+    RECEIPTS_CACHE_MAX_ENTRIES: int = Field(default=10_000)
+    
+    # API
+    API_HOST: str = Field(default="0.0.0.0")
+    API_PORT: int = Field(default=8000)
+    API_WORKERS: int = Field(default=1)
+    MAX_IMAGE_UPLOAD_BYTES: int = Field(default=10 * 1024 * 1024)
+    SESSION_COALESCE_WINDOW_MS: int = Field(default=500)
+    SESSION_MAX_BATCH_SIZE: int = Field(default=5)
+    BATCH_MAX_IMAGES: int = Field(default=5)
+    BATCH_MAX_CONCURRENCY: int = Field(default=3)
+    IDEMPOTENCY_TTL_SECONDS: int = Field(default=600)
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(default=10_000)
+    ADMISSION_MAX_IN_FLIGHT: int = Field(default=8)
+    ADMISSION_MAX_QUEUED: int = Field(default=100)
+    ADMISSION_MAX_QUEUED_BYTES: int = Field(default=256 * 1024 * 1024)
+    ADMISSION_MAX_PER_PHONE: int = Field(default=3)
     
     # CAL.COM
     CALCOM_API_KEY: str = Field(default="")
     CALCOM_EVENT_TYPE_ID: int = Field(default=0)
+    CALCOM_BASE_URL: str = Field(default="https://api.cal.com/v2")
+    CALCOM_HTTP2: bool = Field(default=True)
+    CALCOM_MAX_CONNECTIONS: int = Field(default=10)
+    CALCOM_KEEPALIVE_EXPIRY_SECONDS: float = Field(default=30)
+    CALCOM_TIMEOUT_SECONDS: float = Field(default=15)
+    CALCOM_CONNECT_TIMEOUT_SECONDS: float = Field(default=5)
     
     # GOOGLE CALENDAR
     GOOGLE_CALENDAR_ID: str = Field(default="")
     GOOGLE_CALENDAR_CREDENTIALS_PATH: str = Field(default="")
+    GOOGLE_CALENDAR_DISCOVERY_PATH: str = Field(default="")
+    GOOGLE_CALENDAR_MAX_WORKERS: int = Field(default=4)
+    GOOGLE_CALENDAR_BATCH_SIZE: int = Field(default=50)
+    GOOGLE_CALENDAR_TIMEOUT_SECONDS: float = Field(default=15)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Crea la configuración (lee el entorno y el .env) la primera vez que se usa."""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Proxy de `Settings` que difiere la lectura del entorno hasta el primer acceso.
+
+    Importar un módulo que usa `settings` ya no valida el .env: eso ocurre cuando
+    se lee el primer atributo, lo que abarata el arranque y los usos por CLI.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
 
-settings = Settings()
\ No newline at end of file
+settings: Settings = _LazySettings()  # type: ignore[assignment]
@@ -0,0 +1,130 @@
+"""
+Imagen decodificada una sola vez y compartida por todo el pipeline.
+
+`ImageBuffer` guarda los bytes de la imagen y su hash SHA-256, calculados al
+recibirla en la API. El LLM, el almacenamiento y la deduplicación trabajan sobre
+el mismo objeto: nadie vuelve a decodificar base64 ni a hashear, y las
+codificaciones que solo algunos necesitan (base64, data URL) se generan la
+primera vez que se piden y se reutilizan después (clasificación y extracción
+comparten la misma data URL).
+
+Solo `data` y `sha256` son campos del dataclass: las codificaciones en caché no
+se copian al checkpoint del grafo.
+"""
+import base64
+import binascii
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Optional, Union
+
+# Firma del archivo -> (tipo MIME, extensión)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"GIF8", "image/gif", "gif"),
+)
+
+
+@dataclass(frozen=True, repr=False)
+class ImageBuffer:
+    """Bytes de una imagen con su hash y codificaciones perezosas."""
+    data: bytes
+    sha256: str
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], sha256: Optional[str] = None) -> "ImageBuffer":
+        """
+        Crea el buffer a partir de bytes ya decodificados.
+
+        Args:
+            data: Contenido de la imagen
+            sha256: Hash ya calculado (p. ej. al leer el cuerpo por bloques); si no, se calcula
+        """
+        data = bytes(data)
+        return cls(data, sha256 or hashlib.sha256(data).hexdigest())
+
+    @classmethod
+    def from_base64(cls, image_base64: str) -> "ImageBuffer":
+        """
+        Decodifica una imagen en base64 (con o sin prefijo data:).
+
+        Se admiten saltos de línea y espacios (base64 MIME); cualquier otro carácter
+        fuera del alfabeto o un relleno incorrecto es un error.
+
+        Raises:
+            ValueError: Si el texto no es base64 válido
+        """
+        if image_base64.startswith("data:"):
+            _, _, image_base64 = image_base64.partition(",")
+        try:
+            data = cls._decode_strict(image_base64)
+        except ValueError:
+            compact = "".join(image_base64.split())
+            if compact == image_base64:
+                raise
+            # Base64 con saltos de línea: se decodifica (y se guarda) sin ellos
+            image_base64 = compact
+            data = cls._decode_strict(image_base64)
+        image = cls.from_bytes(data)
+        # El texto recibido (sin espacios) ya es la codificación: la data URL no vuelve a codificar
+        image.__dict__["base64"] = image_base64
+        return image
+
+    @staticmethod
+    def _decode_strict(image_base64: str) -> bytes:
+        try:
+            # a2b_base64 lee el texto ASCII sin copiarlo a bytes (b64decode sí lo copia);
+            # strict_mode rechaza lo que no es base64 en lugar de ignorarlo
+            return binascii.a2b_base64(image_base64, strict_mode=True)
+        except ValueError as e:
+            raise ValueError(f"La imagen no es base64 válido: {e}") from e
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "ImageBuffer":
+        """Lee la imagen de disco una sola vez, sin pasar por base64."""
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        # Nunca volcar varios MB de imagen a los logs
+        return f"ImageBuffer(sha256={self.sha256[:12]}, bytes={len(self.data)})"
+
+    def view(self, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """Porción de la imagen sin copiarla."""
+        return memoryview(self.data)[start:end]
+
+    @cached_property
+    def _format(self) -> tuple[str, str]:
+        for signature, mime_type, extension in _SIGNATURES:
+            if self.data.startswith(signature):
+                return mime_type, extension
+        if self.data[:4] == b"RIFF" and self.data[8:12] == b"WEBP":
+            return "image/webp", "webp"
+        # Formato desconocido: se trata como hasta ahora (JPEG para el LLM, .png al guardar)
+        return "image/jpeg", "png"
+
+    @property
+    def mime_type(self) -> str:
+        """Tipo MIME según la firma del archivo."""
+        return self._format[0]
+
+    @property
+    def extension(self) -> str:
+        """Extensión según la firma del archivo."""
+        return self._format[1]
+
+    @cached_property
+    def base64(self) -> str:
+        """Imagen codificada en base64 (se calcula una vez)."""
+        return base64.b64encode(self.data).decode("ascii")
+
+    @cached_property
+    def data_url(self) -> str:
+        """Data URL para enviar la imagen al LLM (se calcula una vez)."""
+        # Sin pasar por `base64` si nadie lo pidió: solo queda en caché una copia codificada
+        encoded = self.__dict__.get("base64") or base64.b64encode(self.data).decode("ascii")
+        return f"data:{self.mime_type};base64,{encoded}"
@@ -1,16 +1,65 @@
+import atexit
 import logging
 import logging.config
 import os
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
 import yaml
 from shared.config import settings
 
-def init_logger(name : str = "default"):
-    log = None
-    path_route = os.path.abspath("logging.yml")
-    with open(path_route, 'r') as f:
+# Se busca primero en el directorio de trabajo y luego en la raíz de agent-core
+_DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "logging.yml"
+
+_listeners: list[QueueListener] = []
+
+
+def _config_path() -> Path:
+    path_route = Path(os.path.abspath("logging.yml"))
+    return path_route if path_route.exists() else _DEFAULT_CONFIG_PATH
+
+
+@lru_cache(maxsize=1)
+def configure_logging(path: Optional[str] = None) -> None:
+    """
+    Carga logging.yml una sola vez y arranca los QueueListener configurados.
+
+    Los loggers del servicio escriben en un QueueHandler; la escritura real en
+    consola y en el archivo rotativo la hace el hilo del QueueListener, fuera
+    del event loop. Con LOG_FORMAT=json todos los handlers emiten JSON.
+    """
+    with open(path or _config_path(), 'r') as f:
         config = yaml.safe_load(f.read())
-        logging.config.dictConfig(config)
-    
+    if settings.LOG_FORMAT == "json":
+        for handler in config.get("handlers", {}).values():
+            if "formatter" in handler:
+                handler["formatter"] = "json"
+    logging.config.dictConfig(config)
+
+    handlers = {handler for logger in [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]
+                if isinstance(logger, logging.Logger) for handler in logger.handlers}
+    for handler in handlers:
+        listener = getattr(handler, "listener", None)
+        if isinstance(handler, QueueHandler) and listener is not None and listener not in _listeners:
+            if listener._thread is None:
+                listener.start()
+            _listeners.append(listener)
+
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Vacía las colas de logging y detiene los hilos de los QueueListener."""
+    while _listeners:
+        listener = _listeners.pop()
+        if listener._thread is not None:
+            listener.stop()
+
+
+@lru_cache(maxsize=None)
+def init_logger(name : str = "default"):
+    configure_logging()
     log = logging.getLogger(f"{settings.LOG_NAME}.{name}")
     
-    return log
\ No newline at end of file
+    return log
@@ -0,0 +1,106 @@
+"""
+Contexto de logging por petición y logging estructurado.
+
+Cada petición recibe un correlation id (y, cuando se conoce, el hash del teléfono)
+guardado en contextvars, así que viaja con la petición a través de los nodos del
+grafo, las llamadas al LLM y las reservas en CAL.COM sin pasarlo como argumento.
+Los filtros de este módulo lo añaden a cada registro; `JsonFormatter` emite un
+objeto JSON por línea y `SamplingFilter` muestrea los INFO de las rutas calientes.
+"""
+import hashlib
+import json
+import logging
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+from shared.config import settings
+
+correlation_id_var: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+phone_hash_var: ContextVar[Optional[str]] = ContextVar("phone_hash", default=None)
+
+# Atributos estándar de LogRecord; el resto son campos pasados con `extra=`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def new_correlation_id() -> str:
+    """Genera un correlation id corto para una petición."""
+    return uuid.uuid4().hex[:16]
+
+
+def hash_phone(phone_number: str) -> str:
+    """Hash corto del teléfono para correlacionar logs sin registrar el número."""
+    return hashlib.sha256(phone_number.encode()).hexdigest()[:12]
+
+
+def bind_correlation_id(correlation_id: Optional[str] = None) -> str:
+    """Asigna el correlation id de la petición en curso y lo devuelve."""
+    correlation_id = correlation_id or new_correlation_id()
+    correlation_id_var.set(correlation_id)
+    return correlation_id
+
+
+def bind_phone(phone_number: str) -> None:
+    """Asocia el hash del teléfono a la petición en curso."""
+    phone_hash_var.set(hash_phone(phone_number))
+
+
+class ContextFilter(logging.Filter):
+    """
+    Añade correlation_id y phone_hash del contexto actual a cada registro.
+
+    Se aplica en el hilo que loguea (QueueHandler); si el registro ya los trae,
+    no se sobrescriben en el hilo del QueueListener.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = correlation_id_var.get() or "-"
+            record.phone_hash = phone_hash_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción de los registros INFO (y DEBUG) de un logger.
+
+    La decisión se toma por correlation id, así que una petición muestreada
+    conserva todas sus líneas. WARNING y superiores se conservan siempre.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        super().__init__()
+        self.rate = settings.LOG_SAMPLE_RATE if rate is None else rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+        key = correlation_id_var.get()
+        if key is None:
+            key = f"{record.name}:{record.msg}"
+        return zlib.crc32(key.encode()) % 10_000 < self.rate * 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como un objeto JSON en una sola línea."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "phone_hash": getattr(record, "phone_hash", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in payload:
+                payload[key] = value
+        # Detrás de un QueueHandler la traza ya viene incluida en el mensaje
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
@@ -0,0 +1,226 @@
+"""
+Métricas en memoria con exportación en formato de texto de Prometheus.
+
+Los histogramas de latencia son de estilo HDR: cada valor se guarda en un bucket
+log-lineal cuyo ancho es proporcional al propio valor, así que los percentiles
+tienen un error relativo acotado (< 1 % con la precisión por defecto) tanto para
+nodos de microsegundos como para llamadas al LLM de varios segundos, sin fijar
+los límites de antemano. Para Prometheus cada observación se cuenta además, al
+registrarla, en su bucket `le` exacto: los buckets HDR no coinciden con esos
+límites y no se pueden repartir después.
+
+Se implementa aquí en lugar de usar prometheus_client porque este no calcula
+percentiles en el proceso (los benchmarks y la serie `_quantile` los leen del
+histograma HDR) y el registro, con contadores e histogramas, cabe en un módulo
+sin dependencias.
+"""
+import threading
+from bisect import bisect_left
+from abc import ABC, abstractmethod
+from typing import Optional
+
+# Límites `le` (segundos) con los que se exponen los histogramas a Prometheus
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LatencyHistogram:
+    """
+    Histograma HDR simplificado sobre valores enteros en microsegundos.
+
+    Un valor v cae en el bucket [m·2^e, (m+1)·2^e) donde m conserva los
+    `precision_bits` bits más significativos de v. Aparte se cuenta cada valor
+    en el primer límite de `bounds` (segundos) que no supera.
+    """
+
+    def __init__(self, precision_bits: int = 7, bounds: tuple[float, ...] = ()):
+        self.precision_bits = precision_bits
+        self.bounds = tuple(sorted(bounds))
+        self.counts: dict[int, int] = {}
+        self.bound_counts = [0] * len(self.bounds)
+        self.count = 0
+        self.sum_seconds = 0.0
+
+    def _bucket(self, micros: int) -> int:
+        shift = max(0, micros.bit_length() - self.precision_bits)
+        return (micros >> shift) << shift
+
+    def _upper(self, lower: int) -> int:
+        return lower + (1 << max(0, lower.bit_length() - self.precision_bits))
+
+    def record(self, seconds: float) -> None:
+        micros = max(1, int(seconds * 1_000_000))
+        bucket = self._bucket(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        index = bisect_left(self.bounds, seconds)
+        if index < len(self.bounds):
+            self.bound_counts[index] += 1
+        self.count += 1
+        self.sum_seconds += seconds
+
+    def percentile(self, quantile: float) -> float:
+        """Valor (segundos) bajo el que queda la fracción `quantile` de las observaciones."""
+        if not self.count:
+            return 0.0
+        target = max(1, round(quantile * self.count))
+        seen = 0
+        for lower in sorted(self.counts):
+            seen += self.counts[lower]
+            if seen >= target:
+                return (self._upper(lower) - 1) / 1_000_000
+        return 0.0
+
+    def cumulative(self) -> list[int]:
+        """Observaciones menores o iguales a cada límite de `bounds` (acumuladas, como `le`)."""
+        result = []
+        seen = 0
+        for count in self.bound_counts:
+            seen += count
+            result.append(seen)
+        return result
+
+
+class _Family(ABC):
+    """Familia de métricas: un nombre y una serie por combinación de etiquetas."""
+    kind = ""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: dict[str, str]) -> LabelKey:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Optional[dict[str, str]] = None) -> str:
+        pairs = [*key, *(extra or {}).items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        """Líneas de la familia en el formato de texto de Prometheus."""
+        pass
+
+
+class Counter(_Family):
+    """Contador monótono con etiquetas."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Family):
+    """Histograma de latencias (segundos) con etiquetas, respaldado por `LatencyHistogram`."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelKey, LatencyHistogram] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = LatencyHistogram(bounds=self.buckets)
+            series.record(seconds)
+
+    def percentile(self, quantile: float, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series.percentile(quantile) if series else 0.0
+
+    def render(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series.cumulative()):
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': str(bound)})} {count}")
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {series.count}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {series.sum_seconds:.6f}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {series.count}")
+        return lines
+
+    def render_quantiles(self) -> list[str]:
+        """Percentiles HDR como serie aparte (Prometheus no los calcula con precisión desde `le`)."""
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                for quantile in EXPORTED_QUANTILES:
+                    labels = self._format_labels(key, {"quantile": str(quantile)})
+                    lines.append(f"{self.name}_quantile{labels} {series.percentile(quantile):.6f}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de las familias de métricas del proceso."""
+
+    def __init__(self):
+        self._families: dict[str, _Family] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Obtiene (o crea) un contador."""
+        return self._register(Counter(name, description))
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Obtiene (o crea) un histograma de latencias."""
+        return self._register(Histogram(name, description, buckets))
+
+    def render_prometheus(self) -> str:
+        """Serializa todas las métricas en el formato de texto de Prometheus (0.0.4)."""
+        lines = []
+        for family in list(self._families.values()):
+            lines.append(f"# HELP {family.name} {family.description}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(family.render())
+            if isinstance(family, Histogram):
+                lines.append(f"# HELP {family.name}_quantile {family.description} (percentiles HDR)")
+                lines.append(f"# TYPE {family.name}_quantile gauge")
+                lines.extend(family.render_quantiles())
+        return "\n".join(lines) + "\n"
+
+
+# Instancia singleton
+_metrics_registry = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Obtiene el registro de métricas del proceso."""
+    global _metrics_registry
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+    return _metrics_registry
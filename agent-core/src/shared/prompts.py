@@ -7,6 +7,7 @@ the application, with support for templates, versioning, and type safety.
 from typing import Optional
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 
 
 class PromptCategory(Enum):
@@ -266,4 +267,52 @@ class PromptManager:
         category_class = category_map.get(category)
         if category_class:
             return getattr(category_class, name, None)
-        return None
\ No newline at end of file
+        return None
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def render(category: str, name: str, **kwargs: str) -> str:
+        """
+        Get the final text of a prompt, formatted with the given values.
+        
+        The result is cached, so each (prompt, values) combination is
+        looked up and formatted only once per process.
+        
+        Args:
+            category: Category class name (e.g., 'SystemPrompts')
+            name: Prompt name (e.g., 'CLASSIFY_ASSISTANT')
+            **kwargs: Values for the template placeholders (e.g., name_agent)
+            
+        Returns:
+            Prompt content ready to be sent to the LLM
+            
+        Raises:
+            KeyError: If the prompt does not exist
+        """
+        prompt = PromptManager.get_prompt(category, name)
+        if prompt is None:
+            raise KeyError(f"Prompt '{category}.{name}' not found")
+        return prompt.content.format(**kwargs) if kwargs else prompt.content
+
+    @staticmethod
+    def warm_up(name_agent: str) -> int:
+        """
+        Pre-render every prompt so the first request does not pay for it.
+        
+        Args:
+            name_agent: Agent name used by the system prompts
+            
+        Returns:
+            Number of prompts rendered
+        """
+        rendered = 0
+        for category, category_class in (("SystemPrompts", SystemPrompts), ("UserPrompts", UserPrompts)):
+            for name, value in vars(category_class).items():
+                if not isinstance(value, PromptTemplate):
+                    continue
+                if category == "SystemPrompts":
+                    PromptManager.render(category, name, name_agent=name_agent)
+                else:
+                    PromptManager.render(category, name)
+                rendered += 1
+        return rendered
\ No newline at end of file
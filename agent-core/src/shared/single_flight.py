@@ -0,0 +1,82 @@
+"""
+Ejecución única de operaciones concurrentes con la misma clave (single-flight).
+
+La primera llamada con una clave ejecuta la operación; las que llegan mientras
+está en curso esperan su resultado (o su error) en lugar de repetirla. Si la
+original se cancela (el cliente se desconectó), la cancelación no se propaga:
+una de las llamadas que esperaban la reemplaza y ejecuta la operación, y las
+demás pasan a esperar a esa. Solo se cancela quien espera si se cancela su
+propia tarea.
+"""
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[V]):
+    """Registro clave -> ejecución en curso."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def keys(self) -> list[Hashable]:
+        """Claves con una ejecución en curso."""
+        return list(self._calls)
+
+    async def run(
+        self,
+        key: Hashable,
+        operation: Callable[[], Awaitable[V]],
+        on_result: Optional[Callable[[V], Awaitable[None]]] = None
+    ) -> tuple[V, bool]:
+        """
+        Ejecuta la operación, o espera a la que ya está en curso con la misma clave.
+
+        Args:
+            key: Clave que identifica la operación
+            operation: Función asíncrona que produce el resultado
+            on_result: Se llama con el resultado ya entregado a quienes esperaban y antes de
+                liberar la clave: las llamadas que lleguen entretanto lo reciben sin repetir
+                la operación. Sus errores se propagan solo a quien ejecutó la operación
+
+        Returns:
+            tuple[V, bool]: Resultado y si se compartió de otra ejecución
+
+        Raises:
+            asyncio.CancelledError: Solo si se cancela la propia tarea que llama
+        """
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                break
+            try:
+                return await asyncio.shield(call), True
+            except asyncio.CancelledError:
+                if not call.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # La ejecución original se canceló: esta llamada la reemplaza (o espera a quien ya lo hizo)
+
+        future = asyncio.get_running_loop().create_future()
+        # Evita el aviso de "exception was never retrieved" si nadie esperaba
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await operation()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            if on_result is not None:
+                await on_result(result)
+            return result, False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+            if not future.done():
+                # Cancelada: quien esperaba no hereda la cancelación, toma el relevo
+                future.cancel()
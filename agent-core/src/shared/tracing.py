@@ -0,0 +1,273 @@
+"""
+Trazas distribuidas compatibles con OpenTelemetry.
+
+Cada petición HTTP abre un span raíz y cada nodo del grafo un span hijo (el span
+actual viaja en un contextvar, igual que el correlation id). Los spans terminados
+se agrupan y un hilo en segundo plano los exporta en OTLP/JSON:
+- TRACING_EXPORTER=file: una línea `{"resourceSpans": [...]}` por lote en TRACING_FILE_PATH
+- TRACING_EXPORTER=otlp: POST a `{OTLP_ENDPOINT}/v1/traces` (colector local)
+- TRACING_EXPORTER=none: no se crean spans
+
+No se usa opentelemetry-sdk: su exportador OTLP/HTTP trae protobuf y el SDK no
+escribe OTLP/JSON a fichero; el formato de los spans es el mismo y cualquier
+colector los recibe.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+from shared.config import settings
+from shared.init_logger import init_logger
+
+SERVICE_NAME = "maivi-agent"
+
+# Tipos de span de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+# Códigos de estado de OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+@dataclass
+class Span:
+    """Span en curso o terminado."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status_code: int = 0
+    status_message: str = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> dict:
+        """Representación del span en OTLP/JSON."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+current_span_var: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[str, str]]:
+    """Extrae (trace_id, span_id) de una cabecera W3C `traceparent`, si es válida."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class SpanExporter(ABC):
+    """Destino de los lotes de spans terminados."""
+
+    @abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        """
+        Envía un lote de spans terminados.
+
+        Args:
+            spans: Spans del lote, en orden de finalización
+        """
+        pass
+
+    def close(self) -> None:
+        """Libera los recursos del exportador (no-op por defecto)."""
+        pass
+
+    @staticmethod
+    def _payload(spans: list[Span]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "maivi_agent"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+
+class FileSpanExporter(SpanExporter):
+    """Escribe cada lote como una línea OTLP/JSON (se puede reenviar a un colector con filelog)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a", encoding="utf8") as f:
+            f.write(json.dumps(self._payload(spans), ensure_ascii=False) + "\n")
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Envía los lotes a un colector OpenTelemetry por OTLP/HTTP con codificación JSON."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        import httpx
+
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: list[Span]) -> None:
+        self.client.post(self.url, json=self._payload(spans)).raise_for_status()
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class Tracer:
+    """Crea spans y los exporta en lotes desde un hilo en segundo plano."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, max_batch_size: int = 256, flush_interval: float = 2.0):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.log = init_logger(self.__class__.__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Optional[tuple[str, str]] = None,
+        **attributes: Any
+    ) -> Iterator[Optional[Span]]:
+        """
+        Abre un span hijo del span actual (o de `parent`, un (trace_id, span_id) remoto).
+
+        Si el span termina con una excepción se marca como error y la excepción se propaga.
+        Con el trazado deshabilitado devuelve None sin coste apreciable.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        current = current_span_var.get()
+        if parent is not None:
+            trace_id, parent_span_id = parent
+        elif current is not None:
+            trace_id, parent_span_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_span_id = os.urandom(16).hex(), None
+
+        span = Span(name, trace_id, os.urandom(8).hex(), parent_span_id, kind, attributes=attributes)
+        token = current_span_var.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            # Quien usa el span puede haber fijado ya el estado (p. ej. una interrupción esperada)
+            if span.status_code == 0:
+                span.set_error(e)
+            raise
+        finally:
+            current_span_var.reset(token)
+            span.end_ns = time.time_ns()
+            if span.status_code == 0:
+                span.status_code = STATUS_OK
+            self._enqueue(span)
+
+    def _enqueue(self, span: Span) -> None:
+        self._queue.put(span)
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            self.log.warning(f"No se pudieron exportar {len(batch)} spans: {e}")
+
+    def shutdown(self) -> None:
+        """Exporta los spans pendientes y detiene el hilo exportador."""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout=10)
+            self._worker = None
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+def _build_exporter() -> Optional[SpanExporter]:
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if settings.TRACING_EXPORTER == "otlp":
+        return OtlpHttpSpanExporter(settings.OTLP_ENDPOINT)
+    return None
+
+
+# Instancia singleton
+_tracer = None
+
+
+def get_tracer() -> Tracer:
+    """Obtiene el tracer del proceso, configurado con TRACING_EXPORTER."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(exporter=_build_exporter())
+    return _tracer
@@ -0,0 +1,56 @@
+"""
+Diccionario acotado en memoria del proceso, con desalojo LRU y TTL por entrada.
+
+Base de los backends en memoria (caché de recibos, store de idempotencia,
+índice de imágenes): todos guardan como mucho `max_entries` entradas, descartan
+primero la usada hace más tiempo y tratan una entrada expirada como ausente.
+"""
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class TtlLruCache(Generic[V]):
+    """Entradas clave -> valor con tamaño máximo (LRU) y expiración opcional."""
+
+    def __init__(self, max_entries: int = 10_000):
+        """
+        Args:
+            max_entries: Entradas que se conservan; al superarlo se descarta la usada hace más tiempo
+        """
+        self.max_entries = max_entries
+        # clave -> (instante de expiración o None, valor); la primera es la usada hace más tiempo
+        self._entries: OrderedDict[Hashable, tuple[Optional[float], V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Valor vigente de la clave (y la marca como recién usada), o None si no existe o expiró."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Guarda el valor como recién usado.
+
+        Args:
+            ttl_seconds: Segundos de vigencia; None no expira (solo sale por LRU)
+        """
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)